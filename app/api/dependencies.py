@@ -1,8 +1,9 @@
 from app.services.assessment_service import AssessmentService
 from app.services.chat_service import ChatService
+from app.services.container import services
 
 def get_assessment_service() -> AssessmentService:
-    return AssessmentService()
+    return services.assessment_service
 
 def get_chat_service() -> ChatService:
-    return ChatService()
+    return services.chat_service
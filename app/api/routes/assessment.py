@@ -1,20 +1,28 @@
-from fastapi import APIRouter, HTTPException, Depends
-from app.models.assessment import AssessmentAnswer, AssessmentResult
-from app.services.assessment_service import AssessmentService
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import Response
+from pydantic import ValidationError
+from app.config.settings import settings
+from app.models.assessment import AssessmentAnswer, AssessmentResult, AssessmentBatchRequest, AssessmentBatchResult, BatchSubmission
+from app.core.constants import MAX_SCORE, RISK_LEVELS
+from app.core.exceptions import InvalidAnswersException
+from app.services.assessment_service import AssessmentService, BatchScore
+from app.services.statistics_service import assessment_statistics
 from app.api.dependencies import get_assessment_service
+from app.utils.precompiled import PrecompiledResponse
+from app.utils.responses import FastJSONResponse, dumps
 
 router = APIRouter(prefix="/api/assessment", tags=["assessment"])
 
+# The question bank never changes at runtime: encode and compress it once
+QUESTIONS_RESPONSE = PrecompiledResponse(
+    {"questions": AssessmentService.get_questions()},
+    max_age=settings.assessment_questions_max_age
+)
+
 @router.get("/questions")
-async def get_assessment_questions(
-    assessment_service: AssessmentService = Depends(get_assessment_service)
-):
+async def get_assessment_questions(request: Request):
     """Get all assessment questions"""
-    try:
-        questions = assessment_service.get_questions()
-        return {"questions": questions}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to fetch questions: {str(e)}")
+    return QUESTIONS_RESPONSE.respond(request)
 
 @router.post("/submit", response_model=AssessmentResult)
 async def submit_assessment(
@@ -24,19 +32,130 @@ async def submit_assessment(
     """Submit assessment answers and get results"""
     try:
         result = assessment_service.process_assessment(assessment.answers)
-        return result
+        return FastJSONResponse(result)
+    except InvalidAnswersException as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to process assessment: {str(e)}")
 
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+def _ndjson_line(data: dict) -> bytes:
+    return dumps(data) + b"\n"
+
+async def _submit_batch_ndjson(request: Request, assessment_service: AssessmentService) -> Response:
+    """Score an NDJSON upload chunk by chunk while it streams in"""
+    chunk_rows = settings.assessment_batch_chunk_rows
+    output = []
+    distribution = dict.fromkeys(RISK_LEVELS, 0)
+    total = 0
+    pending_answers = []
+    pending_indexes = []
+    parse_errors = {}
+
+    def flush():
+        # Lines that failed to parse are errors, not empty (score 0) submissions
+        scores = [
+            BatchScore(error=parse_errors.pop(index)) if index in parse_errors else score
+            for index, score in zip(pending_indexes, assessment_service.score_batch(pending_answers))
+        ]
+        assessment_service.record_batch(pending_answers, scores)
+        for index, score in zip(pending_indexes, scores):
+            if score.error:
+                output.append(_ndjson_line({"index": index, "error": score.error}))
+                continue
+            level = RISK_LEVELS[score.level_index]
+            distribution[level] += 1
+            output.append(_ndjson_line({
+                "index": index,
+                "total_score": score.total_score,
+                "percentage": score.percentage,
+                "risk_level": level
+            }))
+        pending_answers.clear()
+        pending_indexes.clear()
+
+    def handle_line(line: bytes):
+        nonlocal total
+        if not line.strip():
+            return
+        index = total
+        total += 1
+        try:
+            answers = BatchSubmission.model_validate_json(line).answers
+        except ValidationError as e:
+            # Keep the row in the chunk so output stays in input order
+            parse_errors[index] = f"Invalid submission: {e.errors()[0]['msg']}"
+            answers = {}
+        pending_answers.append(answers)
+        pending_indexes.append(index)
+        if len(pending_answers) >= chunk_rows:
+            flush()
+
+    # Pieces of the line still being received; joined once the line is complete, so a
+    # line spread over many chunks is not re-copied for each of them
+    partial = []
+    async for chunk in request.stream():
+        lines = chunk.split(b"\n")
+        if len(lines) == 1:
+            partial.append(chunk)
+            continue
+        partial.append(lines[0])
+        handle_line(b"".join(partial))
+        for line in lines[1:-1]:
+            handle_line(line)
+        partial = [lines[-1]]
+    handle_line(b"".join(partial))
+    flush()
+
+    output.append(_ndjson_line({
+        "summary": {
+            "total": total,
+            "scored": sum(distribution.values()),
+            "max_score": MAX_SCORE,
+            "risk_distribution": distribution
+        }
+    }))
+    return Response(content=b"".join(output), media_type="application/x-ndjson")
+
+@router.post(
+    "/submit-batch",
+    response_model=AssessmentBatchResult,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": AssessmentBatchRequest.model_json_schema()},
+                "application/x-ndjson": {"schema": {"type": "string", "description": "One BatchSubmission JSON object per line"}}
+            }
+        }
+    }
+)
+async def submit_assessment_batch(
+    request: Request,
+    assessment_service: AssessmentService = Depends(get_assessment_service)
+):
+    """Submit many assessments at once, as a JSON body or a streamed NDJSON body"""
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in NDJSON_MEDIA_TYPES:
+        return await _submit_batch_ndjson(request, assessment_service)
+
+    try:
+        batch = AssessmentBatchRequest.model_validate_json(await request.body())
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
+    if len(batch.submissions) > settings.assessment_batch_max_rows:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: at most {settings.assessment_batch_max_rows} submissions, use NDJSON for larger uploads"
+        )
+
+    try:
+        return FastJSONResponse(assessment_service.process_batch([submission.answers for submission in batch.submissions]))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to process assessment batch: {str(e)}")
+
 @router.get("/statistics")
 async def get_assessment_statistics():
-    """Get assessment statistics (placeholder)"""
-    return {
-        "total_assessments": 0,
-        "risk_distribution": {
-            "Rendah": 0,
-            "Sedang": 0,
-            "Tinggi": 0,
-            "Sangat Tinggi": 0
-        }
-    }
\ No newline at end of file
+    """Get assessment statistics"""
+    return FastJSONResponse(assessment_statistics.snapshot())
@@ -1,33 +1,237 @@
-from fastapi import APIRouter, HTTPException, Depends
-from app.models.chat import ChatRequest, ChatResponse
+from contextlib import aclosing
+from typing import Dict, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import Response, StreamingResponse
+from pydantic import ValidationError
+from starlette.requests import HTTPConnection
+from app.config.settings import settings
+from app.models.chat import ChatRequest, ChatResponse, CrisisCheckRequest, FollowUpResponse
+from app.services.admission import admission_controller
 from app.services.chat_service import ChatService
+from app.services.crisis_detector import crisis_detector
+from app.services.crisis_followups import crisis_followups
+from app.services.rate_limiter import rate_limiter
 from app.api.dependencies import get_chat_service
 from app.core.constants import CRISIS_RESOURCES
+from app.utils.responses import FastJSONResponse, dumps
+from app.utils.sse import SSE_HEADERS, format_sse
+import asyncio
+import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/chat", tags=["chat"])
 
+def _client_key(connection: HTTPConnection) -> str:
+    """Rate-limit key of the client behind a request or WebSocket connection"""
+    return rate_limiter.key_for(connection.client.host if connection.client else None, connection.headers.get("x-forwarded-for"))
+
+def _rate_limit(key: str, request: ChatRequest, chat_service: ChatService) -> Dict[str, str]:
+    """Charge this turn to the client's rate limit and return the RateLimit headers; raises 429 over the limit"""
+    decision = rate_limiter.acquire(key)
+    # Crisis messages are answered even over the limit; the detector is used directly because
+    # the turn records its own crisis check
+    if not decision.allowed and not crisis_detector.is_crisis(request.message):
+        raise HTTPException(
+            status_code=429,
+            detail="Too many chat requests, please try again shortly",
+            headers={**decision.headers, "Retry-After": str(decision.retry_after)}
+        )
+    rate_limiter.bind(key)
+    return decision.headers
+
+def _shed(request: ChatRequest, shed_reason: Optional[str], chat_service: ChatService) -> bool:
+    """Whether admission control degrades this turn to the fallback; raises 503 in reject mode"""
+    action = chat_service.shed_action(request, shed_reason)
+    if action == "reject":
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy, please try again shortly",
+            headers={"Retry-After": str(settings.admission_retry_after_seconds)}
+        )
+    return action == "fallback"
+
+def _shed_headers(headers: Dict[str, str]) -> Dict[str, str]:
+    """Headers for a shed turn's busy reply: when the client may send the turn again"""
+    return {**headers, "Retry-After": str(settings.admission_retry_after_seconds)}
+
 @router.post("", response_model=ChatResponse)
 async def chat_endpoint(
     request: ChatRequest,
+    http_request: Request,
     chat_service: ChatService = Depends(get_chat_service)
 ):
     """Chat with AI Counselor"""
+    headers = _rate_limit(_client_key(http_request), request, chat_service)
+    if _shed(request, getattr(http_request.state, "shed_reason", None), chat_service):
+        return FastJSONResponse(chat_service.shed_response(request), headers=_shed_headers(headers))
     try:
         response = await chat_service.process_chat(request)
-        return response
+        return FastJSONResponse(response, headers=headers)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chat service error: {str(e)}")
 
+@router.post("/stream")
+async def chat_stream_endpoint(
+    request: ChatRequest,
+    http_request: Request,
+    chat_service: ChatService = Depends(get_chat_service)
+):
+    """Chat with AI Counselor, streaming tokens as Server-Sent Events"""
+    headers = {**SSE_HEADERS, **_rate_limit(_client_key(http_request), request, chat_service)}
+    if _shed(request, getattr(http_request.state, "shed_reason", None), chat_service):
+        body = "".join(format_sse(event["event"], event["data"]) for event in chat_service.shed_events(request))
+        return Response(content=body, media_type="text/event-stream", headers=_shed_headers(headers))
+
+    async def event_stream():
+        async for event in chat_service.stream_chat(request):
+            yield format_sse(event["event"], event["data"])
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=headers)
+
+async def _send_frame(websocket: WebSocket, frame_type: str, data: Optional[dict] = None):
+    payload = {"type": frame_type, **(data or {})}
+    await websocket.send_text(dumps(payload).decode("utf-8"))
+
+@router.websocket("/ws")
+async def chat_websocket(
+    websocket: WebSocket,
+    session_id: Optional[str] = Query(None),
+    chat_service: ChatService = Depends(get_chat_service)
+):
+    """Chat with AI Counselor over one connection that holds the conversation.
+
+    Client frames: {"type": "message", "message", "user_risk_level"?, "conversation_history"?}
+    (history only seeds the first turn) and {"type": "cancel"}. Server frames are
+    the stream events as {"type": "meta" | "token" | "fallback" | "done", ...},
+    plus "cancelled" and "error".
+    """
+    await websocket.accept()
+    session = None
+    risk_level = None
+    generation: Optional[asyncio.Task] = None
+    rate_limit_key = _client_key(websocket)
+
+    async def generate(request: ChatRequest):
+        # Closing the event stream closes the upstream Azure stream with it
+        try:
+            with admission_controller.track("chat"):
+                async with aclosing(chat_service.stream_chat(request, session)) as events:
+                    async for event in events:
+                        await _send_frame(websocket, event["event"], event["data"])
+        except WebSocketDisconnect:
+            # The client went away mid-reply; the receive loop sees the disconnect
+            pass
+        except Exception:
+            logger.exception("WebSocket chat turn failed")
+            try:
+                await _send_frame(websocket, "error", {"detail": "The reply could not be completed"})
+            except WebSocketDisconnect:
+                pass
+
+    async def cancel_generation() -> bool:
+        if generation is None or generation.done():
+            return False
+        generation.cancel()
+        await asyncio.gather(generation, return_exceptions=True)
+        return True
+
+    try:
+        while True:
+            try:
+                frame = json.loads(await websocket.receive_text())
+            except ValueError:
+                await _send_frame(websocket, "error", {"detail": "Frames must be JSON"})
+                continue
+            frame_type = frame.get("type") if isinstance(frame, dict) else None
+
+            if frame_type == "cancel":
+                if await cancel_generation():
+                    await _send_frame(websocket, "cancelled")
+                continue
+            if frame_type != "message":
+                await _send_frame(websocket, "error", {"detail": "Unknown frame type"})
+                continue
+            if generation is not None and not generation.done():
+                await _send_frame(websocket, "error", {"detail": "A reply is still being generated; cancel it first"})
+                continue
+
+            try:
+                request = ChatRequest(
+                    message=frame.get("message"),
+                    user_risk_level=frame.get("user_risk_level", risk_level),
+                    conversation_history=(frame.get("conversation_history") or []) if session is None else []
+                )
+            except ValidationError:
+                await _send_frame(websocket, "error", {"detail": "Invalid message frame"})
+                continue
+            risk_level = request.user_risk_level
+            if session is None:
+                session = await chat_service.connection_session(session_id, request.conversation_history)
+
+            # Each turn goes through rate limiting and admission control, like a POST would;
+            # the rate-limit key bound here is inherited by the generation task
+            try:
+                _rate_limit(rate_limit_key, request, chat_service)
+                shed = _shed(request, admission_controller.shed_reason("chat"), chat_service)
+            except HTTPException as e:
+                await _send_frame(websocket, "error", {"detail": e.detail, "retry_after": int(e.headers["Retry-After"])})
+                continue
+            if shed:
+                for event in chat_service.shed_events(request.model_copy(update={"session_id": session.session_id})):
+                    await _send_frame(websocket, event["event"], event["data"])
+                continue
+            generation = asyncio.create_task(generate(request))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        # An abandoned generation stops burning tokens
+        await cancel_generation()
+
+@router.get("/follow-up/{follow_up_id}", response_model=FollowUpResponse)
+async def follow_up_endpoint(
+    follow_up_id: str,
+    wait: float = Query(0.0, ge=0.0, description="Seconds to wait for a pending follow-up")
+):
+    """Counselor follow-up to a crisis turn answered by the fast path"""
+    follow_up = await crisis_followups.wait(follow_up_id, min(wait, settings.crisis_followup_max_wait_seconds))
+    if follow_up is None:
+        raise HTTPException(status_code=404, detail="Follow-up not found or expired")
+    return FastJSONResponse(FollowUpResponse(
+        follow_up_id=follow_up.follow_up_id,
+        status=follow_up.status,
+        response=follow_up.response,
+        session_id=follow_up.session_id
+    ))
+
 @router.post("/crisis-check")
 async def crisis_check(
-    request: dict,
+    request: CrisisCheckRequest,
     chat_service: ChatService = Depends(get_chat_service)
 ):
-    """Endpoint for crisis detection"""
-    message = request.get("message", "")
-    is_crisis = chat_service.detect_crisis(message)
-    
-    return {
+    """Endpoint for crisis detection, for a single message or a batch of messages"""
+    if request.messages is not None:
+        results = []
+        for message in request.messages:
+            matches = chat_service.find_crisis_matches(message)
+            results.append({
+                "is_crisis": bool(matches),
+                "matches": [match.model_dump() for match in matches]
+            })
+        is_crisis = any(result["is_crisis"] for result in results)
+
+        return FastJSONResponse({
+            "is_crisis": is_crisis,
+            "results": results,
+            "crisis_resources": CRISIS_RESOURCES if is_crisis else None
+        })
+
+    matches = chat_service.find_crisis_matches(request.message)
+    is_crisis = bool(matches)
+
+    return FastJSONResponse({
         "is_crisis": is_crisis,
+        "matches": [match.model_dump() for match in matches],
         "crisis_resources": CRISIS_RESOURCES if is_crisis else None
-    }
+    })
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Any, Dict, List
 import os
 from dotenv import load_dotenv
 
@@ -11,6 +11,19 @@ class Settings(BaseSettings):
     app_version: str = "1.0.0"
     debug: bool = False
     
+    # Server settings for `python -m app.serve` (0 workers: one per available CPU). Sessions,
+    # crisis follow-ups, rate limits, statistics and metrics live in each worker process, so
+    # more than one worker splits them; keep one worker per container and scale out replicas
+    server_host: str = "0.0.0.0"
+    server_port: int = 8000
+    server_workers: int = 1
+    server_max_requests: int = 10000
+    server_max_requests_jitter: int = 1000
+    server_keepalive_seconds: int = 5
+    server_backlog: int = 2048
+    server_graceful_timeout_seconds: int = 30
+    server_preload: bool = True
+    
     # CORS settings
     allowed_origins: List[str] = [
         "http://localhost:5173", 
@@ -18,12 +31,142 @@ class Settings(BaseSettings):
         "https://www.mindiri.com"
     ]
     
+    # Response compression (br when brotli is installed, else gzip); streamed responses are never compressed
+    compression_enabled: bool = True
+    compression_minimum_size: int = 1024
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
+    
+    # Request limits: bodies over the limit are rejected with 413 before they are fully read
+    # (the batch limit applies to /api/assessment/submit-batch, which takes large uploads)
+    request_max_body_bytes: int = 262144
+    request_max_batch_body_bytes: int = 33554432
+    chat_max_message_chars: int = 4000
+    chat_max_history_messages: int = 50
+    crisis_check_max_messages: int = 100
+    
+    # /metrics access: scrapers send `Authorization: Bearer <token>`; with no token it is only served
+    # to loopback clients that did not come through a proxy (a sidecar, or curl inside the container)
+    metrics_token: str = ""
+    
+    # Logging settings (sample rates: logger name -> fraction of records kept)
+    log_level: str = "INFO"
+    log_queue_enabled: bool = True
+    log_json: bool = False
+    log_sample_rates: Dict[str, float] = {}
+    log_redact_user_content: bool = True
+    log_redact_fields: List[str] = ["user_message", "bot_response"]
+    
     # Azure OpenAI settings
     azure_openai_api_key: str = os.getenv("AZURE_OPENAI_API_KEY", "")
     azure_openai_api_version: str = os.getenv("AZURE_OPENAI_API_VERSION", "")
     azure_openai_endpoint: str = os.getenv("AZURE_OPENAI_ENDPOINT", "")
     azure_openai_deployment_name: str = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME", "")
     
+    # Azure OpenAI resilience settings
+    azure_openai_max_concurrency: int = 64
+    azure_openai_max_concurrency_per_deployment: int = 32
+    azure_openai_max_retries: int = 3
+    azure_openai_backoff_base_seconds: float = 0.5
+    azure_openai_backoff_max_seconds: float = 8.0
+    azure_openai_request_deadline_seconds: float = 30.0
+    azure_openai_connect_timeout_seconds: float = 5.0
+    azure_openai_read_timeout_seconds: float = 20.0
+    azure_openai_circuit_failure_threshold: int = 5
+    azure_openai_circuit_recovery_seconds: float = 30.0
+    azure_openai_max_connections: int = 100
+    azure_openai_max_keepalive_connections: int = 20
+    azure_openai_keepalive_expiry_seconds: float = 30.0
+    # Endpoint pool: JSON list of {"name", "endpoint", "api_key", "api_version", "deployments"}
+    # (deployments maps logical deployment names to that endpoint's names); empty: the endpoint above
+    azure_openai_pool: List[Dict[str, Any]] = []
+    azure_openai_ewma_alpha: float = 0.2
+    azure_openai_probation_seconds: float = 60.0
+    azure_openai_probation_penalty: float = 4.0
+    # Hedging: retry on a second endpoint when the first is slower than the observed p95
+    azure_openai_hedging_enabled: bool = False
+    azure_openai_hedge_min_samples: int = 20
+    azure_openai_hedge_min_delay_seconds: float = 0.5
+    azure_openai_hedge_max_delay_seconds: float = 5.0
+    # Ask for token usage on streamed completions; only sent to endpoints whose api-version
+    # supports it (2024-09-01-preview or later), older ones would reject every stream
+    azure_openai_stream_usage: bool = True
+    # Connections opened to the endpoint at startup so the first chats skip the TLS handshake
+    azure_openai_prewarm_connections: int = 2
+    
+    # Model routing: simple turns go to the fast deployment (empty: route everything to the full model)
+    azure_openai_fast_deployment_name: str = ""
+    chat_routing_enabled: bool = True
+    chat_full_max_tokens: int = 500
+    chat_full_temperature: float = 0.7
+    chat_fast_max_tokens: int = 200
+    chat_fast_temperature: float = 0.6
+    chat_fast_max_message_chars: int = 120
+    chat_fast_max_history_messages: int = 6
+    chat_fast_risk_levels: List[str] = ["Rendah", "Sedang"]
+    
+    # Assessment settings (scoring config: JSON file overriding weights, thresholds and recommendations)
+    assessment_scoring_config_path: str = ""
+    assessment_questions_max_age: int = 3600
+    assessment_batch_max_rows: int = 10000
+    assessment_batch_chunk_rows: int = 1000
+    
+    # Assessment statistics settings
+    statistics_persistence_enabled: bool = True
+    statistics_sqlite_path: str = "assessment_statistics.db"
+    statistics_flush_interval_seconds: float = 10.0
+    statistics_snapshot_ttl_seconds: float = 1.0
+    
+    # Chat prompt settings (tokenizer: a tiktoken encoding such as "o200k_base",
+    # empty to use the built-in estimator)
+    chat_prompt_token_budget: int = 3000
+    chat_summary_max_chars: int = 800
+    chat_summary_cache_size: int = 2048
+    chat_tokenizer_encoding: str = ""
+    chat_coalesce_requests: bool = True
+    
+    # Admission control: while the event loop lags (lag_samples consecutive samples over the limit)
+    # or too many chat turns are in flight, new non-crisis turns are shed ("fallback": a busy reply
+    # marked `shed`, with Retry-After; "reject": 503 with Retry-After)
+    admission_enabled: bool = True
+    admission_max_loop_lag_seconds: float = 0.25
+    admission_lag_samples: int = 3
+    admission_max_inflight_chat: int = 128
+    admission_shed_mode: str = "fallback"
+    admission_retry_after_seconds: int = 5
+    admission_lag_interval_seconds: float = 0.1
+    
+    # Per-client rate limiting of chat turns, keyed by client IP: buckets refill over the window
+    # and are charged a request per turn plus the prompt+completion tokens Azure OpenAI reports.
+    # X-Forwarded-For entries appended by trusted proxies (the Container Apps ingress runs on a
+    # private network) are skipped from the right to find the client address
+    rate_limit_enabled: bool = True
+    rate_limit_trusted_proxies: List[str] = ["127.0.0.0/8", "10.0.0.0/8", "172.16.0.0/12", "192.168.0.0/16", "::1/128", "fc00::/7"]
+    rate_limit_window_seconds: float = 60.0
+    rate_limit_requests: int = 20
+    rate_limit_tokens: int = 40000
+    rate_limit_sweep_interval_seconds: float = 60.0
+    
+    # Crisis fast path: answer with a safety response, generate the counselor reply in the background
+    crisis_fast_path_enabled: bool = True
+    crisis_followup_ttl_seconds: int = 900
+    crisis_followup_max_entries: int = 1000
+    crisis_followup_max_wait_seconds: float = 25.0
+    
+    # Chat session settings (empty sqlite path: memory only, no spill)
+    chat_sessions_enabled: bool = True
+    session_max_sessions: int = 10000
+    session_idle_ttl_seconds: int = 1800
+    session_max_messages: int = 100
+    session_sqlite_path: str = ""
+    
+    # Completion cache settings (backend: "memory" or "sqlite")
+    completion_cache_enabled: bool = True
+    completion_cache_backend: str = "memory"
+    completion_cache_max_entries: int = 1024
+    completion_cache_ttl_seconds: int = 3600
+    completion_cache_sqlite_path: str = "completion_cache.db"
+    
     class Config:
         env_file = ".env"
 
@@ -129,14 +129,89 @@ ASSESSMENT_QUESTIONS = [
     }
 ]
 
-# Crisis Detection
-CRISIS_KEYWORDS = [
-    'bunuh diri', 'suicide', 'mengakhiri hidup', 'tidak ingin hidup lagi',
-    'mati saja', 'lebih baik mati', 'ingin mati', 'bunuh diri',
-    'menyakiti diri', 'self harm', 'melukai diri', 'potong urat nadi',
-    'hutang terlalu besar', 'tidak ada jalan keluar', 'hancur total',
-    'mau bunuh orang', 'balas dendam', 'semua salah mereka'
+# Precomputed question index: question id -> column in an answer matrix
+QUESTION_IDS = [question["id"] for category in ASSESSMENT_QUESTIONS for question in category["questions"]]
+QUESTION_INDEX = {question_id: column for column, question_id in enumerate(QUESTION_IDS)}
+QUESTION_MAX_VALUES = [
+    max(option["value"] for option in question["options"])
+    for category in ASSESSMENT_QUESTIONS
+    for question in category["questions"]
 ]
+MAX_SCORE = sum(QUESTION_MAX_VALUES)
+
+# Risk levels in ascending order, and the inclusive upper percentage bound of
+# every level but the last
+RISK_LEVELS = ["Rendah", "Sedang", "Tinggi", "Sangat Tinggi"]
+RISK_THRESHOLDS = [25, 50, 75]
+
+# Per-question score weights (question id -> weight); unlisted questions weigh 1
+QUESTION_WEIGHTS = {}
+
+# How each risk level is presented, and what it recommends
+RISK_LEVEL_DETAILS = {
+    "Rendah": {"color": "emerald", "description": "Risiko rendah kecanduan judi"},
+    "Sedang": {"color": "yellow", "description": "Risiko sedang - perlu perhatian"},
+    "Tinggi": {"color": "orange", "description": "Risiko tinggi - perlu bantuan profesional"},
+    "Sangat Tinggi": {"color": "red", "description": "Risiko sangat tinggi - segera cari bantuan"}
+}
+RISK_RECOMMENDATIONS = {
+    "Rendah": [
+        "✅ Pertahankan kebiasaan judi yang terkontrol",
+        "✅ Tetap awasi pengeluaran dan waktu yang dihabiskan",
+        "✅ Gunakan fitur AI Counselor untuk tips pencegahan"
+    ],
+    "Sedang": [
+        "⚠️ Mulai batasi waktu dan uang untuk judi",
+        "⚠️ Gunakan fitur AI Counselor untuk strategi coping",
+        "⚠️ Pertimbangkan untuk berbicara dengan keluarga atau teman",
+        "⚠️ Monitor perilaku judi Anda secara teratur"
+    ],
+    "Tinggi": [
+        "🚨 Segera cari bantuan dari profesional kesehatan mental",
+        "🚨 Gunakan AI Counselor untuk dukungan darurat",
+        "🚨 Pertimbangkan untuk bergabung dengan support group",
+        "🚨 Blokir akses ke situs judi online",
+        "🚨 Minta dukungan keluarga dan teman terdekat"
+    ],
+    "Sangat Tinggi": [
+        "🚨 Segera cari bantuan dari profesional kesehatan mental",
+        "🚨 Gunakan AI Counselor untuk dukungan darurat",
+        "🚨 Pertimbangkan untuk bergabung dengan support group",
+        "🚨 Blokir akses ke situs judi online",
+        "🚨 Minta dukungan keluarga dan teman terdekat",
+        "🚨 Hubungi hotline darurat jika merasa tidak aman"
+    ]
+}
+# Levels whose results include the crisis resources
+EMERGENCY_RISK_LEVELS = ["Tinggi", "Sangat Tinggi"]
+
+# Spellings of a risk level accepted from clients (matched case-insensitively,
+# with "_" and "-" treated as spaces) -> canonical level
+RISK_LEVEL_ALIASES = {level.lower(): level for level in RISK_LEVELS}
+RISK_LEVEL_ALIASES.update({
+    "low": "Rendah",
+    "medium": "Sedang",
+    "moderate": "Sedang",
+    "high": "Tinggi",
+    "very high": "Sangat Tinggi"
+})
+
+# Crisis Detection
+CRISIS_KEYWORD_CATEGORIES = {
+    "suicide": [
+        'bunuh diri', 'suicide', 'mengakhiri hidup', 'tidak ingin hidup lagi',
+        'mati saja', 'lebih baik mati', 'ingin mati'
+    ],
+    "self_harm": [
+        'menyakiti diri', 'self harm', 'melukai diri', 'potong urat nadi'
+    ],
+    "debt_despair": [
+        'hutang terlalu besar', 'tidak ada jalan keluar', 'hancur total'
+    ],
+    "violence": [
+        'mau bunuh orang', 'balas dendam', 'semua salah mereka'
+    ]
+}
 
 CRISIS_RESOURCES = [
     "🚨 Hotline Darurat: 119 (24 jam)",
@@ -145,6 +220,38 @@ CRISIS_RESOURCES = [
     "🌐 Into The Light: intothelightid.org"
 ]
 
+# Safety response sent immediately when a crisis is detected, before the
+# counselor's reply is generated; the middle sentence follows the user's risk level
+CRISIS_SAFETY_OPENING = "Terima kasih sudah mau bercerita kepada saya. Keselamatan Anda adalah yang paling penting saat ini."
+CRISIS_SAFETY_CLOSING = "Jika Anda merasa dalam bahaya atau ingin menyakiti diri sendiri, segera hubungi Hotline Darurat 119 (24 jam) atau minta orang yang Anda percaya untuk menemani Anda sekarang. Anda tidak sendirian. Saya akan melanjutkan percakapan kita sebentar lagi."
+CRISIS_SAFETY_BY_RISK_LEVEL = {
+    "Rendah": "Apa pun yang sedang Anda hadapi, perasaan seberat ini bisa dilalui dengan dukungan yang tepat.",
+    "Sedang": "Tekanan karena judi bisa terasa sangat berat, tetapi perasaan ini bisa dilalui dengan dukungan yang tepat.",
+    "Tinggi": "Beban karena judi dan utang bisa terasa tidak tertanggungkan, tetapi selalu ada jalan keluar dan orang yang siap membantu Anda.",
+    "Sangat Tinggi": "Beban karena judi dan utang bisa terasa tidak tertanggungkan, tetapi selalu ada jalan keluar dan orang yang siap membantu Anda, termasuk malam ini."
+}
+CRISIS_SAFETY_DEFAULT = "Apa pun yang sedang Anda hadapi, perasaan seberat ini bisa dilalui dengan dukungan yang tepat."
+CRISIS_SAFETY_RESPONSES = {
+    level: f"{CRISIS_SAFETY_OPENING} {middle} {CRISIS_SAFETY_CLOSING}"
+    for level, middle in CRISIS_SAFETY_BY_RISK_LEVEL.items()
+}
+CRISIS_SAFETY_RESPONSE_DEFAULT = f"{CRISIS_SAFETY_OPENING} {CRISIS_SAFETY_DEFAULT} {CRISIS_SAFETY_CLOSING}"
+
+# Fallback response when the AI Counselor is unavailable
+FALLBACK_RESPONSE = "Maaf, saya mengalami gangguan teknis. Silakan coba lagi dalam beberapa saat. Jika Anda dalam keadaan darurat, hubungi 119 atau layanan kesehatan mental terdekat."
+
+# Reply to a chat turn shed by admission control while the server is overloaded
+SHED_RESPONSE = "Maaf, layanan sedang sangat sibuk. Silakan kirim pesan Anda lagi dalam beberapa saat. Jika Anda dalam keadaan darurat, hubungi 119 atau layanan kesehatan mental terdekat."
+
+# Topics that always get the full counselor model, whatever the message length
+COMPLEX_TOPIC_KEYWORDS = [
+    "utang", "hutang", "pinjol", "pinjaman", "keluarga", "istri", "suami", "anak", "orang tua",
+    "cerai", "kambuh", "relapse", "depresi", "cemas", "stres", "putus asa", "dipecat", "kerja"
+]
+
+# Per-user context appended after the system prompt, one variant per risk level
+RISK_LEVEL_PROMPT = "INFORMASI PENGGUNA: Tingkat risiko kecanduan judi pengguna adalah '{level}'. Sesuaikan pendekatan Anda dengan tingkat risiko ini."
+
 # CBT System Prompt
 SYSTEM_PROMPT = """Anda adalah AIRA, seorang AI Counselor yang menggunakan pendekatan Cognitive Behavioral Therapy (CBT) dengan spesialisasi dalam mengatasi kecanduan judi. Anda berbicara dalam bahasa Indonesia dengan hangat, empati, dan profesional.
 
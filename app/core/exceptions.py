@@ -6,10 +6,18 @@ class AssessmentException(GamblingAPIException):
     """Exception for assessment-related errors"""
     pass
 
+class InvalidAnswersException(AssessmentException):
+    """Exception for answers with unknown question ids or out-of-range values"""
+    pass
+
 class ChatException(GamblingAPIException):
     """Exception for chat-related errors"""
     pass
 
 class AzureOpenAIException(GamblingAPIException):
     """Exception for Azure OpenAI-related errors"""
-    pass
\ No newline at end of file
+    pass
+
+class CircuitOpenException(AzureOpenAIException):
+    """Exception raised when Azure OpenAI is short-circuited as unhealthy"""
+    pass
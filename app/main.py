@@ -1,20 +1,58 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from contextlib import asynccontextmanager
 from datetime import datetime
+import ipaddress
 import os
+import secrets
 
 from app.config.settings import settings
 from app.api.routes import assessment, chat
+from app.middleware.admission import AdmissionMiddleware
+from app.middleware.body_limit import BodySizeLimitMiddleware
+from app.middleware.compression import CompressionMiddleware
+from app.middleware.metrics import MetricsMiddleware
+from app.services.chat_service import inflight_chats
+from app.services.container import services
 from app.utils.logging import setup_logging
+from app.utils.metrics import registry
+from app.utils.responses import FastJSONResponse
 
 # Setup logging
 setup_logging()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await services.start()
+    app.state.services = services
+    try:
+        yield
+    finally:
+        await services.stop()
+
 # Initialize FastAPI app
 app = FastAPI(
     title=settings.app_name,
     version=settings.app_version,
-    debug=settings.debug
+    debug=settings.debug,
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
+)
+
+if settings.compression_enabled:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression_minimum_size,
+        gzip_level=settings.compression_gzip_level,
+        brotli_quality=settings.compression_brotli_quality
+    )
+
+# Inside CORS, so 413 responses still carry the CORS headers
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    max_body_bytes=settings.request_max_body_bytes,
+    path_limits={"/api/assessment/submit-batch": settings.request_max_batch_body_bytes}
 )
 
 # Enable CORS
@@ -26,23 +64,100 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Sheds chat turns under overload; inside metrics so shed requests are still measured
+app.add_middleware(AdmissionMiddleware, controller=services.admission)
+
+# Outermost, so latency covers every other middleware
+app.add_middleware(MetricsMiddleware)
+
+# Service state read at scrape time
+registry.gauge_callback(
+    "azure_openai_circuit_open", "1 while the Azure OpenAI circuit breaker is open", (),
+    lambda: {(): 1 if services.azure_openai.circuit_state == "open" else 0}
+)
+# Per-member pool detail; /metrics is only served to local or authenticated scrapers, unlike /health
+registry.gauge_callback(
+    "azure_openai_endpoint_circuit_open", "1 while a pool member's circuit breaker is open", ("member",),
+    lambda: {(member.name,): 1 if member.circuit_breaker.state == "open" else 0 for member in services.azure_openai.pool.members}
+)
+registry.gauge_callback(
+    "azure_openai_endpoint_outstanding", "Requests in flight per pool member", ("member",),
+    lambda: {(member.name,): member.outstanding for member in services.azure_openai.pool.members}
+)
+registry.gauge_callback(
+    "azure_openai_endpoint_latency_ewma_seconds", "Smoothed upstream latency per pool member and mode", ("member", "mode"),
+    lambda: {
+        (member.name, mode): latency
+        for member in services.azure_openai.pool.members
+        for mode, latency in member.ewma.items()
+        if latency is not None
+    }
+)
+registry.gauge_callback(
+    "event_loop_lag_seconds", "Smoothed event-loop lag measured by admission control", (),
+    lambda: {(): services.admission.loop_lag}
+)
+registry.gauge_callback(
+    "http_requests_in_flight", "Requests in flight by route class", ("route_class",),
+    lambda: {(route_class,): count for route_class, count in services.admission.inflight.items()}
+)
+registry.gauge_callback(
+    "rate_limit_clients", "Clients with rate-limit buckets held in memory", (),
+    lambda: {(): len(services.rate_limiter.clients)}
+)
+registry.gauge_callback(
+    "chat_sessions_active", "Conversation sessions held in memory", (),
+    lambda: {(): len(services.sessions)}
+)
+registry.gauge_callback(
+    "chat_coalesced_requests", "Chat requests served by joining an identical in-flight call", (),
+    lambda: {(): inflight_chats.coalesced}
+)
+if services.completion_cache is not None:
+    registry.gauge_callback(
+        "completion_cache_lookups", "Completion cache lookups by result", ("result",),
+        lambda: {("hit",): services.completion_cache.hits, ("miss",): services.completion_cache.misses}
+    )
+
 # Include routers
 app.include_router(assessment.router)
 app.include_router(chat.router)
 
 @app.get("/")
 async def root():
-    return {"message": f"{settings.app_name} is running"}
+    return FastJSONResponse({"message": f"{settings.app_name} is running"})
 
 @app.get("/health")
 async def health_check():
-    return {
-        "status": "healthy", 
+    return FastJSONResponse({
+        "status": "healthy",
         "timestamp": datetime.now().isoformat(),
         "services": ["assessment", "chat_counselor"],
-        "azure_openai_configured": bool(settings.azure_openai_api_key)
-    }
+        "azure_openai_configured": services.azure_openai.configured,
+        "azure_openai_circuit": services.azure_openai.circuit_state,
+        "completion_cache": services.completion_cache.stats() if services.completion_cache is not None else None
+    })
+
+def _metrics_allowed(request: Request) -> bool:
+    """A scraper with the metrics token, or without one a loopback client that did not come through a proxy"""
+    if settings.metrics_token:
+        return secrets.compare_digest(request.headers.get("authorization", ""), f"Bearer {settings.metrics_token}")
+    if "x-forwarded-for" in request.headers or request.client is None:
+        return False
+    try:
+        return ipaddress.ip_address(request.client.host).is_loopback
+    except ValueError:
+        return False
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    if not _metrics_allowed(request):
+        if settings.metrics_token:
+            raise HTTPException(status_code=401, detail="Metrics token required", headers={"WWW-Authenticate": "Bearer"})
+        raise HTTPException(status_code=403, detail="Metrics are only served locally unless METRICS_TOKEN is set")
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
 
 if __name__ == "__main__":
+    # Development server; use `python -m app.serve` in production
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
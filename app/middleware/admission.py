@@ -0,0 +1,27 @@
+from app.services.admission import AdmissionController, classify_path
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware counting in-flight requests per route class.
+
+    When the controller decides a chat turn should be shed, the reason is
+    put in the request state (`request.state.shed_reason`); the chat routes
+    then answer it with a 503 or a busy reply marked as shed without calling
+    Azure OpenAI, unless the message is crisis-flagged. Streamed responses count
+    as in flight until their last chunk is sent.
+    """
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route_class = classify_path(scope["path"])
+        shed_reason = self.controller.shed_reason(route_class)
+        if shed_reason is not None:
+            scope.setdefault("state", {})["shed_reason"] = shed_reason
+        with self.controller.track(route_class):
+            await self.app(scope, receive, send)
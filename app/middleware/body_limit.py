@@ -0,0 +1,47 @@
+from typing import Dict, Optional
+from fastapi import HTTPException
+from app.utils.responses import FastJSONResponse
+
+class BodySizeLimitMiddleware:
+    """Pure ASGI middleware rejecting oversized request bodies with 413.
+
+    A Content-Length over the limit is answered before any of the body is
+    read. Bodies without one (chunked uploads) are counted as they stream
+    in, and reading stops with a 413 as soon as the limit is crossed, so an
+    oversized payload is never buffered or parsed in full.
+    """
+
+    def __init__(self, app, max_body_bytes: int, path_limits: Optional[Dict[str, int]] = None):
+        self.app = app
+        self.max_body_bytes = max_body_bytes
+        # Exact path -> limit, for routes that take large uploads
+        self.path_limits = path_limits or {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.path_limits.get(scope["path"], self.max_body_bytes)
+        detail = f"Request body too large: at most {limit} bytes"
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                if value.isdigit() and int(value) > limit:
+                    response = FastJSONResponse({"detail": detail}, status_code=413, headers={"Connection": "close"})
+                    await response(scope, receive, send)
+                    return
+                break
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Re-raised by FastAPI's body parsing and answered by its exception handler
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -0,0 +1,96 @@
+from app.utils.precompiled import brotli, parse_accept_encoding
+import gzip
+
+# Content types worth compressing; anything else (images, already-packed data) passes through
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "application/problem+json", "text/plain", "text/html")
+
+class CompressionMiddleware:
+    """Pure ASGI middleware compressing complete responses with br or gzip.
+
+    Only single-message bodies of at least `minimum_size` bytes are
+    compressed. Streamed responses (SSE, chunked bodies) and responses that
+    already carry a Content-Encoding, such as the precompiled question bank,
+    are passed through untouched so tokens still reach the client as soon as
+    they are sent.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _choose_encoding(self, scope) -> str:
+        header = None
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                header = value.decode("latin-1")
+                break
+        accepted = parse_accept_encoding(header)
+        wildcard = accepted.get("*", 0.0)
+        if brotli is not None and accepted.get("br", wildcard) > 0:
+            return "br"
+        if accepted.get("gzip", wildcard) > 0:
+            return "gzip"
+        return ""
+
+    def _compress(self, encoding: str, body: bytes) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = self._choose_encoding(scope)
+        if not encoding:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                headers = {name.lower(): value for name, value in message.get("headers", [])}
+                content_type = headers.get(b"content-type", b"").decode("latin-1").lower()
+                if b"content-encoding" in headers or not content_type.startswith(COMPRESSIBLE_TYPES):
+                    passthrough = True
+                    await send(message)
+                    return
+                # Held back until the body shows whether the response is worth compressing
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            passthrough = True
+            if message.get("more_body", False) or len(body) < self.minimum_size:
+                await send(start_message)
+                await send(message)
+                return
+
+            compressed = self._compress(encoding, body)
+            headers = [
+                (name, value) for name, value in start_message.get("headers", [])
+                if name.lower() not in (b"content-length", b"vary")
+            ]
+            vary = [value for name, value in start_message.get("headers", []) if name.lower() == b"vary"]
+            headers.append((b"content-encoding", encoding.encode("latin-1")))
+            headers.append((b"content-length", str(len(compressed)).encode("latin-1")))
+            if b"accept-encoding" not in b",".join(vary).lower():
+                vary.append(b"Accept-Encoding")
+            headers.append((b"vary", b", ".join(vary)))
+            await send({**start_message, "headers": headers})
+            await send({**message, "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,39 @@
+from app.utils.metrics import HTTP_REQUEST_DURATION
+import time
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording request latency per route template.
+
+    Routes are labelled by their template (e.g. /api/chat/stream), never by
+    the raw path, so label cardinality stays bounded. Streaming responses
+    are timed until the last chunk has been sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router stores the matched route in the (shared) scope
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - started,
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status)
+            )
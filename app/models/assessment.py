@@ -1,9 +1,18 @@
-from pydantic import BaseModel
-from typing import List, Dict, Optional
+from pydantic import BaseModel, Field
+from typing import Annotated, List, Dict, Literal, Optional
+from app.core.constants import QUESTION_IDS, QUESTION_MAX_VALUES
+
+QuestionId = Literal[tuple(QUESTION_IDS)]
+AnswerValue = Annotated[int, Field(strict=True, ge=0, le=max(QUESTION_MAX_VALUES))]
 
 class AssessmentAnswer(BaseModel):
-    answers: Dict[str, int]
-    timestamp: str
+    answers: Dict[QuestionId, AnswerValue] = Field(max_length=len(QUESTION_IDS))
+    timestamp: str = Field(max_length=64)
+
+class BatchSubmission(BaseModel):
+    """A batch row; invalid answers are reported per row by the scorer, not rejected up front"""
+    answers: Dict[str, int] = Field(max_length=len(QUESTION_IDS))
+    timestamp: str = Field(max_length=64)
 
 class RiskAssessment(BaseModel):
     level: str
@@ -15,8 +24,30 @@ class AssessmentScore(BaseModel):
     max_score: int
     percentage: float
 
+class CategoryScore(BaseModel):
+    category: str
+    score: int
+    max_score: int
+    percentage: float
+    risk_level: str
+
 class AssessmentResult(BaseModel):
     risk_assessment: RiskAssessment
     score: AssessmentScore
     recommendations: List[str]
     emergency_contacts: Optional[List[str]] = None
+    category_scores: Optional[List[CategoryScore]] = None
+
+class AssessmentBatchRequest(BaseModel):
+    submissions: List[BatchSubmission]
+
+class AssessmentBatchItem(BaseModel):
+    index: int
+    result: Optional[AssessmentResult] = None
+    error: Optional[str] = None
+
+class AssessmentBatchResult(BaseModel):
+    results: List[AssessmentBatchItem]
+    total: int
+    scored: int
+    risk_distribution: Dict[str, int]
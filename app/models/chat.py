@@ -1,16 +1,74 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import Annotated, Any, List, Literal, Optional
+from app.config.settings import settings
+from app.core.constants import RISK_LEVEL_ALIASES
+
+def normalize_risk_level(value: Optional[str]) -> Optional[str]:
+    """Map a client-supplied risk level to a canonical one; unknown values become None"""
+    if not value:
+        return None
+    key = " ".join(value.replace("_", " ").replace("-", " ").split()).lower()
+    return RISK_LEVEL_ALIASES.get(key)
 
 class Message(BaseModel):
-    role: str  # "user" or "assistant"
-    content: str
+    # The system prompt is the server's own; clients cannot inject system turns
+    role: Literal["user", "assistant"]
+    content: str = Field(max_length=settings.chat_max_message_chars)
 
 class ChatRequest(BaseModel):
-    message: str
+    message: str = Field(min_length=1, max_length=settings.chat_max_message_chars)
     conversation_history: Optional[List[Message]] = []
-    user_risk_level: Optional[str] = None
+    user_risk_level: Optional[str] = Field(default=None, max_length=32)
+    session_id: Optional[str] = Field(default=None, max_length=64)
+
+    @field_validator("conversation_history", mode="before")
+    @classmethod
+    def recent_history(cls, value: Any) -> Any:
+        # Older turns would be summarized away anyway; drop them before they are validated
+        if isinstance(value, list) and len(value) > settings.chat_max_history_messages:
+            return value[-settings.chat_max_history_messages:]
+        return value
+
+    @field_validator("user_risk_level")
+    @classmethod
+    def canonical_risk_level(cls, value: Optional[str]) -> Optional[str]:
+        # Only known levels reach the prompt, keeping the prompt prefix to a few fixed variants
+        return normalize_risk_level(value)
 
 class ChatResponse(BaseModel):
     response: str
     is_crisis: bool = False
-    crisis_resources: Optional[List[str]] = None
\ No newline at end of file
+    crisis_resources: Optional[List[str]] = None
+    prompt_tokens: Optional[int] = None
+    session_id: Optional[str] = None
+    # Crisis fast path: the counselor's reply is generated in the background
+    follow_up_id: Optional[str] = None
+    # A counselor follow-up from an earlier crisis turn, delivered with this turn
+    follow_up: Optional[str] = None
+    # Not answered by the counselor: shed by admission control while the server was overloaded
+    shed: bool = False
+
+class FollowUpResponse(BaseModel):
+    follow_up_id: str
+    status: str  # "pending", "ready" or "failed"
+    response: Optional[str] = None
+    session_id: Optional[str] = None
+
+class CrisisCheckRequest(BaseModel):
+    """A single message, or a batch of messages checked one by one"""
+    message: Optional[str] = Field(default=None, max_length=settings.chat_max_message_chars)
+    messages: Optional[List[Annotated[str, Field(max_length=settings.chat_max_message_chars)]]] = Field(
+        default=None, max_length=settings.crisis_check_max_messages
+    )
+
+    @model_validator(mode="after")
+    def message_or_messages(self) -> "CrisisCheckRequest":
+        if self.message is None and self.messages is None:
+            raise ValueError("Either message or messages is required")
+        return self
+
+class CrisisMatch(BaseModel):
+    keyword: str
+    category: str
+    start: int  # offset in the original message
+    end: int
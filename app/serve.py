@@ -0,0 +1,134 @@
+"""Production server entrypoint: `python -m app.serve`.
+
+Runs settings.server_workers workers (0: one per available CPU). The app
+is imported once in the gunicorn master and forked into uvicorn workers,
+which are recycled with jitter; without gunicorn, uvicorn's own process
+manager is used and workers are not recycled. uvloop and httptools are
+picked up automatically when installed.
+
+Sessions, crisis follow-ups, rate-limit buckets, assessment statistics
+and metrics are held per process, so with several workers they depend on
+which worker answers; one worker is the default until they are shared.
+"""
+from app.config.settings import settings
+import importlib.util
+import logging
+import math
+import os
+
+logger = logging.getLogger("app.serve")
+
+APP = "app.main:app"
+
+def available_cpus() -> int:
+    """CPUs this process may use, honouring affinity and cgroup CPU quotas"""
+    try:
+        count = len(os.sched_getaffinity(0))
+    except AttributeError:
+        count = os.cpu_count() or 1
+
+    quota = None
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            limit, period = f.read().split()[:2]
+        if limit != "max":
+            quota = int(limit) / int(period)
+    except (OSError, ValueError):
+        try:
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+                limit = int(f.read())
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+                period = int(f.read())
+            if limit > 0:
+                quota = limit / period
+        except (OSError, ValueError):
+            pass
+
+    if quota is not None:
+        count = min(count, math.ceil(quota))
+    return max(1, count)
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+def _uvicorn_worker_class() -> str:
+    # The worker class moved to the uvicorn-worker package
+    if _installed("uvicorn_worker"):
+        return "uvicorn_worker.UvicornWorker"
+    return "uvicorn.workers.UvicornWorker"
+
+def _run_gunicorn(workers: int):
+    from gunicorn.app.base import BaseApplication
+
+    def post_fork(server, worker):
+        # The logging listener thread does not survive fork
+        from app.utils.logging import setup_logging
+        setup_logging()
+
+    options = {
+        "bind": f"{settings.server_host}:{settings.server_port}",
+        "workers": workers,
+        "worker_class": _uvicorn_worker_class(),
+        "preload_app": settings.server_preload,
+        "max_requests": settings.server_max_requests,
+        "max_requests_jitter": settings.server_max_requests_jitter,
+        "keepalive": settings.server_keepalive_seconds,
+        "backlog": settings.server_backlog,
+        "graceful_timeout": settings.server_graceful_timeout_seconds,
+        "post_fork": post_fork
+    }
+
+    class Application(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from app.main import app
+            return app
+
+    Application().run()
+
+def _run_uvicorn(workers: int):
+    import uvicorn
+
+    # Without a master that imports the app, each worker imports it itself
+    uvicorn.run(
+        APP,
+        host=settings.server_host,
+        port=settings.server_port,
+        workers=workers,
+        loop="uvloop" if _installed("uvloop") else "asyncio",
+        http="httptools" if _installed("httptools") else "h11",
+        backlog=settings.server_backlog,
+        timeout_keep_alive=settings.server_keepalive_seconds,
+        timeout_graceful_shutdown=settings.server_graceful_timeout_seconds,
+        # WebSocket frames get the same bound as HTTP request bodies
+        ws_max_size=settings.request_max_body_bytes,
+        # No recycling: uvicorn has no jitter, so every worker would restart at once
+        # Logging is configured by the app itself
+        log_config=None
+    )
+
+def main():
+    from app.utils.logging import setup_logging
+    setup_logging()
+
+    workers = settings.server_workers or available_cpus()
+    server = "gunicorn" if _installed("gunicorn") else "uvicorn"
+    if workers > 1:
+        logger.warning(
+            f"Running {workers} workers: sessions, crisis follow-ups, rate limits, statistics and "
+            f"metrics are per worker, and the effective rate limit is {workers}x the configured one"
+        )
+    logger.info(
+        f"Starting {workers} {server} worker(s) on {settings.server_host}:{settings.server_port} "
+        f"(uvloop: {_installed('uvloop')}, httptools: {_installed('httptools')})"
+    )
+    if server == "gunicorn":
+        _run_gunicorn(workers)
+    else:
+        _run_uvicorn(workers)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+from contextlib import contextmanager
+from typing import Dict, Optional
+from app.config.settings import settings
+import asyncio
+
+# Route classes; only "chat" is ever shed
+ROUTE_CLASSES = ("chat", "crisis", "assessment", "health", "other")
+
+# Chat turns that reach Azure OpenAI; crisis checks and follow-ups are cheap and always served
+SHEDDABLE_CHAT_PATHS = ("/api/chat", "/api/chat/stream")
+
+# Smoothing of the reported event-loop lag
+LAG_EWMA_ALPHA = 0.2
+
+def classify_path(path: str) -> str:
+    if path in SHEDDABLE_CHAT_PATHS:
+        return "chat"
+    if path == "/api/chat/crisis-check":
+        return "crisis"
+    if path.startswith("/api/assessment"):
+        return "assessment"
+    if path in ("/", "/health", "/metrics"):
+        return "health"
+    return "other"
+
+class AdmissionController:
+    """Decides whether new chat turns are admitted or shed.
+
+    A background task measures event-loop lag: how late a short sleep
+    wakes up. Only sustained lag sheds: several consecutive samples must
+    be over the limit, so a single stall (a GC pause, a slow import) does
+    not shed a burst of turns. `loop_lag` is an EWMA of the samples, for
+    metrics. In-flight requests are counted per route class. Chat turns
+    are shed while either signal is over its limit; callers still serve
+    crisis messages, which are never shed.
+    """
+
+    def __init__(self):
+        self.inflight: Dict[str, int] = dict.fromkeys(ROUTE_CLASSES, 0)
+        self.loop_lag = 0.0
+        # Consecutive lag samples over the limit
+        self.lagging_samples = 0
+        self._monitor_task: Optional[asyncio.Task] = None
+
+    def observe_lag(self, lag: float):
+        """Record one event-loop lag sample"""
+        self.loop_lag += LAG_EWMA_ALPHA * (lag - self.loop_lag)
+        if lag > settings.admission_max_loop_lag_seconds:
+            self.lagging_samples += 1
+        else:
+            self.lagging_samples = 0
+
+    async def _monitor(self, interval: float):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(interval)
+            self.observe_lag(max(0.0, loop.time() - started - interval))
+
+    async def start(self):
+        if settings.admission_enabled:
+            self._monitor_task = asyncio.create_task(self._monitor(settings.admission_lag_interval_seconds))
+
+    async def stop(self):
+        if self._monitor_task is not None:
+            self._monitor_task.cancel()
+            self._monitor_task = None
+
+    def shed_reason(self, route_class: str) -> Optional[str]:
+        """Why a new request of this class should be shed, or None to admit it"""
+        if not settings.admission_enabled or route_class != "chat":
+            return None
+        if self.lagging_samples >= settings.admission_lag_samples:
+            return "loop_lag"
+        if self.inflight["chat"] >= settings.admission_max_inflight_chat:
+            return "inflight"
+        return None
+
+    @contextmanager
+    def track(self, route_class: str):
+        """Count a request as in flight for its duration"""
+        self.inflight[route_class] += 1
+        try:
+            yield
+        finally:
+            self.inflight[route_class] -= 1
+
+admission_controller = AdmissionController()
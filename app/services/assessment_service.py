@@ -1,12 +1,40 @@
-from typing import List, Optional
-from app.models.assessment import RiskAssessment, AssessmentScore, AssessmentResult
-from app.core.constants import ASSESSMENT_QUESTIONS, CRISIS_RESOURCES
+from typing import Dict, List, NamedTuple, Optional, Sequence
+from app.models.assessment import (
+    RiskAssessment, AssessmentScore, AssessmentResult, AssessmentBatchItem, AssessmentBatchResult
+)
+from app.core.constants import ASSESSMENT_QUESTIONS
 from app.core.exceptions import AssessmentException
+from app.services.scoring_engine import scoring_engine
+from app.services.statistics_service import assessment_statistics
 import logging
 
 logger = logging.getLogger(__name__)
 
+# numpy is optional and slow to import, so it is loaded at startup (warm_up) or on the first batch
+_np = False
+
+def _numpy():
+    global _np
+    if _np is False:
+        try:
+            import numpy
+        except ImportError:  # optional: batch scoring falls back to pure Python
+            numpy = None
+        _np = numpy
+    return _np
+
+class BatchScore(NamedTuple):
+    total_score: int = 0
+    percentage: float = 0.0
+    level_index: int = 0
+    error: Optional[str] = None
+
 class AssessmentService:
+    @staticmethod
+    def warm_up():
+        """Import numpy for batch scoring before the first batch arrives"""
+        _numpy()
+
     @staticmethod
     def get_questions():
         """Get all assessment questions"""
@@ -15,116 +43,137 @@ class AssessmentService:
     @staticmethod
     def calculate_risk_assessment(total_score: int, max_score: int) -> RiskAssessment:
         """Calculate risk assessment based on total score"""
-        try:
-            percentage = (total_score / max_score) * 100 if max_score > 0 else 0
-            
-            if percentage <= 25:
-                return RiskAssessment(
-                    level="Rendah",
-                    color="emerald",
-                    description="Risiko rendah kecanduan judi"
-                )
-            elif percentage <= 50:
-                return RiskAssessment(
-                    level="Sedang",
-                    color="yellow",
-                    description="Risiko sedang - perlu perhatian"
-                )
-            elif percentage <= 75:
-                return RiskAssessment(
-                    level="Tinggi",
-                    color="orange",
-                    description="Risiko tinggi - perlu bantuan profesional"
-                )
-            else:
-                return RiskAssessment(
-                    level="Sangat Tinggi",
-                    color="red",
-                    description="Risiko sangat tinggi - segera cari bantuan"
-                )
-        except Exception as e:
-            logger.error(f"Error calculating risk assessment: {str(e)}")
-            raise AssessmentException(f"Failed to calculate risk assessment: {str(e)}")
+        scoring = scoring_engine.compile()
+        percentage = (total_score / max_score) * 100 if max_score > 0 else 0
+        return scoring.fragments[scoring.level_index(percentage)].risk_assessment
     
     @staticmethod
     def get_recommendations(risk_level: str) -> List[str]:
         """Get recommendations based on risk level"""
-        recommendations = {
-            "Rendah": [
-                "✅ Pertahankan kebiasaan judi yang terkontrol",
-                "✅ Tetap awasi pengeluaran dan waktu yang dihabiskan",
-                "✅ Gunakan fitur AI Counselor untuk tips pencegahan"
-            ],
-            "Sedang": [
-                "⚠️ Mulai batasi waktu dan uang untuk judi",
-                "⚠️ Gunakan fitur AI Counselor untuk strategi coping",
-                "⚠️ Pertimbangkan untuk berbicara dengan keluarga atau teman",
-                "⚠️ Monitor perilaku judi Anda secara teratur"
-            ],
-            "Tinggi": [
-                "🚨 Segera cari bantuan dari profesional kesehatan mental",
-                "🚨 Gunakan AI Counselor untuk dukungan darurat",
-                "🚨 Pertimbangkan untuk bergabung dengan support group",
-                "🚨 Blokir akses ke situs judi online",
-                "🚨 Minta dukungan keluarga dan teman terdekat"
-            ],
-            "Sangat Tinggi": [
-                "🚨 Segera cari bantuan dari profesional kesehatan mental",
-                "🚨 Gunakan AI Counselor untuk dukungan darurat",
-                "🚨 Pertimbangkan untuk bergabung dengan support group",
-                "🚨 Blokir akses ke situs judi online",
-                "🚨 Minta dukungan keluarga dan teman terdekat",
-                "🚨 Hubungi hotline darurat jika merasa tidak aman"
-            ]
-        }
-        return recommendations.get(risk_level, [])
+        fragment = scoring_engine.compile().fragment_by_level.get(risk_level)
+        return fragment.recommendations if fragment is not None else []
     
     @staticmethod
     def get_emergency_contacts(risk_level: str) -> Optional[List[str]]:
         """Get emergency contacts for high-risk users"""
-        if risk_level in ["Tinggi", "Sangat Tinggi"]:
-            return CRISIS_RESOURCES
-        return None
+        fragment = scoring_engine.compile().fragment_by_level.get(risk_level)
+        return fragment.emergency_contacts if fragment is not None else None
     
     @staticmethod
     def process_assessment(answers: dict) -> AssessmentResult:
         """Process assessment answers and return results"""
+        scoring = scoring_engine.compile()
+        # Validates the answers in the same pass; raises InvalidAnswersException
+        card = scoring.score(answers)
+        
+        fragment = scoring.fragments[card.level_index]
+        result = AssessmentResult.model_construct(
+            risk_assessment=fragment.risk_assessment,
+            score=AssessmentScore.model_construct(
+                total_score=card.total_score,
+                max_score=scoring.max_score,
+                percentage=card.percentage
+            ),
+            recommendations=fragment.recommendations,
+            emergency_contacts=fragment.emergency_contacts,
+            category_scores=scoring.category_scores(card.category_totals, card.category_weighted)
+        )
+        
+        assessment_statistics.record(card.total_score, fragment.risk_assessment.level, answers)
+        
+        logger.info(f"Assessment completed - Risk Level: {fragment.risk_assessment.level}, Score: {card.total_score}/{scoring.max_score}")
+        return result
+    
+    @staticmethod
+    def score_batch(answer_sets: Sequence[Dict[str, int]]) -> List[BatchScore]:
+        """Validate and score many answer sets at once with column-wise array math"""
+        scoring = scoring_engine.compile()
+        width = len(scoring.question_ids)
+        rows = []
+        errors: Dict[int, str] = {}
+        for index, answers in enumerate(answer_sets):
+            row = [0] * width
+            error = scoring.fill_row(answers, row)
+            if error:
+                errors[index] = error
+            else:
+                rows.append(row)
+        
+        np = _numpy() if rows else None
+        if np is not None:
+            matrix = np.asarray(rows, dtype=np.int32)
+            totals = matrix.sum(axis=1).tolist()
+            percentages_array = (matrix @ np.asarray(scoring.weights)) * scoring.percent_factor
+            level_indexes = np.searchsorted(scoring.thresholds, percentages_array, side="left").tolist()
+            percentages = percentages_array.tolist()
+        else:
+            weights = scoring.weights
+            totals = [sum(row) for row in rows]
+            percentages = [
+                sum(value * weight for value, weight in zip(row, weights)) * scoring.percent_factor
+                for row in rows
+            ]
+            level_indexes = [scoring.level_index(percentage) for percentage in percentages]
+        
+        scores = []
+        scored = iter(zip(totals, percentages, level_indexes))
+        for index in range(len(answer_sets)):
+            if index in errors:
+                scores.append(BatchScore(error=errors[index]))
+            else:
+                total, percentage, level_index = next(scored)
+                scores.append(BatchScore(total, round(percentage, 2), level_index))
+        return scores
+    
+    @staticmethod
+    def record_batch(answer_sets: Sequence[Dict[str, int]], scores: Sequence[BatchScore]):
+        """Count the successfully scored rows of a batch in the statistics"""
+        levels = scoring_engine.compile().levels
+        for answers, score in zip(answer_sets, scores):
+            if not score.error:
+                assessment_statistics.record(score.total_score, levels[score.level_index], answers)
+    
+    @staticmethod
+    def process_batch(answer_sets: Sequence[Dict[str, int]]) -> AssessmentBatchResult:
+        """Score a batch of answer sets and aggregate the risk distribution"""
         try:
-            # Calculate total possible score
-            max_score = sum(len(category["questions"]) for category in ASSESSMENT_QUESTIONS) * 3
-            
-            # Calculate user's total score
-            total_score = sum(answers.values())
+            scoring = scoring_engine.compile()
+            scores = AssessmentService.score_batch(answer_sets)
+            AssessmentService.record_batch(answer_sets, scores)
             
-            # Calculate percentage
-            percentage = (total_score / max_score) * 100 if max_score > 0 else 0
+            results = []
+            distribution = dict.fromkeys(scoring.levels, 0)
+            for index, score in enumerate(scores):
+                if score.error:
+                    results.append(AssessmentBatchItem(index=index, error=score.error))
+                    continue
+                # Result fragments are shared by every row with the same risk level
+                fragment = scoring.fragments[score.level_index]
+                distribution[fragment.risk_assessment.level] += 1
+                results.append(AssessmentBatchItem.model_construct(
+                    index=index,
+                    result=AssessmentResult.model_construct(
+                        risk_assessment=fragment.risk_assessment,
+                        score=AssessmentScore.model_construct(
+                            total_score=score.total_score,
+                            max_score=scoring.max_score,
+                            percentage=score.percentage
+                        ),
+                        recommendations=fragment.recommendations,
+                        emergency_contacts=fragment.emergency_contacts,
+                        category_scores=None
+                    ),
+                    error=None
+                ))
             
-            # Get risk assessment
-            risk_assessment = AssessmentService.calculate_risk_assessment(total_score, max_score)
-            
-            # Get recommendations
-            recommendations = AssessmentService.get_recommendations(risk_assessment.level)
-            
-            # Get emergency contacts if needed
-            emergency_contacts = AssessmentService.get_emergency_contacts(risk_assessment.level)
-            
-            # Create score object
-            score = AssessmentScore(
-                total_score=total_score,
-                max_score=max_score,
-                percentage=round(percentage, 2)
+            scored = sum(distribution.values())
+            logger.info(f"Batch assessment completed - {scored}/{len(answer_sets)} scored")
+            return AssessmentBatchResult(
+                results=results,
+                total=len(answer_sets),
+                scored=scored,
+                risk_distribution=distribution
             )
-            
-            result = AssessmentResult(
-                risk_assessment=risk_assessment,
-                score=score,
-                recommendations=recommendations,
-                emergency_contacts=emergency_contacts
-            )
-            
-            logger.info(f"Assessment completed - Risk Level: {risk_assessment.level}, Score: {total_score}/{max_score}")
-            return result
-            
         except Exception as e:
-            logger.error(f"Error processing assessment: {str(e)}")
-            raise AssessmentException(f"Failed to process assessment: {str(e)}")
+            logger.error(f"Error processing assessment batch: {str(e)}")
+            raise AssessmentException(f"Failed to process assessment batch: {str(e)}")
@@ -1,32 +1,360 @@
-from openai import AsyncAzureOpenAI
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from app.config.settings import settings
-from app.core.exceptions import AzureOpenAIException
+from app.core.exceptions import AzureOpenAIException, CircuitOpenException
+from app.services.endpoint_pool import PoolMember, create_endpoint_pool
+from app.services.rate_limiter import rate_limiter
+from app.utils.metrics import (
+    AZURE_OPENAI_HEDGES,
+    AZURE_OPENAI_MEMBER_REQUESTS,
+    AZURE_OPENAI_REQUEST_DURATION,
+    AZURE_OPENAI_TIME_TO_FIRST_TOKEN,
+    AZURE_OPENAI_TOKENS
+)
+from app.utils.resilience import backoff_delay, parse_retry_after
+import asyncio
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
+# Default sampling parameters for counselor replies
+DEFAULT_MAX_TOKENS = 500
+DEFAULT_TEMPERATURE = 0.7
+DEFAULT_TOP_P = 0.9
+
+@dataclass
+class StreamDelta:
+    """A single piece of a streamed completion"""
+    content: str = ""
+    finish_reason: Optional[str] = None
+
+def _classify_error(error: Exception) -> Tuple[bool, Optional[float]]:
+    """Return whether an upstream error is worth retrying, and the requested delay"""
+    # Already imported by the time any upstream error exists
+    from openai import APIConnectionError, APIStatusError
+
+    if isinstance(error, (asyncio.TimeoutError, APIConnectionError)):
+        return True, None
+    if isinstance(error, APIStatusError):
+        if error.status_code in (408, 409, 429) or error.status_code >= 500:
+            return True, parse_retry_after(error.response.headers)
+    return False, None
+
+async def _chain(buffered: List[Any], chunks: AsyncIterator[Any]) -> AsyncIterator[Any]:
+    for chunk in buffered:
+        yield chunk
+    async for chunk in chunks:
+        yield chunk
+
+def _record_usage(deployment: str, usage):
+    if usage is None:
+        return
+    AZURE_OPENAI_TOKENS.inc(deployment, "prompt", amount=usage.prompt_tokens or 0)
+    AZURE_OPENAI_TOKENS.inc(deployment, "completion", amount=usage.completion_tokens or 0)
+    # Charged to the client whose request is running, for per-client rate limiting
+    rate_limiter.charge_tokens((usage.prompt_tokens or 0) + (usage.completion_tokens or 0))
+
+@dataclass
+class _OpenedStream:
+    """A streamed completion whose first content (or finish) chunk has arrived"""
+    member: PoolMember
+    stream: Any
+    chunks: AsyncIterator[Any]
+    buffered: List[Any]
+
+    async def close(self):
+        self.member.outstanding -= 1
+        await self.stream.close()
+
 class AzureOpenAIService:
     def __init__(self):
-        self.client = AsyncAzureOpenAI(
-            api_key=settings.azure_openai_api_key,
-            api_version=settings.azure_openai_api_version,
-            azure_endpoint=settings.azure_openai_endpoint
-        )
-    
-    async def generate_response(self, messages: list, max_tokens: int = 500, temperature: float = 0.7) -> str:
-        """Generate response from Azure OpenAI"""
+        # Member clients are built in start(): importing the openai SDK is slow
+        self.pool = create_endpoint_pool()
+        self._prewarm_task: Optional[asyncio.Task] = None
+        self._global_slots = asyncio.Semaphore(settings.azure_openai_max_concurrency)
+        self._deployment_slots: Dict[str, asyncio.Semaphore] = {}
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.pool.members)
+
+    @property
+    def circuit_state(self) -> str:
+        """open only once every pool member is ejected; disabled when nothing is configured"""
+        return self.pool.state
+
+    async def _prewarm(self, connections: int):
+        # Any response will do: it leaves TCP+TLS connections open in each member's pool
+        async def connect(member: PoolMember) -> bool:
+            try:
+                await member.http_client.get(member.endpoint, timeout=settings.azure_openai_connect_timeout_seconds)
+                return True
+            except Exception as e:
+                logger.warning(f"Azure OpenAI pre-warm of {member.name} failed: {str(e) or type(e).__name__}")
+                return False
+
+        started = time.perf_counter()
+        attempts = [connect(member) for member in self.pool.members for _ in range(connections)]
+        warmed = sum(await asyncio.gather(*attempts))
+        if warmed:
+            logger.info(f"Azure OpenAI: {warmed}/{len(attempts)} connections pre-warmed in {time.perf_counter() - started:.3f}s")
+
+    async def start(self):
+        """Build the member clients and, if enabled, pre-warm connections in the background"""
+        if not self.configured:
+            logger.warning("Azure OpenAI is not configured; chat will use fallback responses")
+            return
+        for member in self.pool.members:
+            # Also imports the SDK's resource modules (~0.5s), here rather than on the first chat's event loop
+            member.client.chat.completions.with_raw_response
+        logger.info(f"Azure OpenAI pool: {', '.join(member.name for member in self.pool.members)}")
+        if settings.azure_openai_prewarm_connections > 0:
+            self._prewarm_task = asyncio.create_task(self._prewarm(settings.azure_openai_prewarm_connections))
+
+    async def close(self):
+        if self._prewarm_task is not None:
+            self._prewarm_task.cancel()
+            self._prewarm_task = None
+        await self.pool.close()
+
+    @asynccontextmanager
+    async def _slot(self, deployment: str, deadline: float):
+        """Hold a global and a per-deployment in-flight slot, waiting no longer than the deadline"""
+        deployment_slots = self._deployment_slots.get(deployment)
+        if deployment_slots is None:
+            deployment_slots = asyncio.Semaphore(settings.azure_openai_max_concurrency_per_deployment)
+            self._deployment_slots[deployment] = deployment_slots
+
+        # Not wait_for: on 3.11 it can time out after acquire() succeeded, leaking the permit.
+        # A cancelled acquire() gives back a permit it was just handed.
+        async with asyncio.timeout_at(deadline):
+            await self._global_slots.acquire()
         try:
-            response = await self.client.chat.completions.create(
-                model=settings.azure_openai_deployment_name,
-                messages=messages,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                top_p=0.9
+            async with asyncio.timeout_at(deadline):
+                await deployment_slots.acquire()
+            try:
+                yield
+            finally:
+                deployment_slots.release()
+        finally:
+            self._global_slots.release()
+
+    async def _call(self, member: PoolMember, deployment: str, mode: str, deadline: float, kwargs: dict, failed: List[PoolMember]):
+        """One attempt against one member; a stream is returned once its first token has arrived"""
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        member.outstanding += 1
+        stream = None
+        opened = None
+        try:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            if mode == "stream" and member.stream_usage:
+                kwargs = {**kwargs, "stream_options": {"include_usage": True}}
+            raw = await asyncio.wait_for(
+                member.client.chat.completions.with_raw_response.create(model=member.deployment_for(deployment), **kwargs),
+                timeout=remaining
             )
+            member.observe_headers(raw.headers)
+            result = raw.parse()
+            if mode == "stream":
+                stream = result
+                chunks = stream.__aiter__()
+                buffered = []
+                # Read up to the first token so a stalled stream can still fail over
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), timeout=max(0.0, deadline - loop.time()))
+                    except StopAsyncIteration:
+                        break
+                    buffered.append(chunk)
+                    if chunk.choices and (chunk.choices[0].finish_reason or (chunk.choices[0].delta and chunk.choices[0].delta.content)):
+                        break
+                result = opened = _OpenedStream(member, stream, chunks, buffered)
+        except asyncio.CancelledError:
+            member.circuit_breaker.release_probe()
+            AZURE_OPENAI_MEMBER_REQUESTS.inc(member.name, "cancelled")
+            raise
+        except Exception as e:
+            failed.append(member)
+            retryable, retry_after = _classify_error(e)
+            status = getattr(e, "status_code", None)
+            member.observe_headers(getattr(getattr(e, "response", None), "headers", None))
+            if status == 429:
+                # Out of quota, not unhealthy: steer traffic elsewhere until Retry-After
+                member.rate_limited(retry_after)
+                member.circuit_breaker.release_probe()
+                AZURE_OPENAI_MEMBER_REQUESTS.inc(member.name, "rate_limited")
+            elif retryable or stream is not None:
+                member.circuit_breaker.record_failure()
+                AZURE_OPENAI_MEMBER_REQUESTS.inc(member.name, "error")
+            else:
+                # Upstream answered; the request itself was rejected
+                member.record_success()
+                AZURE_OPENAI_MEMBER_REQUESTS.inc(member.name, "rejected")
+            raise
+        finally:
+            if opened is None:
+                member.outstanding -= 1
+                if stream is not None:
+                    await stream.close()
+
+        self.pool.record_latency(member, mode, time.perf_counter() - started)
+        member.record_success()
+        AZURE_OPENAI_MEMBER_REQUESTS.inc(member.name, "ok")
+        return result
+
+    async def _race(self, deployment: str, mode: str, deadline: float, kwargs: dict, failed: List[PoolMember]):
+        """Send to the best member, hedging to a second one if the first is slower than p95"""
+        # Members that already failed this request are avoided, unless nothing else is left
+        member = self.pool.select(deployment, mode, failed) or self.pool.select(deployment, mode)
+        if member is None:
+            raise CircuitOpenException("Azure OpenAI circuit is open")
+
+        tasks = [asyncio.ensure_future(self._call(member, deployment, mode, deadline, kwargs, failed))]
+        winner = None
+        try:
+            delay = self.pool.hedge_delay(mode) if settings.azure_openai_hedging_enabled and len(self.pool.members) > 1 else None
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done:
+                    hedge = self.pool.select(deployment, mode, failed + [member])
+                    if hedge is not None:
+                        AZURE_OPENAI_HEDGES.inc(mode)
+                        tasks.append(asyncio.ensure_future(self._call(hedge, deployment, mode, deadline, kwargs, failed)))
+
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in tasks:
+                    if task in done:
+                        if task.exception() is None:
+                            winner = task
+                            return task.result()
+                        error = error or task.exception()
+            raise error
+        finally:
+            losers = [task for task in tasks if task is not winner]
+            for task in losers:
+                task.cancel()
+            await asyncio.gather(*losers, return_exceptions=True)
+            # A hedge that finished in the same step as the winner still holds an open stream
+            for task in losers:
+                if not task.cancelled() and task.exception() is None and isinstance(task.result(), _OpenedStream):
+                    await task.result().close()
+
+    async def _create_with_retries(self, deployment: str, mode: str, deadline: float, kwargs: dict):
+        """Create a completion on the pool with a deadline, failover and backoff retries"""
+        if not self.configured:
+            raise AzureOpenAIException("Azure OpenAI is not configured")
+        loop = asyncio.get_running_loop()
+        failed: List[PoolMember] = []
+        attempt = 0
+        while True:
+            try:
+                return await self._race(deployment, mode, deadline, kwargs, failed)
+            except CircuitOpenException:
+                raise
+            except Exception as e:
+                retryable, retry_after = _classify_error(e)
+                if not retryable:
+                    raise
+
+                delay = backoff_delay(
+                    attempt,
+                    settings.azure_openai_backoff_base_seconds,
+                    settings.azure_openai_backoff_max_seconds,
+                    retry_after
+                )
+                # Fail over to another healthy member straight away
+                if self.pool.has_alternative(deployment, failed):
+                    delay = 0.0
+                if attempt >= settings.azure_openai_max_retries or loop.time() + delay >= deadline:
+                    raise
+                logger.warning(f"Azure OpenAI attempt {attempt + 1} failed ({str(e) or type(e).__name__}), retrying in {delay:.2f}s")
+                if delay:
+                    await asyncio.sleep(delay)
+                attempt += 1
+
+    async def generate_response(self, messages: list, max_tokens: int = DEFAULT_MAX_TOKENS, temperature: float = DEFAULT_TEMPERATURE, deployment: Optional[str] = None) -> str:
+        """Generate response from Azure OpenAI"""
+        deployment = deployment or settings.azure_openai_deployment_name
+        deadline = asyncio.get_running_loop().time() + settings.azure_openai_request_deadline_seconds
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            async with self._slot(deployment, deadline):
+                response = await self._create_with_retries(deployment, "complete", deadline, dict(
+                    messages=messages,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    top_p=DEFAULT_TOP_P
+                ))
+            outcome = "ok"
+            _record_usage(deployment, response.usage)
             return response.choices[0].message.content
+        except AzureOpenAIException:
+            raise
+        except Exception as e:
+            logger.error(f"Azure OpenAI error: {str(e) or type(e).__name__}")
+            raise AzureOpenAIException(f"Failed to generate response: {str(e) or type(e).__name__}")
+        finally:
+            AZURE_OPENAI_REQUEST_DURATION.observe(time.perf_counter() - started, deployment, "complete", outcome)
+
+    async def generate_response_stream(self, messages: list, max_tokens: int = DEFAULT_MAX_TOKENS, temperature: float = DEFAULT_TEMPERATURE, deployment: Optional[str] = None) -> AsyncIterator[StreamDelta]:
+        """Stream response deltas from Azure OpenAI as they are generated"""
+        deployment = deployment or settings.azure_openai_deployment_name
+        deadline = asyncio.get_running_loop().time() + settings.azure_openai_request_deadline_seconds
+        started = time.perf_counter()
+        first_token = True
+        outcome = "error"
+        try:
+            # The slot is held for the whole stream, not just the initial request
+            async with self._slot(deployment, deadline):
+                opened = await self._create_with_retries(deployment, "stream", deadline, dict(
+                    messages=messages,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    top_p=DEFAULT_TOP_P,
+                    stream=True
+                ))
+                try:
+                    async for chunk in _chain(opened.buffered, opened.chunks):
+                        # Usage arrives on a final chunk with no choices
+                        if getattr(chunk, "usage", None) is not None:
+                            _record_usage(deployment, chunk.usage)
+                        # Azure sends a leading chunk with content filter results and no choices
+                        if not chunk.choices:
+                            continue
+                        choice = chunk.choices[0]
+                        content = choice.delta.content if choice.delta else None
+                        if content and first_token:
+                            first_token = False
+                            AZURE_OPENAI_TIME_TO_FIRST_TOKEN.observe(time.perf_counter() - started, deployment)
+                        if content or choice.finish_reason:
+                            yield StreamDelta(content=content or "", finish_reason=choice.finish_reason)
+                except Exception as e:
+                    opened.member.circuit_breaker.record_failure()
+                    logger.error(f"Azure OpenAI stream error ({opened.member.name}): {str(e)}")
+                    raise AzureOpenAIException(f"Stream interrupted: {str(e)}")
+                finally:
+                    # Release the upstream connection even if the consumer stops early
+                    await opened.close()
+            outcome = "ok"
+        except (GeneratorExit, asyncio.CancelledError):
+            outcome = "cancelled"
+            raise
+        except AzureOpenAIException:
+            raise
         except Exception as e:
-            logger.error(f"Azure OpenAI error: {str(e)}")
-            raise AzureOpenAIException(f"Failed to generate response: {str(e)}")
+            logger.error(f"Azure OpenAI error: {str(e) or type(e).__name__}")
+            raise AzureOpenAIException(f"Failed to generate response: {str(e) or type(e).__name__}")
+        finally:
+            AZURE_OPENAI_REQUEST_DURATION.observe(time.perf_counter() - started, deployment, "stream", outcome)
 
 # Create singleton instance
-azure_openai_service = AzureOpenAIService()
\ No newline at end of file
+azure_openai_service = AzureOpenAIService()
@@ -1,70 +1,376 @@
-from typing import List
-from app.models.chat import ChatRequest, ChatResponse, Message
-from app.services.azure_openai_service import azure_openai_service
-from app.core.constants import CRISIS_KEYWORDS, CRISIS_RESOURCES, SYSTEM_PROMPT
+from typing import AsyncIterator, List, Optional, Sequence, Tuple
+from app.models.chat import ChatRequest, ChatResponse, CrisisMatch, Message
+from app.config.settings import settings
+from app.services.azure_openai_service import azure_openai_service, DEFAULT_TOP_P
+from app.services.completion_cache import completion_cache, make_cache_key
+from app.services.crisis_detector import crisis_detector
+from app.services.crisis_followups import crisis_followups
+from app.services.model_router import ModelRoute, model_router
+from app.services.prompt_builder import PromptPlan, build_prompt
+from app.services.prompt_registry import prompt_registry
+from app.services.session_store import ConversationSession, session_store
+from app.core.constants import (
+    CRISIS_RESOURCES, CRISIS_SAFETY_RESPONSES, CRISIS_SAFETY_RESPONSE_DEFAULT, FALLBACK_RESPONSE, SHED_RESPONSE
+)
 from app.core.exceptions import ChatException
+from app.utils.metrics import CHAT_FALLBACKS, CHAT_SHED, CRISIS_CHECKS
+from app.utils.single_flight import SingleFlight
 import logging
+import secrets
 
 logger = logging.getLogger(__name__)
 
+# Per-request chat records; sampled and redacted through the logging settings
+request_logger = logging.getLogger(f"{__name__}.requests")
+
+# Identical chat prompts currently waiting on Azure OpenAI
+inflight_chats = SingleFlight()
+
 class ChatService:
     @staticmethod
     def detect_crisis(message: str) -> bool:
         """Detect if message contains crisis indicators"""
-        message_lower = message.lower()
-        return any(keyword in message_lower for keyword in CRISIS_KEYWORDS)
-    
+        is_crisis = crisis_detector.is_crisis(message)
+        CRISIS_CHECKS.inc("chat", "crisis" if is_crisis else "none")
+        return is_crisis
+
+    @staticmethod
+    def find_crisis_matches(message: str) -> List[CrisisMatch]:
+        """Find crisis keywords in a message with their category and offsets"""
+        matches = crisis_detector.find(message)
+        CRISIS_CHECKS.inc("crisis_check", "crisis" if matches else "none")
+        return matches
+
+    @staticmethod
+    def safety_response(risk_level: Optional[str]) -> str:
+        """Precomputed safety message for a crisis turn, matched to the user's risk level"""
+        return CRISIS_SAFETY_RESPONSES.get(risk_level, CRISIS_SAFETY_RESPONSE_DEFAULT)
+
+    @staticmethod
+    def shed_action(request: ChatRequest, shed_reason: Optional[str]) -> Optional[str]:
+        """How an overloaded server answers this turn ("fallback" or "reject"), None to serve it"""
+        # Crisis messages are never shed
+        if shed_reason is None or crisis_detector.is_crisis(request.message):
+            return None
+        action = "reject" if settings.admission_shed_mode == "reject" else "fallback"
+        CHAT_SHED.inc(shed_reason, action)
+        return action
+
+    @staticmethod
+    def shed_response(request: ChatRequest) -> ChatResponse:
+        """Immediate busy reply for a shed turn, marked as shed; the session is left untouched"""
+        return ChatResponse(response=SHED_RESPONSE, session_id=request.session_id, shed=True)
+
+    @staticmethod
+    def shed_events(request: ChatRequest) -> List[dict]:
+        """Stream events for a shed turn: a busy reply, and a done event marked as shed"""
+        return [
+            {"event": "meta", "data": {
+                "is_crisis": False,
+                "crisis_resources": None,
+                "safety_response": None,
+                "session_id": request.session_id,
+                "follow_up": None
+            }},
+            {"event": "fallback", "data": {"response": SHED_RESPONSE, "partial": False}},
+            {"event": "done", "data": {
+                "finish_reason": "overloaded",
+                "response_chars": 0,
+                "prompt_tokens": None,
+                "fallback": True,
+                "shed": True,
+                "retry_after": settings.admission_retry_after_seconds
+            }}
+        ]
+
+    @staticmethod
+    async def open_session(request: ChatRequest) -> Tuple[Optional[ConversationSession], Sequence[Message]]:
+        """Resolve the conversation history from the server-side session or the request"""
+        if not settings.chat_sessions_enabled:
+            return None, request.conversation_history or []
+        if request.session_id:
+            session = await session_store.get(request.session_id)
+            if session is not None:
+                return session, session.history()
+            # Unknown or expired session: start over from whatever the client sent
+        elif request.conversation_history:
+            # Stateless client that keeps resending its own history
+            return None, request.conversation_history
+        session = await session_store.create(request.conversation_history or [])
+        return session, session.history()
+
+    @staticmethod
+    async def connection_session(session_id: Optional[str], seed: Sequence[Message]) -> ConversationSession:
+        """Session held by a WebSocket connection for its whole lifetime"""
+        if not settings.chat_sessions_enabled:
+            # Not in the store: the history lives exactly as long as the connection
+            return ConversationSession(
+                secrets.token_urlsafe(16),
+                [(msg.role, msg.content) for msg in seed][-settings.session_max_messages:]
+            )
+        if session_id:
+            session = await session_store.get(session_id)
+            if session is not None:
+                return session
+        return await session_store.create(seed)
+
+    @staticmethod
+    def build_prompt(request: ChatRequest, history: Sequence[Message]) -> PromptPlan:
+        """Build the Azure OpenAI prompt for a chat request"""
+        # Precompiled system prompt variant for the user's risk level
+        template = prompt_registry.get(request.user_risk_level)
+
+        # Keep recent history verbatim within the token budget, summarize the rest
+        plan = build_prompt(template, history, request.message)
+        request_logger.debug(
+            "Prompt tokens: %d (kept %d turns, summarized %d)",
+            plan.prompt_tokens, plan.kept_turns, plan.summarized_turns
+        )
+        return plan
+
+    @staticmethod
+    def route_turn(request: ChatRequest, history: Sequence[Message], is_crisis: bool) -> Tuple[ModelRoute, str]:
+        """Choose the deployment and sampling for this turn"""
+        return model_router.route(request.message, len(history), is_crisis, request.user_risk_level)
+
+    @staticmethod
+    def prompt_fingerprint(request: ChatRequest, messages: List[dict], route: ModelRoute) -> str:
+        """Fingerprint of everything that shapes the completion for this prompt"""
+        return make_cache_key(
+            messages,
+            route.deployment,
+            route.max_tokens,
+            route.temperature,
+            DEFAULT_TOP_P,
+            request.user_risk_level
+        )
+
+    @staticmethod
+    def cache_key_for(request: ChatRequest, messages: List[dict], is_crisis: bool, route: ModelRoute) -> Optional[str]:
+        """Completion cache key, or None when the reply must not be cached"""
+        # Crisis conversations always get a fresh, attentive reply
+        if completion_cache is None or is_crisis:
+            return None
+        return ChatService.prompt_fingerprint(request, messages, route)
+
+    @staticmethod
+    async def generate_reply(messages: List[dict], route: ModelRoute, fingerprint: str, cache_key: Optional[str]) -> str:
+        """Generate a reply, sharing one upstream call between identical concurrent prompts"""
+        async def generate() -> str:
+            response = await azure_openai_service.generate_response(
+                messages, route.max_tokens, route.temperature, route.deployment
+            )
+            if cache_key:
+                await completion_cache.set(cache_key, response)
+            return response
+
+        if not settings.chat_coalesce_requests:
+            return await generate()
+        return await inflight_chats.do(fingerprint, generate)
+
+    @staticmethod
+    def crisis_fast_path(request: ChatRequest, session: Optional[ConversationSession], plan: PromptPlan, route: ModelRoute, follow_up: Optional[str]) -> Optional[ChatResponse]:
+        """Answer a crisis turn with the safety response now; the counselor reply follows in the background.
+
+        Returns None when no follow-up can be started, to answer the turn inline instead.
+        """
+        # Crisis replies are never coalesced or cached
+        pending = crisis_followups.submit(
+            lambda: azure_openai_service.generate_response(
+                plan.messages, route.max_tokens, route.temperature, route.deployment
+            ),
+            session
+        )
+        if pending is None:
+            logger.warning("Crisis follow-ups are full; answering the crisis turn inline")
+            return None
+
+        safety_response = ChatService.safety_response(request.user_risk_level)
+        if session is not None:
+            session_store.append(session, ("user", request.message), ("assistant", safety_response))
+        request_logger.info("Crisis fast path", extra={"data": {
+            "user_message": request.message,
+            "user_risk_level": request.user_risk_level,
+            "follow_up_id": pending.follow_up_id
+        }})
+        return ChatResponse(
+            response=safety_response,
+            is_crisis=True,
+            crisis_resources=CRISIS_RESOURCES,
+            prompt_tokens=plan.prompt_tokens,
+            session_id=session.session_id if session is not None else None,
+            follow_up_id=pending.follow_up_id,
+            follow_up=follow_up
+        )
+
     @staticmethod
     async def process_chat(request: ChatRequest) -> ChatResponse:
         """Process chat request and return response"""
+        session = None
+        is_crisis = False
+        follow_up = None
         try:
             # Detect crisis
             is_crisis = ChatService.detect_crisis(request.message)
-            
-            # Prepare system prompt with user risk information
-            system_prompt = SYSTEM_PROMPT
-            if request.user_risk_level:
-                system_prompt += f"\n\nINFORMASI PENGGUNA: Tingkat risiko kecanduan judi pengguna adalah '{request.user_risk_level}'. Sesuaikan pendekatan Anda dengan tingkat risiko ini."
-            
-            # Prepare messages for Azure OpenAI
-            messages = [{"role": "system", "content": system_prompt}]
-            
-            # Add conversation history (keep last 10 messages for context)
-            for msg in request.conversation_history[-10:]:
-                messages.append({
-                    "role": msg.role,
-                    "content": msg.content
-                })
-            
-            # Add current user message
-            messages.append({
-                "role": "user",
-                "content": request.message
-            })
-            
+
+            session, history = await ChatService.open_session(request)
+            if session is not None:
+                follow_up = crisis_followups.take_ready(session.session_id)
+            plan = ChatService.build_prompt(request, history)
+            messages = plan.messages
+            route, route_reason = ChatService.route_turn(request, history, is_crisis)
+
+            if is_crisis and settings.crisis_fast_path_enabled:
+                response = ChatService.crisis_fast_path(request, session, plan, route, follow_up)
+                if response is not None:
+                    return response
+
+            # Serve common openers from cache
+            cache_key = ChatService.cache_key_for(request, messages, is_crisis, route)
+            bot_response = await completion_cache.get(cache_key) if cache_key else None
+
             # Generate response
-            bot_response = await azure_openai_service.generate_response(messages)
-            
+            if bot_response is None:
+                fingerprint = cache_key or ChatService.prompt_fingerprint(request, messages, route)
+                bot_response = await ChatService.generate_reply(messages, route, fingerprint, cache_key)
+
             # Log for monitoring
-            logger.info(f"User message: {request.message[:100]}...")
-            logger.info(f"Bot response: {bot_response[:100]}...")
-            logger.info(f"Crisis detected: {is_crisis}")
-            logger.info(f"User risk level: {request.user_risk_level}")
-            
+            request_logger.info("Chat turn completed", extra={"data": {
+                "user_message": request.message,
+                "bot_response": bot_response,
+                "is_crisis": is_crisis,
+                "user_risk_level": request.user_risk_level,
+                "prompt_tokens": plan.prompt_tokens,
+                "route": route.name,
+                "route_reason": route_reason,
+                "deployment": route.deployment
+            }})
+
+            if session is not None:
+                session_store.append(session, ("user", request.message), ("assistant", bot_response))
+
             return ChatResponse(
                 response=bot_response,
                 is_crisis=is_crisis,
-                crisis_resources=CRISIS_RESOURCES if is_crisis else None
+                crisis_resources=CRISIS_RESOURCES if is_crisis else None,
+                prompt_tokens=plan.prompt_tokens,
+                session_id=session.session_id if session is not None else None,
+                follow_up=follow_up
             )
-            
+
         except Exception as e:
-            logger.error(f"Error in chat service: {str(e)}")
-            
-            # Fallback response
-            fallback_response = "Maaf, saya mengalami gangguan teknis. Silakan coba lagi dalam beberapa saat. Jika Anda dalam keadaan darurat, hubungi 119 atau layanan kesehatan mental terdekat."
-            
+            logger.error("Error in chat service: %s", e)
+            CHAT_FALLBACKS.inc("chat", type(e).__name__)
+
+            # Fallback response; a detected crisis still gets its safety information
             return ChatResponse(
-                response=fallback_response,
-                is_crisis=False,
-                crisis_resources=None
-            )
\ No newline at end of file
+                response=ChatService.safety_response(request.user_risk_level) if is_crisis else FALLBACK_RESPONSE,
+                is_crisis=is_crisis,
+                crisis_resources=CRISIS_RESOURCES if is_crisis else None,
+                session_id=session.session_id if session is not None else None,
+                follow_up=follow_up
+            )
+
+    @staticmethod
+    async def stream_chat(request: ChatRequest, connection_session: Optional[ConversationSession] = None) -> AsyncIterator[dict]:
+        """Stream chat events: a meta event, token events, then a done event"""
+        is_crisis = ChatService.detect_crisis(request.message)
+        if connection_session is None:
+            session, history = await ChatService.open_session(request)
+        else:
+            # WebSocket turn: the connection already holds the conversation
+            session = connection_session
+            if settings.chat_sessions_enabled:
+                await session_store.touch(session)
+            history = session.history()
+
+        # Crisis information goes out before the upstream call is even made
+        yield {
+            "event": "meta",
+            "data": {
+                "is_crisis": is_crisis,
+                "crisis_resources": CRISIS_RESOURCES if is_crisis else None,
+                "safety_response": ChatService.safety_response(request.user_risk_level) if is_crisis else None,
+                "session_id": session.session_id if session is not None else None,
+                "follow_up": crisis_followups.take_ready(session.session_id) if session is not None else None
+            }
+        }
+
+        finish_reason = None
+        response_chars = 0
+        prompt_tokens = None
+        chunks = []
+        try:
+            plan = ChatService.build_prompt(request, history)
+            messages = plan.messages
+            prompt_tokens = plan.prompt_tokens
+            route, route_reason = ChatService.route_turn(request, history, is_crisis)
+            cache_key = ChatService.cache_key_for(request, messages, is_crisis, route)
+            cached_response = await completion_cache.get(cache_key) if cache_key else None
+
+            if cached_response is not None:
+                response_chars = len(cached_response)
+                finish_reason = "stop"
+                chunks.append(cached_response)
+                yield {"event": "token", "data": {"content": cached_response}}
+            else:
+                # Only hold the full reply in memory when it is cached or kept in a session
+                keep_reply = cache_key is not None or session is not None
+                async for delta in azure_openai_service.generate_response_stream(
+                    messages, route.max_tokens, route.temperature, route.deployment
+                ):
+                    if delta.content:
+                        response_chars += len(delta.content)
+                        if keep_reply:
+                            chunks.append(delta.content)
+                        yield {"event": "token", "data": {"content": delta.content}}
+                    if delta.finish_reason:
+                        finish_reason = delta.finish_reason
+                if cache_key and finish_reason == "stop":
+                    await completion_cache.set(cache_key, "".join(chunks))
+        except Exception as e:
+            logger.error("Error in chat stream: %s", e)
+            CHAT_FALLBACKS.inc("stream", type(e).__name__)
+
+            # Fallback response, also when the stream broke partway through
+            yield {
+                "event": "fallback",
+                "data": {"response": FALLBACK_RESPONSE, "partial": response_chars > 0}
+            }
+            yield {
+                "event": "done",
+                "data": {
+                    "finish_reason": "error",
+                    "response_chars": response_chars,
+                    "prompt_tokens": prompt_tokens,
+                    "fallback": True,
+                    "shed": False
+                }
+            }
+            return
+
+        request_logger.info("Chat stream completed", extra={"data": {
+            "user_message": request.message,
+            "response_chars": response_chars,
+            "finish_reason": finish_reason,
+            "is_crisis": is_crisis,
+            "user_risk_level": request.user_risk_level,
+            "prompt_tokens": prompt_tokens,
+            "route": route.name,
+            "route_reason": route_reason,
+            "deployment": route.deployment
+        }})
+
+        if session is not None:
+            session_store.append(session, ("user", request.message), ("assistant", "".join(chunks)))
+
+        yield {
+            "event": "done",
+            "data": {
+                "finish_reason": finish_reason,
+                "response_chars": response_chars,
+                "prompt_tokens": prompt_tokens,
+                "fallback": False,
+                "shed": False
+            }
+        }
@@ -0,0 +1,205 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from app.config.settings import settings
+import hashlib
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+def make_cache_key(
+    messages: List[dict],
+    deployment: str,
+    max_tokens: int,
+    temperature: float,
+    top_p: float,
+    user_risk_level: Optional[str] = None
+) -> str:
+    """Fingerprint a prompt: normalized messages plus everything that shapes the completion"""
+    normalized = [
+        [msg["role"], " ".join(msg["content"].split()).casefold()]
+        for msg in messages
+    ]
+    payload = json.dumps(
+        [normalized, deployment, max_tokens, temperature, top_p, user_risk_level],
+        ensure_ascii=False,
+        separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class MemoryCompletionCache:
+    """In-process LRU cache with a TTL per entry"""
+
+    backend = "memory"
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    async def set(self, key: str, value: str):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def close(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "backend": self.backend,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+class SQLiteCompletionCache:
+    """SQLite-file cache that survives restarts; LRU by last access time"""
+
+    backend = "sqlite"
+
+    # Enforce the size bound every N writes instead of on every write
+    PRUNE_EVERY = 50
+    # Hits whose last-used time is held in memory before being written
+    TOUCH_BATCH = 100
+
+    def __init__(self, path: str, max_entries: int, ttl_seconds: float):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._db = None
+        self._writes = 0
+        self._touched: Dict[str, float] = {}
+
+    async def _connection(self):
+        if self._db is None:
+            import aiosqlite
+
+            db = await aiosqlite.connect(self.path)
+            await db.execute(
+                "CREATE TABLE IF NOT EXISTS completion_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            await db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_completion_cache_last_used "
+                "ON completion_cache (last_used)"
+            )
+            await db.commit()
+            self._db = db
+        return self._db
+
+    async def get(self, key: str) -> Optional[str]:
+        try:
+            db = await self._connection()
+            now = time.time()
+            async with db.execute(
+                "SELECT value FROM completion_cache WHERE key = ? AND expires_at > ?",
+                (key, now)
+            ) as cursor:
+                row = await cursor.fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            # Last-used times only matter when pruning; write them in batches, not per hit
+            self._touched[key] = now
+            if len(self._touched) >= self.TOUCH_BATCH:
+                await self._flush_touches(db)
+                await db.commit()
+            self.hits += 1
+            return row[0]
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Completion cache read failed: {str(e)}")
+            return None
+
+    async def set(self, key: str, value: str):
+        try:
+            db = await self._connection()
+            now = time.time()
+            await db.execute(
+                "INSERT OR REPLACE INTO completion_cache (key, value, expires_at, last_used) "
+                "VALUES (?, ?, ?, ?)",
+                (key, value, now + self.ttl_seconds, now)
+            )
+            self._touched.pop(key, None)
+            self._writes += 1
+            if self._writes % self.PRUNE_EVERY == 0:
+                await self._flush_touches(db)
+                await self._prune(db, now)
+            await db.commit()
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Completion cache write failed: {str(e)}")
+
+    async def _flush_touches(self, db):
+        if self._touched:
+            await db.executemany(
+                "UPDATE completion_cache SET last_used = ? WHERE key = ?",
+                [(last_used, key) for key, last_used in self._touched.items()]
+            )
+            self._touched.clear()
+
+    async def _prune(self, db, now: float):
+        await db.execute("DELETE FROM completion_cache WHERE expires_at <= ?", (now,))
+        await db.execute(
+            "DELETE FROM completion_cache WHERE key NOT IN "
+            "(SELECT key FROM completion_cache ORDER BY last_used DESC LIMIT ?)",
+            (self.max_entries,)
+        )
+
+    async def close(self):
+        if self._db is not None:
+            try:
+                await self._flush_touches(self._db)
+                await self._db.commit()
+            except Exception as e:
+                logger.warning(f"Completion cache touch flush failed: {str(e)}")
+            await self._db.close()
+            self._db = None
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "backend": self.backend,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors
+        }
+
+def create_completion_cache():
+    """Build the completion cache configured in settings, or None when disabled"""
+    if not settings.completion_cache_enabled:
+        return None
+    if settings.completion_cache_backend == "sqlite":
+        return SQLiteCompletionCache(
+            settings.completion_cache_sqlite_path,
+            settings.completion_cache_max_entries,
+            settings.completion_cache_ttl_seconds
+        )
+    return MemoryCompletionCache(
+        settings.completion_cache_max_entries,
+        settings.completion_cache_ttl_seconds
+    )
+
+completion_cache = create_completion_cache()
@@ -0,0 +1,68 @@
+from app.services.admission import AdmissionController, admission_controller
+from app.services.assessment_service import AssessmentService
+from app.services.azure_openai_service import AzureOpenAIService, azure_openai_service
+from app.services.chat_service import ChatService
+from app.services.completion_cache import completion_cache
+from app.services.crisis_followups import CrisisFollowUps, crisis_followups
+from app.services.prompt_registry import PromptRegistry, prompt_registry
+from app.services.rate_limiter import RateLimiter, rate_limiter
+from app.services.scoring_engine import ScoringEngine, scoring_engine
+from app.services.session_store import SessionStore, session_store
+from app.services.statistics_service import AssessmentStatistics, assessment_statistics
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ServiceContainer:
+    """Shared services for the lifetime of the app.
+
+    Everything is constructed once; start() and stop() are driven by the
+    FastAPI lifespan so connections and background tasks are opened after
+    the process is up and closed cleanly on shutdown.
+    """
+
+    def __init__(self):
+        self.assessment_service = AssessmentService()
+        self.chat_service = ChatService()
+        self.azure_openai: AzureOpenAIService = azure_openai_service
+        self.statistics: AssessmentStatistics = assessment_statistics
+        self.sessions: SessionStore = session_store
+        self.completion_cache = completion_cache
+        self.crisis_followups: CrisisFollowUps = crisis_followups
+        self.prompts: PromptRegistry = prompt_registry
+        self.scoring: ScoringEngine = scoring_engine
+        self.admission: AdmissionController = admission_controller
+        self.rate_limiter: RateLimiter = rate_limiter
+
+    async def start(self):
+        self.prompts.compile()
+        # Fails startup on a broken scoring config rather than the first submission
+        self.scoring.compile()
+        # Imports deferred to keep `import app.main` fast are done before traffic arrives:
+        # on a request they would stall the event loop and trip admission control
+        self.assessment_service.warm_up()
+        await self.azure_openai.start()
+        await self.statistics.start()
+        await self.admission.start()
+        await self.rate_limiter.start()
+        await self.crisis_followups.start()
+
+    async def stop(self):
+        # Each step runs even if an earlier one fails
+        for name, close in (
+            ("admission control", self.admission.stop),
+            ("rate limiter", self.rate_limiter.stop),
+            ("crisis follow-ups", self.crisis_followups.close),
+            ("assessment statistics", self.statistics.stop),
+            ("chat sessions", self.sessions.close),
+            ("completion cache", self.completion_cache.close if self.completion_cache is not None else None),
+            ("Azure OpenAI client", self.azure_openai.close)
+        ):
+            if close is None:
+                continue
+            try:
+                await close()
+            except Exception as e:
+                logger.warning(f"Failed to close {name}: {str(e)}")
+
+services = ServiceContainer()
@@ -0,0 +1,132 @@
+from functools import lru_cache
+from typing import Dict, List, Tuple
+from app.core.constants import CRISIS_KEYWORD_CATEGORIES
+from app.models.chat import CrisisMatch
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Common leetspeak substitutions ("bunuh d1ri", "m4ti")
+LEET_MAP = {
+    "0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t",
+    "@": "a", "$": "s", "!": "i"
+}
+
+SEPARATOR = " "
+
+# Bounded: messages are user-supplied and may contain any Unicode character
+@lru_cache(maxsize=4096)
+def _fold(ch: str) -> str:
+    lowered = ch.lower()
+    lowered = LEET_MAP.get(lowered, lowered)
+    return lowered if len(lowered) == 1 and lowered.isalnum() else SEPARATOR
+
+# Fixed table for the common case, in front of the cache
+ASCII_FOLD = {chr(code): _fold(chr(code)) for code in range(128)}
+
+class CrisisDetector:
+    """Aho-Corasick automaton over normalized text.
+
+    Messages and keywords go through the same normalization: lowercase,
+    leetspeak folding, every run of non-alphanumerics becomes one space and
+    repeated characters collapse ("bunuuuh  d1ri!!" -> "bunuh diri"). The
+    message is normalized and matched in a single pass, and match offsets
+    are mapped back to the original text.
+    """
+
+    def __init__(self, keyword_categories: Dict[str, List[str]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+        # (original keyword, category, normalized length) per pattern
+        self._patterns: List[Tuple[str, str, int]] = []
+
+        seen = set()
+        for category, keywords in keyword_categories.items():
+            for keyword in keywords:
+                normalized = self.normalize(keyword)
+                if not normalized or normalized in seen:
+                    continue
+                seen.add(normalized)
+                self._add_pattern(normalized, keyword, category)
+        self._build_fail_links()
+        logger.info(f"Crisis detector compiled: {len(self._patterns)} patterns, {len(self._goto)} states")
+
+    def normalize(self, text: str) -> str:
+        """Normalize text the same way messages are normalized while matching"""
+        out = []
+        prev = SEPARATOR
+        for ch in text:
+            folded = _fold(ch)
+            if folded != prev:
+                out.append(folded)
+                prev = folded
+        return "".join(out).strip()
+
+    def _add_pattern(self, normalized: str, keyword: str, category: str):
+        state = 0
+        for ch in normalized:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][ch] = next_state
+            state = next_state
+        self._output[state].append(len(self._patterns))
+        self._patterns.append((keyword, category, len(normalized)))
+
+    def _build_fail_links(self):
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(ch, 0)
+                self._output[next_state].extend(self._output[self._fail[next_state]])
+
+    def find(self, message: str, first_only: bool = False) -> List[CrisisMatch]:
+        """Return every crisis keyword found in the message, in one linear pass"""
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        ascii_fold = ASCII_FOLD
+        fold = _fold
+
+        matches = []
+        # Original index of every normalized character, for offset mapping
+        positions = []
+        prev = SEPARATOR
+        state = 0
+        for index, ch in enumerate(message):
+            folded = ascii_fold.get(ch) or fold(ch)
+            if folded == prev:
+                continue
+            prev = folded
+            positions.append(index)
+
+            while state and folded not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(folded, 0)
+
+            for pattern_index in output[state]:
+                keyword, category, length = self._patterns[pattern_index]
+                matches.append(CrisisMatch(
+                    keyword=keyword,
+                    category=category,
+                    start=positions[len(positions) - length],
+                    end=index + 1
+                ))
+                if first_only:
+                    return matches
+        return matches
+
+    def is_crisis(self, message: str) -> bool:
+        """Check whether the message contains any crisis keyword"""
+        return bool(self.find(message, first_only=True))
+
+# Compiled once at startup
+crisis_detector = CrisisDetector(CRISIS_KEYWORD_CATEGORIES)
@@ -0,0 +1,147 @@
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional
+from app.config.settings import settings
+from app.services.session_store import ConversationSession, session_store
+import asyncio
+import logging
+import secrets
+import time
+
+logger = logging.getLogger(__name__)
+
+class FollowUp:
+    """A counselor reply to a crisis message, generated after the safety response went out"""
+
+    __slots__ = ("follow_up_id", "session_id", "created", "status", "response", "delivered", "task")
+
+    def __init__(self, follow_up_id: str, session_id: Optional[str]):
+        self.follow_up_id = follow_up_id
+        self.session_id = session_id
+        self.created = time.monotonic()
+        self.status = "pending"
+        self.response: Optional[str] = None
+        self.delivered = False
+        self.task: Optional[asyncio.Task] = None
+
+class CrisisFollowUps:
+    """Background counselor replies for the crisis fast path.
+
+    Each follow-up runs as its own task, independent of the request that
+    started it, so a client that disconnects still gets the reply on its
+    next turn or from the follow-up endpoint. Finished replies are also
+    appended to the conversation session. Entries expire after a TTL,
+    swept periodically. At the entry limit the oldest finished entries make
+    room; a reply still being generated is never evicted, and while every
+    entry is pending there is no room for new ones.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._follow_ups: "OrderedDict[str, FollowUp]" = OrderedDict()
+        # session id -> latest follow-up for that session
+        self._by_session: Dict[str, str] = {}
+        self._sweep_task: Optional[asyncio.Task] = None
+
+    def _drop(self, follow_up: FollowUp):
+        self._follow_ups.pop(follow_up.follow_up_id, None)
+        if follow_up.session_id and self._by_session.get(follow_up.session_id) == follow_up.follow_up_id:
+            del self._by_session[follow_up.session_id]
+        if follow_up.task is not None and not follow_up.task.done():
+            follow_up.task.cancel()
+
+    def _expire(self):
+        # Entries are in creation order; a pending one this old is stuck past any request deadline
+        now = time.monotonic()
+        while self._follow_ups:
+            oldest = next(iter(self._follow_ups.values()))
+            if now - oldest.created < self.ttl:
+                break
+            self._drop(oldest)
+
+    def has_room(self) -> bool:
+        """Whether a new follow-up can be started, evicting the oldest finished ones if needed"""
+        self._expire()
+        if len(self._follow_ups) < self.max_entries:
+            return True
+        excess = len(self._follow_ups) - self.max_entries + 1
+        finished = []
+        for follow_up in self._follow_ups.values():
+            if follow_up.task is None or follow_up.task.done():
+                finished.append(follow_up)
+                if len(finished) == excess:
+                    break
+        if len(finished) < excess:
+            return False
+        for follow_up in finished:
+            self._drop(follow_up)
+        return True
+
+    async def _run(self, follow_up: FollowUp, generate: Callable[[], Awaitable[str]], session: Optional[ConversationSession]):
+        try:
+            follow_up.response = await generate()
+            follow_up.status = "ready"
+            if session is not None:
+                session_store.append(session, ("assistant", follow_up.response))
+        except asyncio.CancelledError:
+            follow_up.status = "failed"
+            raise
+        except Exception as e:
+            follow_up.status = "failed"
+            logger.warning(f"Crisis follow-up failed: {str(e)}")
+
+    def submit(self, generate: Callable[[], Awaitable[str]], session: Optional[ConversationSession]) -> Optional[FollowUp]:
+        """Generate a follow-up in the background and return its handle right away; None when full"""
+        if not self.has_room():
+            return None
+        follow_up = FollowUp(secrets.token_urlsafe(16), session.session_id if session is not None else None)
+        follow_up.task = asyncio.create_task(self._run(follow_up, generate, session))
+        self._follow_ups[follow_up.follow_up_id] = follow_up
+        if follow_up.session_id:
+            self._by_session[follow_up.session_id] = follow_up.follow_up_id
+        return follow_up
+
+    async def wait(self, follow_up_id: str, timeout: float) -> Optional[FollowUp]:
+        """Look up a follow-up, waiting up to timeout seconds for it to finish"""
+        follow_up = self._follow_ups.get(follow_up_id)
+        if follow_up is None:
+            return None
+        if follow_up.status == "pending" and timeout > 0:
+            # asyncio.wait never cancels the task, so other waiters are unaffected
+            await asyncio.wait({follow_up.task}, timeout=timeout)
+        if follow_up.status == "ready":
+            follow_up.delivered = True
+        return follow_up
+
+    def take_ready(self, session_id: str) -> Optional[str]:
+        """An undelivered, finished follow-up for a session, to send with its next turn"""
+        follow_up_id = self._by_session.get(session_id)
+        follow_up = self._follow_ups.get(follow_up_id) if follow_up_id else None
+        if follow_up is None or follow_up.status != "ready" or follow_up.delivered:
+            return None
+        follow_up.delivered = True
+        return follow_up.response
+
+    async def _sweep_loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            self._expire()
+
+    async def start(self):
+        self._sweep_task = asyncio.create_task(self._sweep_loop(min(60.0, self.ttl)))
+
+    async def close(self):
+        if self._sweep_task is not None:
+            self._sweep_task.cancel()
+            self._sweep_task = None
+        tasks = [follow_up.task for follow_up in self._follow_ups.values() if follow_up.task is not None and not follow_up.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._follow_ups.clear()
+        self._by_session.clear()
+
+crisis_followups = CrisisFollowUps(
+    settings.crisis_followup_ttl_seconds,
+    settings.crisis_followup_max_entries
+)
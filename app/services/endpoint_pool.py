@@ -0,0 +1,244 @@
+from collections import deque
+from typing import Dict, Iterable, List, Mapping, Optional
+from app.config.settings import settings
+from app.utils.resilience import CircuitBreaker
+import logging
+import math
+import time
+
+logger = logging.getLogger(__name__)
+
+# Latency assumed for a member before it has served anything
+DEFAULT_LATENCY_SECONDS = 1.0
+
+# Latency samples kept per mode for the hedging delay
+LATENCY_WINDOW = 512
+
+# Oldest api-version that accepts stream_options; older ones reject the request with 400
+STREAM_USAGE_MIN_API_VERSION = "2024-09-01"
+
+def _header_int(headers: Mapping[str, str], name: str) -> Optional[int]:
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return int(float(value))
+    except ValueError:
+        return None
+
+class PoolMember:
+    """One Azure OpenAI endpoint: its client, health and load statistics.
+
+    Health is a per-member circuit breaker: consecutive failures eject the
+    member, a single probe re-admits it, and it then serves reduced traffic
+    for a probation period. Load is the number of outstanding requests,
+    EWMA latency per mode and the remaining quota reported in rate-limit
+    headers.
+    """
+
+    def __init__(self, name: str, endpoint: str, api_key: str, api_version: str, deployments: Optional[Dict[str, str]] = None):
+        self.name = name
+        self.endpoint = endpoint
+        self.api_key = api_key
+        self.api_version = api_version
+        # Logical deployment name -> this endpoint's deployment; empty means same names everywhere
+        self.deployments = deployments or {}
+        self.circuit_breaker = CircuitBreaker(
+            settings.azure_openai_circuit_failure_threshold,
+            settings.azure_openai_circuit_recovery_seconds,
+            name=f"azure-openai:{name}"
+        )
+        self.outstanding = 0
+        self.ewma: Dict[str, Optional[float]] = {"complete": None, "stream": None}
+        self.remaining_requests: Optional[int] = None
+        self.remaining_tokens: Optional[int] = None
+        self._peak_remaining_tokens = 0
+        self.rate_limited_until = 0.0
+        self.probation_until = 0.0
+        self._client = None
+        self.http_client = None
+
+    @property
+    def client(self):
+        """This member's AsyncAzureOpenAI client and connection pool, built on first use"""
+        if self._client is None:
+            from openai import AsyncAzureOpenAI, DefaultAsyncHttpxClient
+            import httpx
+
+            self.http_client = DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=settings.azure_openai_max_connections,
+                    max_keepalive_connections=settings.azure_openai_max_keepalive_connections,
+                    keepalive_expiry=settings.azure_openai_keepalive_expiry_seconds
+                ),
+                timeout=httpx.Timeout(
+                    settings.azure_openai_read_timeout_seconds,
+                    connect=settings.azure_openai_connect_timeout_seconds
+                )
+            )
+            self._client = AsyncAzureOpenAI(
+                api_key=self.api_key,
+                api_version=self.api_version,
+                azure_endpoint=self.endpoint,
+                # Retries are handled by the service, across members
+                max_retries=0,
+                http_client=self.http_client
+            )
+        return self._client
+
+    def deployment_for(self, deployment: str) -> Optional[str]:
+        if not self.deployments:
+            return deployment
+        return self.deployments.get(deployment)
+
+    @property
+    def stream_usage(self) -> bool:
+        """Whether to ask this endpoint for token usage on streamed completions"""
+        # api-versions are dates, optionally suffixed with -preview
+        return settings.azure_openai_stream_usage and self.api_version[:10] >= STREAM_USAGE_MIN_API_VERSION
+
+    def available(self) -> bool:
+        return self.circuit_breaker.state != CircuitBreaker.OPEN
+
+    def score(self, mode: str, default_latency: float, now: float) -> float:
+        """Expected cost of sending one more request here; lower is better"""
+        latency = self.ewma[mode] or default_latency
+        score = (self.outstanding + 1) * latency
+        if self.remaining_tokens is not None and self._peak_remaining_tokens:
+            # Drain members with quota headroom first
+            headroom = self.remaining_tokens / self._peak_remaining_tokens
+            score /= max(headroom, 0.05)
+        if self.remaining_requests == 0:
+            score *= 10
+        if now < self.probation_until:
+            score *= settings.azure_openai_probation_penalty
+        return score
+
+    def observe_latency(self, mode: str, seconds: float):
+        previous = self.ewma[mode]
+        alpha = settings.azure_openai_ewma_alpha
+        self.ewma[mode] = seconds if previous is None else previous + alpha * (seconds - previous)
+
+    def observe_headers(self, headers: Optional[Mapping[str, str]]):
+        if not headers:
+            return
+        remaining_requests = _header_int(headers, "x-ratelimit-remaining-requests")
+        if remaining_requests is not None:
+            self.remaining_requests = remaining_requests
+        remaining_tokens = _header_int(headers, "x-ratelimit-remaining-tokens")
+        if remaining_tokens is not None:
+            self.remaining_tokens = remaining_tokens
+            self._peak_remaining_tokens = max(self._peak_remaining_tokens, remaining_tokens)
+
+    def rate_limited(self, retry_after: Optional[float]):
+        self.rate_limited_until = time.monotonic() + (retry_after if retry_after is not None else 1.0)
+        self.remaining_requests = 0
+
+    def record_success(self):
+        if self.circuit_breaker.state != CircuitBreaker.CLOSED:
+            self.probation_until = time.monotonic() + settings.azure_openai_probation_seconds
+            logger.info(f"Azure OpenAI member {self.name} re-admitted on probation")
+        self.circuit_breaker.record_success()
+
+    async def close(self):
+        if self._client is not None:
+            # Closes the connection pool as well
+            await self._client.close()
+            self._client = None
+            self.http_client = None
+
+class EndpointPool:
+    """Azure OpenAI endpoints that share the traffic of one logical service"""
+
+    def __init__(self, members: List[PoolMember]):
+        self.members = members
+        self._samples: Dict[str, deque] = {mode: deque(maxlen=LATENCY_WINDOW) for mode in ("complete", "stream")}
+        self._p95: Dict[str, Optional[float]] = {"complete": None, "stream": None}
+        self._samples_since_p95 = {"complete": 0, "stream": 0}
+
+    @property
+    def state(self) -> str:
+        """closed while any member is healthy; open once every member is ejected; disabled with no members"""
+        states = {member.circuit_breaker.state for member in self.members}
+        if not states:
+            return "disabled"
+        if states == {CircuitBreaker.OPEN}:
+            return CircuitBreaker.OPEN
+        if CircuitBreaker.CLOSED in states:
+            return CircuitBreaker.CLOSED
+        return CircuitBreaker.HALF_OPEN
+
+    def select(self, deployment: str, mode: str, exclude: Iterable[PoolMember] = ()) -> Optional[PoolMember]:
+        """Least-loaded healthy member serving the deployment, claiming its probe slot if half-open"""
+        now = time.monotonic()
+        excluded = set(map(id, exclude))
+        candidates = [
+            member for member in self.members
+            if id(member) not in excluded and member.deployment_for(deployment) and member.available()
+        ]
+        # Rate-limited members are only used when every other one is too
+        ready = [member for member in candidates if now >= member.rate_limited_until]
+        if ready:
+            candidates = ready
+
+        known = [member.ewma[mode] for member in self.members if member.ewma[mode] is not None]
+        default_latency = sum(known) / len(known) if known else DEFAULT_LATENCY_SECONDS
+        for member in sorted(candidates, key=lambda member: member.score(mode, default_latency, now)):
+            if member.circuit_breaker.allow_request():
+                return member
+        return None
+
+    def has_alternative(self, deployment: str, exclude: Iterable[PoolMember]) -> bool:
+        """Whether a healthy, non-rate-limited member outside `exclude` serves the deployment"""
+        now = time.monotonic()
+        excluded = set(map(id, exclude))
+        return any(
+            id(member) not in excluded and member.deployment_for(deployment) and member.available()
+            and now >= member.rate_limited_until
+            for member in self.members
+        )
+
+    def record_latency(self, member: PoolMember, mode: str, seconds: float):
+        member.observe_latency(mode, seconds)
+        self._samples[mode].append(seconds)
+        self._samples_since_p95[mode] += 1
+
+    def hedge_delay(self, mode: str) -> Optional[float]:
+        """p95 latency (time to first token for streams), clamped; None until enough samples"""
+        samples = self._samples[mode]
+        if len(samples) < settings.azure_openai_hedge_min_samples:
+            return None
+        # Re-sort at most every 32 samples
+        if self._p95[mode] is None or self._samples_since_p95[mode] >= 32:
+            ordered = sorted(samples)
+            self._p95[mode] = ordered[min(len(ordered) - 1, math.ceil(0.95 * len(ordered)) - 1)]
+            self._samples_since_p95[mode] = 0
+        return min(
+            max(self._p95[mode], settings.azure_openai_hedge_min_delay_seconds),
+            settings.azure_openai_hedge_max_delay_seconds
+        )
+
+    async def close(self):
+        for member in self.members:
+            await member.close()
+
+def create_endpoint_pool() -> EndpointPool:
+    """Pool members from AZURE_OPENAI_POOL, or the single configured endpoint"""
+    members = []
+    if settings.azure_openai_pool:
+        for index, entry in enumerate(settings.azure_openai_pool):
+            members.append(PoolMember(
+                entry.get("name") or f"member-{index}",
+                entry["endpoint"],
+                entry.get("api_key") or settings.azure_openai_api_key,
+                entry.get("api_version") or settings.azure_openai_api_version,
+                entry.get("deployments")
+            ))
+    elif settings.azure_openai_api_key and settings.azure_openai_endpoint:
+        members.append(PoolMember(
+            "default",
+            settings.azure_openai_endpoint,
+            settings.azure_openai_api_key,
+            settings.azure_openai_api_version
+        ))
+    return EndpointPool(members)
@@ -0,0 +1,65 @@
+from dataclasses import dataclass
+from typing import Optional, Tuple
+from app.config.settings import settings
+from app.core.constants import COMPLEX_TOPIC_KEYWORDS
+from app.utils.metrics import CHAT_ROUTES
+
+@dataclass(frozen=True)
+class ModelRoute:
+    """Where a chat turn is sent and how it is sampled"""
+    name: str
+    deployment: str
+    max_tokens: int
+    temperature: float
+
+class ModelRouter:
+    """Local, rule-based choice between the fast and the full deployment.
+
+    Crisis turns, high-risk users, long messages, deep conversations and
+    heavy topics always get the full model; everything else (greetings,
+    acknowledgements, short questions) goes to the fast deployment when
+    one is configured.
+    """
+
+    def __init__(self):
+        self.full = ModelRoute(
+            "full",
+            settings.azure_openai_deployment_name,
+            settings.chat_full_max_tokens,
+            settings.chat_full_temperature
+        )
+        self.fast = ModelRoute(
+            "fast",
+            settings.azure_openai_fast_deployment_name,
+            settings.chat_fast_max_tokens,
+            settings.chat_fast_temperature
+        )
+        self.fast_risk_levels = frozenset(settings.chat_fast_risk_levels)
+
+    @property
+    def enabled(self) -> bool:
+        return settings.chat_routing_enabled and bool(self.fast.deployment)
+
+    def _classify(self, message: str, history_messages: int, is_crisis: bool, risk_level: Optional[str]) -> Tuple[ModelRoute, str]:
+        if not self.enabled:
+            return self.full, "routing_disabled"
+        if is_crisis:
+            return self.full, "crisis"
+        if risk_level is not None and risk_level not in self.fast_risk_levels:
+            return self.full, "risk_level"
+        if len(message) > settings.chat_fast_max_message_chars:
+            return self.full, "long_message"
+        if history_messages > settings.chat_fast_max_history_messages:
+            return self.full, "deep_conversation"
+        lowered = message.lower()
+        if any(keyword in lowered for keyword in COMPLEX_TOPIC_KEYWORDS):
+            return self.full, "complex_topic"
+        return self.fast, "simple"
+
+    def route(self, message: str, history_messages: int, is_crisis: bool, risk_level: Optional[str]) -> Tuple[ModelRoute, str]:
+        """Pick a route for a turn; returns the route and the reason for it"""
+        route, reason = self._classify(message, history_messages, is_crisis, risk_level)
+        CHAT_ROUTES.inc(route.name, reason)
+        return route, reason
+
+model_router = ModelRouter()
@@ -0,0 +1,129 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Sequence, Tuple
+from app.config.settings import settings
+from app.models.chat import Message
+from app.services.prompt_registry import PromptTemplate
+from app.utils.tokens import CHARS_PER_TOKEN, TOKENS_PER_REPLY, count_message_tokens
+import hashlib
+import re
+
+SUMMARY_HEADER = "RINGKASAN PERCAKAPAN SEBELUMNYA (diringkas otomatis):"
+
+SPEAKER_LABELS = {"user": "Klien", "assistant": "Konselor"}
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+@dataclass
+class PromptPlan:
+    """Messages ready for Azure OpenAI plus how the history was windowed"""
+    messages: List[dict]
+    prompt_tokens: int
+    kept_turns: int
+    summarized_turns: int
+
+class ConversationSummarizer:
+    """Cheap extractive rolling summary of older conversation turns.
+
+    Each folded turn contributes its first sentence. Summaries are memoized
+    by a chained hash of the conversation prefix, so the next request in the
+    same conversation only summarizes the turns folded since the last one.
+    """
+
+    def __init__(self, max_chars: int, max_entries: int):
+        self.max_chars = max_chars
+        self.max_entries = max_entries
+        self._summaries: "OrderedDict[bytes, Tuple[str, ...]]" = OrderedDict()
+
+    @staticmethod
+    def _summary_line(msg: Message) -> str:
+        text = " ".join(msg.content.split())
+        text = _SENTENCE_END.split(text, 1)[0]
+        if len(text) > 160:
+            text = text[:157] + "..."
+        return f"- {SPEAKER_LABELS.get(msg.role, msg.role)}: {text}"
+
+    def summarize(self, turns: Sequence[Message]) -> str:
+        if not turns:
+            return ""
+
+        # prefix_hashes[i] identifies turns[:i + 1]
+        prefix_hashes = []
+        digest = b""
+        for msg in turns:
+            digest = hashlib.sha1(digest + msg.role.encode() + b"\0" + msg.content.encode()).digest()
+            prefix_hashes.append(digest)
+
+        # Resume from the longest prefix summarized by an earlier request
+        lines: Tuple[str, ...] = ()
+        start = 0
+        for i in range(len(turns) - 1, -1, -1):
+            cached = self._summaries.get(prefix_hashes[i])
+            if cached is not None:
+                self._summaries.move_to_end(prefix_hashes[i])
+                lines, start = cached, i + 1
+                break
+
+        if start < len(turns):
+            lines = lines + tuple(self._summary_line(msg) for msg in turns[start:])
+            # Rolling window: the oldest lines drop out first
+            total = sum(len(line) + 1 for line in lines)
+            while len(lines) > 1 and total > self.max_chars:
+                total -= len(lines[0]) + 1
+                lines = lines[1:]
+            self._summaries[prefix_hashes[-1]] = lines
+            while len(self._summaries) > self.max_entries:
+                self._summaries.popitem(last=False)
+
+        return "\n".join(lines)
+
+def build_prompt(template: PromptTemplate, history: Sequence[Message], message: str) -> PromptPlan:
+    """Assemble the prompt within the configured token budget.
+
+    The template's constant messages come first; the newest turns are kept
+    verbatim and older turns that don't fit are folded into a rolling
+    summary placed right after the template.
+    """
+    budget = settings.chat_prompt_token_budget
+    used = template.tokens + count_message_tokens(message) + TOKENS_PER_REPLY
+
+    turn_costs = [count_message_tokens(msg.content) for msg in history]
+    if used + sum(turn_costs) > budget:
+        # Leave room for the summary of whatever gets folded
+        available = budget - used - count_message_tokens(SUMMARY_HEADER) - int(settings.chat_summary_max_chars / CHARS_PER_TOKEN)
+    else:
+        available = budget - used
+
+    kept = 0
+    for cost in reversed(turn_costs):
+        if cost > available:
+            break
+        available -= cost
+        kept += 1
+
+    split = len(history) - kept
+    messages = list(template.messages)
+
+    if split:
+        summary = conversation_summarizer.summarize(history[:split])
+        summary_content = f"{SUMMARY_HEADER}\n{summary}"
+        messages.append({"role": "system", "content": summary_content})
+        used += count_message_tokens(summary_content)
+
+    for msg, cost in zip(history[split:], turn_costs[split:]):
+        messages.append({"role": msg.role, "content": msg.content})
+        used += cost
+
+    messages.append({"role": "user", "content": message})
+
+    return PromptPlan(
+        messages=messages,
+        prompt_tokens=used,
+        kept_turns=kept,
+        summarized_turns=split
+    )
+
+conversation_summarizer = ConversationSummarizer(
+    settings.chat_summary_max_chars,
+    settings.chat_summary_cache_size
+)
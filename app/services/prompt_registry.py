@@ -0,0 +1,54 @@
+from typing import Dict, List, Optional, Tuple
+from app.core.constants import RISK_LEVEL_PROMPT, RISK_LEVELS, SYSTEM_PROMPT
+from app.utils.tokens import count_message_tokens
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+class PromptTemplate:
+    """A precompiled prompt prefix: leading messages plus their token count"""
+
+    __slots__ = ("risk_level", "messages", "tokens", "fingerprint")
+
+    def __init__(self, risk_level: Optional[str], messages: Tuple[dict, ...]):
+        self.risk_level = risk_level
+        # Shared between requests: copy the list, never mutate the dicts
+        self.messages = messages
+        self.tokens = sum(count_message_tokens(msg["content"]) for msg in messages)
+        self.fingerprint = hashlib.sha256(
+            "\0".join(msg["content"] for msg in messages).encode("utf-8")
+        ).hexdigest()[:16]
+
+class PromptRegistry:
+    """System-prompt variants, one per known risk level, built once.
+
+    Every variant starts with the same SYSTEM_PROMPT message, byte for byte,
+    and the risk-level note follows as its own message. The long constant
+    prefix is therefore identical across all requests, which is what
+    upstream prompt-prefix caching keys on.
+    """
+
+    def __init__(self, system_prompt: str, risk_levels: List[str]):
+        self.system_prompt = system_prompt
+        self.risk_levels = list(risk_levels)
+        self._templates: Optional[Dict[Optional[str], PromptTemplate]] = None
+
+    def compile(self) -> Dict[Optional[str], PromptTemplate]:
+        """Build every variant (done lazily on first use, or eagerly at startup)"""
+        if self._templates is None:
+            base = {"role": "system", "content": self.system_prompt}
+            templates = {None: PromptTemplate(None, (base,))}
+            for level in self.risk_levels:
+                note = {"role": "system", "content": RISK_LEVEL_PROMPT.format(level=level)}
+                templates[level] = PromptTemplate(level, (base, note))
+            self._templates = templates
+            logger.debug(f"Compiled {len(templates)} prompt variants, base prompt {templates[None].tokens} tokens")
+        return self._templates
+
+    def get(self, risk_level: Optional[str]) -> PromptTemplate:
+        """The variant for a canonical risk level; anything else gets the base prompt"""
+        templates = self.compile()
+        return templates.get(risk_level) or templates[None]
+
+prompt_registry = PromptRegistry(SYSTEM_PROMPT, RISK_LEVELS)
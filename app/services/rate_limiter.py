@@ -0,0 +1,158 @@
+from contextvars import ContextVar
+from typing import Dict, List, NamedTuple, Optional
+from app.config.settings import settings
+from app.utils.metrics import CHAT_RATE_LIMITED
+import asyncio
+import ipaddress
+import math
+import time
+
+# Client key that Azure OpenAI token usage is charged to, bound per request task
+_charge_key: ContextVar[Optional[str]] = ContextVar("rate_limit_charge_key", default=None)
+
+class ClientQuota:
+    """A client's request and token buckets, refilled lazily when touched"""
+    __slots__ = ("requests", "tokens", "updated")
+
+    def __init__(self, requests: float, tokens: float, now: float):
+        self.requests = requests
+        self.tokens = tokens
+        self.updated = now
+
+class RateLimitDecision(NamedTuple):
+    allowed: bool
+    headers: Dict[str, str]
+    retry_after: int = 0
+
+class RateLimiter:
+    """Per-client token-bucket rate limiting for chat turns.
+
+    Each client IP address has two buckets that refill continuously over the window: one is
+    charged a request per turn, the other the prompt and completion tokens
+    Azure OpenAI reports for the turn. Token usage is only known after the
+    reply, so that bucket may go into debt; a client is limited while
+    either bucket is empty. Updates are O(1); a background task drops
+    clients whose buckets have refilled completely.
+    """
+
+    def __init__(self, trusted_proxies: List[str]):
+        self.clients: Dict[str, ClientQuota] = {}
+        self.trusted_proxies = [ipaddress.ip_network(network, strict=False) for network in trusted_proxies]
+        self._sweep_task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return settings.rate_limit_enabled
+
+    def _refill(self, quota: ClientQuota, now: float):
+        elapsed = now - quota.updated
+        if elapsed > 0:
+            window = settings.rate_limit_window_seconds
+            quota.requests = min(settings.rate_limit_requests, quota.requests + elapsed * settings.rate_limit_requests / window)
+            quota.tokens = min(settings.rate_limit_tokens, quota.tokens + elapsed * settings.rate_limit_tokens / window)
+            quota.updated = now
+
+    def _trusted(self, host: str) -> bool:
+        try:
+            address = ipaddress.ip_address(host)
+        except ValueError:
+            return False
+        return any(address in network for network in self.trusted_proxies)
+
+    def key_for(self, peer: Optional[str], forwarded_for: Optional[str] = None) -> str:
+        """The client address: the peer, or behind trusted proxies the last untrusted X-Forwarded-For hop.
+
+        Session ids are chosen by the client, so they are never a limit key.
+        """
+        client = peer or "unknown"
+        if forwarded_for and peer and self._trusted(peer):
+            # Proxies append the address they saw; anything further left may be forged
+            for hop in reversed([hop.strip() for hop in forwarded_for.split(",") if hop.strip()]):
+                client = hop
+                if not self._trusted(hop):
+                    break
+        return f"ip:{client}"
+
+    def _headers(self, quota: ClientQuota) -> Dict[str, str]:
+        window = settings.rate_limit_window_seconds
+        limit = settings.rate_limit_requests
+        remaining = int(quota.requests) if quota.tokens > 0 else 0
+        # Seconds until both buckets are full again
+        reset = max(
+            (limit - quota.requests) * window / limit,
+            (settings.rate_limit_tokens - quota.tokens) * window / settings.rate_limit_tokens
+        )
+        return {
+            "RateLimit-Limit": str(limit),
+            "RateLimit-Remaining": str(remaining),
+            "RateLimit-Reset": str(math.ceil(reset)),
+            "RateLimit-Policy": f"{limit};w={math.ceil(window)}"
+        }
+
+    def acquire(self, key: str) -> RateLimitDecision:
+        """Charge one request to the client, unless it is over its limit"""
+        if not self.enabled:
+            return RateLimitDecision(True, {})
+        now = time.monotonic()
+        quota = self.clients.get(key)
+        if quota is None:
+            quota = self.clients[key] = ClientQuota(settings.rate_limit_requests, settings.rate_limit_tokens, now)
+        else:
+            self._refill(quota, now)
+
+        if quota.requests >= 1 and quota.tokens > 0:
+            quota.requests -= 1
+            return RateLimitDecision(True, self._headers(quota))
+
+        window = settings.rate_limit_window_seconds
+        waits = []
+        if quota.requests < 1:
+            waits.append((1 - quota.requests) * window / settings.rate_limit_requests)
+            CHAT_RATE_LIMITED.inc("requests")
+        if quota.tokens <= 0:
+            waits.append(-quota.tokens * window / settings.rate_limit_tokens)
+            CHAT_RATE_LIMITED.inc("tokens")
+        return RateLimitDecision(False, self._headers(quota), max(1, math.ceil(max(waits))))
+
+    def bind(self, key: str):
+        """Charge Azure OpenAI usage in the current task (and tasks it starts) to this client"""
+        if self.enabled:
+            _charge_key.set(key)
+
+    def charge_tokens(self, amount: int):
+        """Charge prompt and completion tokens to the client bound to the current task, if any"""
+        key = _charge_key.get()
+        if key is None or amount <= 0:
+            return
+        quota = self.clients.get(key)
+        if quota is not None:
+            self._refill(quota, time.monotonic())
+            quota.tokens -= amount
+
+    def sweep(self) -> int:
+        """Drop clients whose buckets are full again; returns how many were dropped"""
+        now = time.monotonic()
+        idle = []
+        for key, quota in self.clients.items():
+            self._refill(quota, now)
+            if quota.requests >= settings.rate_limit_requests and quota.tokens >= settings.rate_limit_tokens:
+                idle.append(key)
+        for key in idle:
+            del self.clients[key]
+        return len(idle)
+
+    async def _sweep_loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            self.sweep()
+
+    async def start(self):
+        if self.enabled:
+            self._sweep_task = asyncio.create_task(self._sweep_loop(settings.rate_limit_sweep_interval_seconds))
+
+    async def stop(self):
+        if self._sweep_task is not None:
+            self._sweep_task.cancel()
+            self._sweep_task = None
+
+rate_limiter = RateLimiter(settings.rate_limit_trusted_proxies)
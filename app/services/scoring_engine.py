@@ -0,0 +1,179 @@
+from bisect import bisect_left
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from app.config.settings import settings
+from app.core.constants import (
+    ASSESSMENT_QUESTIONS, CRISIS_RESOURCES, EMERGENCY_RISK_LEVELS, QUESTION_WEIGHTS,
+    RISK_LEVELS, RISK_LEVEL_DETAILS, RISK_RECOMMENDATIONS, RISK_THRESHOLDS
+)
+from app.core.exceptions import InvalidAnswersException
+from app.models.assessment import CategoryScore, RiskAssessment
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+class LevelFragment(NamedTuple):
+    """Result parts shared by every assessment at one risk level; never mutate them"""
+    risk_assessment: RiskAssessment
+    recommendations: List[str]
+    emergency_contacts: Optional[List[str]]
+
+class ScoreCard(NamedTuple):
+    total_score: int
+    percentage: float
+    level_index: int
+    category_totals: List[int]
+    category_weighted: List[float]
+
+class CompiledScoring:
+    """Immutable scoring tables built once from the question bank and scoring config.
+
+    Each question id maps to (column, category, max value, weight). A
+    submission is validated and scored in one pass over its answers; the
+    risk level is a bisect over the threshold table, and the RiskAssessment,
+    recommendations and emergency contacts come from per-level fragments
+    built here, so scoring allocates nothing but the per-call totals.
+    """
+
+    def __init__(
+        self,
+        questions: Sequence[dict],
+        weights: Dict[str, float],
+        thresholds: Sequence[float],
+        levels: Sequence[str],
+        recommendations: Dict[str, List[str]],
+        emergency_levels: Sequence[str]
+    ):
+        if len(thresholds) != len(levels) - 1 or list(thresholds) != sorted(thresholds):
+            raise ValueError(f"Expected {len(levels) - 1} ascending thresholds, got {list(thresholds)}")
+
+        self.categories = tuple(category["category"] for category in questions)
+        index = {}
+        question_ids, max_values, column_weights, column_categories = [], [], [], []
+        for category_index, category in enumerate(questions):
+            for question in category["questions"]:
+                max_value = max(option["value"] for option in question["options"])
+                weight = float(weights.get(question["id"], 1))
+                index[question["id"]] = (len(question_ids), category_index, max_value, weight)
+                question_ids.append(question["id"])
+                max_values.append(max_value)
+                column_weights.append(weight)
+                column_categories.append(category_index)
+        unknown = set(weights) - set(index)
+        if unknown:
+            raise ValueError(f"Weights for unknown questions: {', '.join(sorted(unknown))}")
+
+        # question id -> (column, category, max value, weight)
+        self.index: Dict[str, Tuple[int, int, int, float]] = index
+        self.question_ids = tuple(question_ids)
+        self.max_values = tuple(max_values)
+        self.weights = tuple(column_weights)
+        self.column_categories = tuple(column_categories)
+        self.max_score = sum(max_values)
+        self.category_max = tuple(
+            sum(max_value for max_value, category in zip(max_values, column_categories) if category == category_index)
+            for category_index in range(len(self.categories))
+        )
+        self.category_weighted_max = tuple(
+            sum(max_value * weight for max_value, weight, category in zip(max_values, column_weights, column_categories) if category == category_index)
+            for category_index in range(len(self.categories))
+        )
+        weighted_max = sum(self.category_weighted_max)
+        self.percent_factor = 100 / weighted_max if weighted_max > 0 else 0.0
+        self.thresholds = tuple(thresholds)
+        self.levels = tuple(levels)
+
+        self.fragments = tuple(
+            LevelFragment(
+                RiskAssessment(level=level, **RISK_LEVEL_DETAILS[level]),
+                list(recommendations.get(level, [])),
+                list(CRISIS_RESOURCES) if level in emergency_levels else None
+            )
+            for level in self.levels
+        )
+        self.fragment_by_level = dict(zip(self.levels, self.fragments))
+
+    def level_index(self, percentage: float) -> int:
+        return bisect_left(self.thresholds, percentage)
+
+    def score(self, answers: Dict[str, int]) -> ScoreCard:
+        """Validate and score one answer set in a single pass; unanswered questions count as 0"""
+        index = self.index
+        category_totals = [0] * len(self.categories)
+        category_weighted = [0.0] * len(self.categories)
+        for question_id, value in answers.items():
+            entry = index.get(question_id)
+            if entry is None:
+                raise InvalidAnswersException(f"Unknown question id: {question_id}")
+            _, category, max_value, weight = entry
+            if not 0 <= value <= max_value:
+                raise InvalidAnswersException(f"Answer for {question_id} must be between 0 and {max_value}")
+            category_totals[category] += value
+            category_weighted[category] += value * weight
+        percentage = sum(category_weighted) * self.percent_factor
+        return ScoreCard(sum(category_totals), round(percentage, 2), self.level_index(percentage), category_totals, category_weighted)
+
+    def fill_row(self, answers: Dict[str, int], row: List[int]) -> Optional[str]:
+        """Fill an answer-matrix row; return an error message if the answers are invalid"""
+        index = self.index
+        for question_id, value in answers.items():
+            entry = index.get(question_id)
+            if entry is None:
+                return f"Unknown question id: {question_id}"
+            column, _, max_value, _ = entry
+            if not 0 <= value <= max_value:
+                return f"Answer for {question_id} must be between 0 and {max_value}"
+            row[column] = value
+        return None
+
+    def category_scores(self, category_totals: Sequence[int], category_weighted: Sequence[float]) -> List[CategoryScore]:
+        scores = []
+        for name, total, weighted, max_score, weighted_max in zip(
+            self.categories, category_totals, category_weighted, self.category_max, self.category_weighted_max
+        ):
+            percentage = weighted * 100 / weighted_max if weighted_max > 0 else 0.0
+            scores.append(CategoryScore.model_construct(
+                category=name,
+                score=total,
+                max_score=max_score,
+                percentage=round(percentage, 2),
+                risk_level=self.levels[self.level_index(percentage)]
+            ))
+        return scores
+
+class ScoringEngine:
+    """Compiles the scoring tables once, from the constants and an optional JSON config.
+
+    The config file (settings.assessment_scoring_config_path) may override
+    any of "weights" ({question id: weight}), "thresholds" (inclusive upper
+    percentage bounds, one fewer than the risk levels), "recommendations"
+    ({level: [text, ...]}) and "emergency_levels".
+    """
+
+    def __init__(self, config_path: str = ""):
+        self.config_path = config_path
+        self._compiled: Optional[CompiledScoring] = None
+
+    def _load_config(self) -> Dict[str, Any]:
+        if not self.config_path:
+            return {}
+        with open(self.config_path, encoding="utf-8") as config_file:
+            return json.load(config_file)
+
+    def compile(self) -> CompiledScoring:
+        """Build the scoring tables (done lazily on first use, or eagerly at startup)"""
+        if self._compiled is None:
+            config = self._load_config()
+            self._compiled = CompiledScoring(
+                ASSESSMENT_QUESTIONS,
+                config.get("weights", QUESTION_WEIGHTS),
+                config.get("thresholds", RISK_THRESHOLDS),
+                RISK_LEVELS,
+                {**RISK_RECOMMENDATIONS, **config.get("recommendations", {})},
+                config.get("emergency_levels", EMERGENCY_RISK_LEVELS)
+            )
+            if config:
+                logger.info(f"Assessment scoring config loaded from {self.config_path}")
+        return self._compiled
+
+scoring_engine = ScoringEngine(settings.assessment_scoring_config_path)
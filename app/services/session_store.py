@@ -0,0 +1,177 @@
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
+from app.config.settings import settings
+from app.models.chat import Message
+import json
+import logging
+import secrets
+import time
+
+logger = logging.getLogger(__name__)
+
+class ConversationSession:
+    """Compact per-session history: (role, content) tuples, newest last"""
+
+    __slots__ = ("session_id", "messages", "last_seen")
+
+    def __init__(self, session_id: str, messages: Optional[List[Tuple[str, str]]] = None, last_seen: Optional[float] = None):
+        self.session_id = session_id
+        self.messages = messages or []
+        self.last_seen = last_seen or time.time()
+
+    def history(self) -> List[Message]:
+        return [Message.model_construct(role=role, content=content) for role, content in self.messages]
+
+class SessionStore:
+    """Server-side conversation sessions.
+
+    Sessions live in an LRU-bounded memory tier ordered by last access, so
+    idle-TTL expiry only has to look at the cold end. With a SQLite path
+    configured, sessions pushed out of memory by the LRU bound are spilled
+    to disk and loaded back on their next turn.
+    """
+
+    def __init__(self, max_sessions: int, idle_ttl: float, max_messages: int, sqlite_path: str = ""):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_messages = max_messages
+        self.sqlite_path = sqlite_path
+        self._sessions: "OrderedDict[str, ConversationSession]" = OrderedDict()
+        self._db = None
+        self.spilled = 0
+        self.expired = 0
+
+    async def _connection(self):
+        if self._db is None:
+            import aiosqlite
+
+            db = await aiosqlite.connect(self.sqlite_path)
+            await db.execute(
+                "CREATE TABLE IF NOT EXISTS chat_sessions ("
+                "session_id TEXT PRIMARY KEY, messages TEXT NOT NULL, last_seen REAL NOT NULL)"
+            )
+            await db.commit()
+            self._db = db
+        return self._db
+
+    def _expire_idle(self, now: float):
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if now - session.last_seen < self.idle_ttl:
+                break
+            self._sessions.popitem(last=False)
+            self.expired += 1
+
+    async def _evict_overflow(self):
+        while len(self._sessions) > self.max_sessions:
+            _, session = self._sessions.popitem(last=False)
+            if self.sqlite_path:
+                await self._spill(session)
+
+    async def _spill(self, session: ConversationSession):
+        try:
+            db = await self._connection()
+            await db.execute(
+                "INSERT OR REPLACE INTO chat_sessions (session_id, messages, last_seen) VALUES (?, ?, ?)",
+                (session.session_id, json.dumps(session.messages, ensure_ascii=False), session.last_seen)
+            )
+            await db.commit()
+            self.spilled += 1
+        except Exception as e:
+            logger.warning(f"Failed to spill chat session: {str(e)}")
+
+    async def _load_spilled(self, session_id: str, now: float) -> Optional[ConversationSession]:
+        try:
+            db = await self._connection()
+            async with db.execute(
+                "SELECT messages, last_seen FROM chat_sessions WHERE session_id = ?",
+                (session_id,)
+            ) as cursor:
+                row = await cursor.fetchone()
+            if row is None:
+                return None
+            await db.execute("DELETE FROM chat_sessions WHERE session_id = ?", (session_id,))
+            await db.execute("DELETE FROM chat_sessions WHERE last_seen < ?", (now - self.idle_ttl,))
+            await db.commit()
+            if now - row[1] >= self.idle_ttl:
+                return None
+            return ConversationSession(session_id, [tuple(msg) for msg in json.loads(row[0])], row[1])
+        except Exception as e:
+            logger.warning(f"Failed to load spilled chat session: {str(e)}")
+            return None
+
+    async def get(self, session_id: str) -> Optional[ConversationSession]:
+        """Look up a live session and mark it as recently used"""
+        now = time.time()
+        self._expire_idle(now)
+        session = self._sessions.get(session_id)
+        if session is None and self.sqlite_path:
+            session = await self._load_spilled(session_id, now)
+            if session is not None:
+                self._sessions[session_id] = session
+                await self._evict_overflow()
+        if session is None:
+            return None
+        session.last_seen = now
+        self._sessions.move_to_end(session_id)
+        return session
+
+    async def create(self, seed: Sequence[Message] = ()) -> ConversationSession:
+        """Start a new session, optionally seeded with client-side history"""
+        self._expire_idle(time.time())
+        session = ConversationSession(
+            secrets.token_urlsafe(16),
+            [(msg.role, msg.content) for msg in seed][-self.max_messages:]
+        )
+        self._sessions[session.session_id] = session
+        await self._evict_overflow()
+        return session
+
+    async def touch(self, session: ConversationSession):
+        """Mark a session held by a long-lived connection as recently used.
+
+        The connection's copy is authoritative: it is put back in the memory
+        tier even if it was expired or spilled in the meantime.
+        """
+        now = time.time()
+        self._expire_idle(now)
+        session.last_seen = now
+        self._sessions[session.session_id] = session
+        self._sessions.move_to_end(session.session_id)
+        await self._evict_overflow()
+
+    def append(self, session: ConversationSession, *messages: Tuple[str, str]):
+        """Add turns to a session, keeping at most max_messages"""
+        session.messages.extend(messages)
+        if len(session.messages) > self.max_messages:
+            del session.messages[:len(session.messages) - self.max_messages]
+        session.last_seen = time.time()
+
+    async def close(self):
+        # Persist live sessions so they survive a restart
+        if self.sqlite_path and self._sessions:
+            try:
+                db = await self._connection()
+                await db.executemany(
+                    "INSERT OR REPLACE INTO chat_sessions (session_id, messages, last_seen) VALUES (?, ?, ?)",
+                    [
+                        (session.session_id, json.dumps(session.messages, ensure_ascii=False), session.last_seen)
+                        for session in self._sessions.values()
+                    ]
+                )
+                await db.commit()
+            except Exception as e:
+                logger.warning(f"Failed to persist chat sessions: {str(e)}")
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+session_store = SessionStore(
+    settings.session_max_sessions,
+    settings.session_idle_ttl_seconds,
+    settings.session_max_messages,
+    settings.session_sqlite_path
+)
@@ -0,0 +1,249 @@
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from app.config.settings import settings
+from app.core.constants import QUESTION_IDS, QUESTION_INDEX, QUESTION_MAX_VALUES, MAX_SCORE, RISK_LEVELS
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+MINUTE = 60
+HOUR = 3600
+
+# Window name -> (bucket granularity, number of buckets)
+WINDOWS = {
+    "last_hour": ("minute", 60),
+    "last_day": ("hour", 24),
+    "last_week": ("hour", 168)
+}
+BUCKET_SECONDS = {"minute": MINUTE, "hour": HOUR}
+BUCKET_RETENTION = {"minute": 60, "hour": 168}
+
+class AssessmentStatistics:
+    """Incrementally aggregated assessment statistics.
+
+    record() only bumps in-memory counters; a background task persists the
+    accumulated deltas to SQLite in one batch every flush interval, and the
+    counters are restored from there at startup. Time windows come from
+    per-minute and per-hour buckets, so no raw rows are ever rescanned.
+    """
+
+    def __init__(self, db_path: Optional[str], flush_interval: float, snapshot_ttl: float):
+        self.db_path = db_path
+        self.persist = bool(db_path)
+        self.flush_interval = flush_interval
+        self.snapshot_ttl = snapshot_ttl
+
+        self.total = 0
+        self.risk_distribution = dict.fromkeys(RISK_LEVELS, 0)
+        self.score_histogram = [0] * (MAX_SCORE + 1)
+        self.answer_distribution = [[0] * (max_value + 1) for max_value in QUESTION_MAX_VALUES]
+        # granularity -> {bucket start (epoch seconds): per-level counts}
+        self._buckets: Dict[str, Dict[int, List[int]]] = {"minute": {}, "hour": {}}
+
+        # Deltas not yet written to SQLite
+        self._pending_counters: Dict[str, int] = defaultdict(int)
+        self._pending_buckets: Dict[Tuple[str, int, str], int] = defaultdict(int)
+
+        self._snapshot: Optional[dict] = None
+        self._snapshot_at = 0.0
+        self._db = None
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def record(self, total_score: int, risk_level: str, answers: Dict[str, int]):
+        """Count one completed assessment (in memory only, never blocks)"""
+        level_index = RISK_LEVELS.index(risk_level)
+        self.total += 1
+        self.risk_distribution[risk_level] += 1
+        pending = self._pending_counters if self.persist else None
+        if 0 <= total_score <= MAX_SCORE:
+            self.score_histogram[total_score] += 1
+            if pending is not None:
+                pending[f"score:{total_score}"] += 1
+        if pending is not None:
+            pending["total"] += 1
+            pending[f"risk:{risk_level}"] += 1
+
+        for question_id, value in answers.items():
+            column = QUESTION_INDEX.get(question_id)
+            if column is not None and 0 <= value <= QUESTION_MAX_VALUES[column]:
+                self.answer_distribution[column][value] += 1
+                if pending is not None:
+                    pending[f"answer:{question_id}:{value}"] += 1
+
+        now = int(time.time())
+        for granularity, seconds in BUCKET_SECONDS.items():
+            start = now - now % seconds
+            buckets = self._buckets[granularity]
+            counts = buckets.get(start)
+            if counts is None:
+                counts = buckets[start] = [0] * len(RISK_LEVELS)
+                self._prune_buckets(granularity, now)
+            counts[level_index] += 1
+            if pending is not None:
+                self._pending_buckets[(granularity, start, risk_level)] += 1
+
+    def _prune_buckets(self, granularity: str, now: int):
+        cutoff = now - BUCKET_SECONDS[granularity] * BUCKET_RETENTION[granularity]
+        buckets = self._buckets[granularity]
+        for start in [start for start in buckets if start <= cutoff]:
+            del buckets[start]
+
+    def _window(self, granularity: str, count: int, now: int) -> dict:
+        seconds = BUCKET_SECONDS[granularity]
+        current = now - now % seconds
+        cutoff = current - seconds * (count - 1)
+        totals = [0] * len(RISK_LEVELS)
+        for start, counts in self._buckets[granularity].items():
+            if start >= cutoff:
+                for level_index, value in enumerate(counts):
+                    totals[level_index] += value
+        return {
+            "total_assessments": sum(totals),
+            "risk_distribution": dict(zip(RISK_LEVELS, totals))
+        }
+
+    def snapshot(self) -> dict:
+        """Current statistics; rebuilt at most once per snapshot TTL"""
+        now = time.monotonic()
+        if self._snapshot is not None and now - self._snapshot_at < self.snapshot_ttl:
+            return self._snapshot
+
+        wall_now = int(time.time())
+        self._snapshot = {
+            "total_assessments": self.total,
+            "risk_distribution": dict(self.risk_distribution),
+            "score_histogram": {str(score): count for score, count in enumerate(self.score_histogram) if count},
+            "answer_distribution": {
+                question_id: {str(value): count for value, count in enumerate(self.answer_distribution[column])}
+                for column, question_id in enumerate(QUESTION_IDS)
+            },
+            "windows": {
+                name: self._window(granularity, count, wall_now)
+                for name, (granularity, count) in WINDOWS.items()
+            },
+            "generated_at": datetime.now(timezone.utc).isoformat()
+        }
+        self._snapshot_at = now
+        return self._snapshot
+
+    async def _connection(self):
+        if self._db is None:
+            import aiosqlite
+
+            db = await aiosqlite.connect(self.db_path)
+            await db.execute(
+                "CREATE TABLE IF NOT EXISTS assessment_counters ("
+                "key TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+            )
+            await db.execute(
+                "CREATE TABLE IF NOT EXISTS assessment_buckets ("
+                "granularity TEXT NOT NULL, bucket INTEGER NOT NULL, risk_level TEXT NOT NULL, "
+                "count INTEGER NOT NULL, PRIMARY KEY (granularity, bucket, risk_level))"
+            )
+            await db.commit()
+            self._db = db
+        return self._db
+
+    async def load(self):
+        """Restore counters and recent buckets from SQLite"""
+        db = await self._connection()
+        async with db.execute("SELECT key, value FROM assessment_counters") as cursor:
+            async for key, value in cursor:
+                kind, _, rest = key.partition(":")
+                if kind == "total":
+                    self.total += value
+                elif kind == "risk" and rest in self.risk_distribution:
+                    self.risk_distribution[rest] += value
+                elif kind == "score" and 0 <= int(rest) <= MAX_SCORE:
+                    self.score_histogram[int(rest)] += value
+                elif kind == "answer":
+                    question_id, _, answer = rest.rpartition(":")
+                    column = QUESTION_INDEX.get(question_id)
+                    if column is not None and 0 <= int(answer) <= QUESTION_MAX_VALUES[column]:
+                        self.answer_distribution[column][int(answer)] += value
+
+        now = int(time.time())
+        for granularity, seconds in BUCKET_SECONDS.items():
+            cutoff = now - seconds * BUCKET_RETENTION[granularity]
+            async with db.execute(
+                "SELECT bucket, risk_level, count FROM assessment_buckets WHERE granularity = ? AND bucket > ?",
+                (granularity, cutoff)
+            ) as cursor:
+                async for bucket, risk_level, count in cursor:
+                    if risk_level in self.risk_distribution:
+                        counts = self._buckets[granularity].setdefault(bucket, [0] * len(RISK_LEVELS))
+                        counts[RISK_LEVELS.index(risk_level)] += count
+        self._snapshot = None
+        logger.info(f"Assessment statistics restored: {self.total} assessments")
+
+    async def flush(self):
+        """Write accumulated counter deltas to SQLite in one batch"""
+        if not self._pending_counters and not self._pending_buckets:
+            return
+        counters, self._pending_counters = self._pending_counters, defaultdict(int)
+        buckets, self._pending_buckets = self._pending_buckets, defaultdict(int)
+        try:
+            db = await self._connection()
+            await db.executemany(
+                "INSERT INTO assessment_counters (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = value + excluded.value",
+                list(counters.items())
+            )
+            await db.executemany(
+                "INSERT INTO assessment_buckets (granularity, bucket, risk_level, count) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(granularity, bucket, risk_level) DO UPDATE SET count = count + excluded.count",
+                [(granularity, bucket, level, count) for (granularity, bucket, level), count in buckets.items()]
+            )
+            now = int(time.time())
+            for granularity, seconds in BUCKET_SECONDS.items():
+                await db.execute(
+                    "DELETE FROM assessment_buckets WHERE granularity = ? AND bucket <= ?",
+                    (granularity, now - seconds * BUCKET_RETENTION[granularity])
+                )
+            await db.commit()
+        except Exception as e:
+            # Discard the partial upserts so the next flush does not commit them as well
+            if self._db is not None:
+                try:
+                    await self._db.rollback()
+                except Exception as rollback_error:
+                    logger.warning(f"Failed to roll back assessment statistics: {str(rollback_error)}")
+            # Keep the deltas for the next attempt
+            for key, value in counters.items():
+                self._pending_counters[key] += value
+            for key, value in buckets.items():
+                self._pending_buckets[key] += value
+            logger.warning(f"Failed to flush assessment statistics: {str(e)}")
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def start(self):
+        if not self.persist:
+            return
+        try:
+            await self.load()
+        except Exception as e:
+            logger.warning(f"Failed to restore assessment statistics: {str(e)}")
+        self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        if self.persist:
+            await self.flush()
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+
+assessment_statistics = AssessmentStatistics(
+    settings.statistics_sqlite_path if settings.statistics_persistence_enabled else None,
+    settings.statistics_flush_interval_seconds,
+    settings.statistics_snapshot_ttl_seconds
+)
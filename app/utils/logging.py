@@ -1,12 +1,149 @@
+import atexit
+import json
 import logging
+import logging.handlers
+import queue
+import random
 import sys
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional
+from app.config.settings import settings
 
-def setup_logging():
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Longest string logged verbatim from structured data
+MAX_FIELD_CHARS = 100
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+def _render_value(value):
+    if isinstance(value, str) and len(value) > MAX_FIELD_CHARS:
+        return value[:MAX_FIELD_CHARS] + "..."
+    return value
+
+class TextFormatter(logging.Formatter):
+    """The classic text format, followed by any structured `data` as key=value"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        data = getattr(record, "data", None)
+        if data:
+            line += " " + " ".join(f"{key}={_render_value(value)!r}" for key, value in data.items())
+        return line
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; structured `data` is merged in"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        data = getattr(record, "data", None)
+        if data:
+            for key, value in data.items():
+                entry.setdefault(key, _render_value(value))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of records from selected loggers.
+
+    Rates are keyed by logger name; the most specific configured prefix
+    wins. Warnings and errors are never sampled out.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        # Most specific prefix first
+        self.rates = sorted(rates.items(), key=lambda item: len(item[0]), reverse=True)
+        self._cache: Dict[str, float] = {}
+
+    def _rate(self, name: str) -> float:
+        rate = self._cache.get(name)
+        if rate is None:
+            rate = 1.0
+            for prefix, prefix_rate in self.rates:
+                if name == prefix or name.startswith(prefix + "."):
+                    rate = prefix_rate
+                    break
+            self._cache[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+class RedactionFilter(logging.Filter):
+    """Replace user-content fields of structured `data` with their length"""
+
+    def __init__(self, fields: Iterable[str]):
+        super().__init__()
+        self.fields = frozenset(fields)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        data = getattr(record, "data", None)
+        if data and not self.fields.isdisjoint(data):
+            record.data = {
+                key: f"<redacted {len(value)} chars>" if key in self.fields and isinstance(value, str) else value
+                for key, value in data.items()
+            }
+        return True
+
+def stop_logging():
+    """Drain queued records and stop the background listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+atexit.register(stop_logging)
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """Enqueue records untouched; all formatting happens on the listener thread"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+def setup_logging(
+    level: Optional[str] = None,
+    use_queue: Optional[bool] = None,
+    json_format: Optional[bool] = None,
+    sample_rates: Optional[Dict[str, float]] = None,
+    redact_fields: Optional[Iterable[str]] = None
+):
     """Setup logging configuration"""
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
+    global _listener
+    level = level or settings.log_level
+    use_queue = settings.log_queue_enabled if use_queue is None else use_queue
+    json_format = settings.log_json if json_format is None else json_format
+    sample_rates = settings.log_sample_rates if sample_rates is None else sample_rates
+    if redact_fields is None:
+        redact_fields = settings.log_redact_fields if settings.log_redact_user_content else ()
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter() if json_format else TextFormatter(TEXT_FORMAT))
+
+    stop_logging()
+
+    if use_queue:
+        # Records are handed to a background thread; stdout back-pressure
+        # never blocks the event loop
+        handler = LazyQueueHandler(queue.SimpleQueue())
+        _listener = logging.handlers.QueueListener(handler.queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+    else:
+        handler = stream_handler
+
+    # Filters run before enqueueing, so sampled-out records cost almost nothing
+    if sample_rates:
+        handler.addFilter(SamplingFilter(sample_rates))
+    if redact_fields:
+        handler.addFilter(RedactionFilter(redact_fields))
+
+    logging.basicConfig(level=level, handlers=[handler], force=True)
@@ -0,0 +1,182 @@
+from bisect import bisect_left
+from typing import Callable, Dict, List, Sequence, Tuple
+
+# Latency buckets in seconds, from a cache hit to a slow LLM completion
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Monotonic counter per label combination"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        return [
+            f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+            for labels, value in self._values.items()
+        ]
+
+class Histogram:
+    """Fixed-bucket histogram per label combination"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts..., overflow count, sum]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labels: str):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = []
+        for labels, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+class CallbackGauge:
+    """Gauge whose values are read from a callback at scrape time"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str], callback: Callable[[], Dict[Tuple[str, ...], float]]):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+
+    def render(self) -> List[str]:
+        return [
+            f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+            for labels, value in self.callback().items()
+        ]
+
+class MetricsRegistry:
+    """Holds every metric and renders the Prometheus text exposition format.
+
+    Metrics are only touched from the event loop thread, so recording is a
+    plain dict/list update with no locking.
+    """
+
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, help_text, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, help_text, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge_callback(self, name: str, help_text: str, labelnames: Sequence[str], callback: Callable[[], Dict[Tuple[str, ...], float]]) -> CallbackGauge:
+        metric = CallbackGauge(name, help_text, labelnames, callback)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+HTTP_REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route",
+    ("method", "route", "status")
+)
+AZURE_OPENAI_REQUEST_DURATION = registry.histogram(
+    "azure_openai_request_duration_seconds",
+    "Azure OpenAI call latency, including retries",
+    ("deployment", "mode", "outcome")
+)
+AZURE_OPENAI_TIME_TO_FIRST_TOKEN = registry.histogram(
+    "azure_openai_time_to_first_token_seconds",
+    "Time from starting a streamed completion to its first content token",
+    ("deployment",)
+)
+AZURE_OPENAI_TOKENS = registry.counter(
+    "azure_openai_tokens_total",
+    "Tokens reported by Azure OpenAI usage data",
+    ("deployment", "kind")
+)
+CRISIS_CHECKS = registry.counter(
+    "chat_crisis_checks_total",
+    "Messages checked for crisis indicators, by result",
+    ("source", "result")
+)
+CHAT_FALLBACKS = registry.counter(
+    "chat_fallback_responses_total",
+    "Chat replies replaced by the fallback message",
+    ("mode", "reason")
+)
+CHAT_ROUTES = registry.counter(
+    "chat_model_routes_total",
+    "Chat turns by model route and routing reason",
+    ("route", "reason")
+)
+AZURE_OPENAI_MEMBER_REQUESTS = registry.counter(
+    "azure_openai_endpoint_requests_total",
+    "Requests per Azure OpenAI pool member, by outcome",
+    ("member", "outcome")
+)
+AZURE_OPENAI_HEDGES = registry.counter(
+    "azure_openai_hedged_requests_total",
+    "Requests duplicated to a second endpoint after the hedging delay",
+    ("mode",)
+)
+CHAT_SHED = registry.counter(
+    "chat_shed_requests_total",
+    "Chat turns shed by admission control, by reason and how they were answered",
+    ("reason", "action")
+)
+CHAT_RATE_LIMITED = registry.counter(
+    "chat_rate_limited_requests_total",
+    "Chat turns refused by per-client rate limiting, by exhausted bucket",
+    ("limit",)
+)
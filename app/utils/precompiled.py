@@ -0,0 +1,99 @@
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import Request
+from fastapi.responses import Response
+import gzip
+import hashlib
+import json
+
+try:
+    import brotli
+except ImportError:  # optional: brotli variant is skipped without it
+    brotli = None
+
+# Preferred order when the client accepts several encodings equally
+ENCODING_PREFERENCE = ("br", "gzip", "identity")
+
+def parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    """Parse an Accept-Encoding header into {coding: q}"""
+    accepted: Dict[str, float] = {}
+    if not header:
+        return accepted
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding] = q
+    return accepted
+
+class PrecompiledResponse:
+    """A constant JSON payload encoded once, served with ETag and compression.
+
+    Every representation (identity, gzip, br) gets its own strong ETag so
+    caches never mix encodings; conditional requests matching any of them
+    get 304 Not Modified.
+    """
+
+    def __init__(self, content: Any, max_age: int):
+        body = json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        digest = hashlib.sha256(body).hexdigest()[:32]
+
+        self._variants: Dict[str, Tuple[bytes, str]] = {
+            "identity": (body, f'"{digest}"'),
+            # mtime=0 keeps the gzip bytes (and so the ETag) stable across restarts
+            "gzip": (gzip.compress(body, compresslevel=9, mtime=0), f'"{digest}-gz"')
+        }
+        if brotli is not None:
+            self._variants["br"] = (brotli.compress(body, quality=11), f'"{digest}-br"')
+
+        self._etags = {etag for _, etag in self._variants.values()}
+        self.cache_control = f"public, max-age={max_age}"
+
+    def _choose_encoding(self, accept_encoding: Optional[str]) -> str:
+        accepted = parse_accept_encoding(accept_encoding)
+        wildcard = accepted.get("*", 0.0)
+        best, best_q = "identity", 0.0
+        for coding in ENCODING_PREFERENCE:
+            if coding not in self._variants:
+                continue
+            q = accepted.get(coding, wildcard if coding != "identity" else 1.0)
+            if q > best_q:
+                best, best_q = coding, q
+        return best
+
+    def _not_modified(self, if_none_match: Optional[str]) -> bool:
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        candidates: List[str] = []
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            # If-None-Match uses weak comparison
+            if tag.startswith("W/"):
+                tag = tag[2:]
+            candidates.append(tag)
+        return any(tag in self._etags for tag in candidates)
+
+    def respond(self, request: Request) -> Response:
+        encoding = self._choose_encoding(request.headers.get("accept-encoding"))
+        body, etag = self._variants[encoding]
+        headers = {
+            "ETag": etag,
+            "Cache-Control": self.cache_control,
+            "Vary": "Accept-Encoding"
+        }
+
+        if self._not_modified(request.headers.get("if-none-match")):
+            return Response(status_code=304, headers=headers)
+
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,85 @@
+from typing import Mapping, Optional
+import logging
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a half-open probe.
+
+    closed -> open after `failure_threshold` consecutive failures;
+    open -> half_open once `recovery_seconds` have passed, letting a single
+    probe request through; the probe's outcome closes or re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, recovery_seconds: float, name: str = "circuit"):
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.name = name
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_seconds:
+            return self.HALF_OPEN
+        return self._state
+
+    def allow_request(self) -> bool:
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        if self._state != self.CLOSED:
+            logger.info(f"Circuit {self.name} closed")
+        self._state = self.CLOSED
+        self._failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self._failures += 1
+        if self._probe_in_flight or self._failures >= self.failure_threshold:
+            if self._state != self.OPEN or self._probe_in_flight:
+                logger.warning(f"Circuit {self.name} opened after {self._failures} consecutive failures")
+            self._state = self.OPEN
+            self._opened_at = time.monotonic()
+        self._probe_in_flight = False
+
+    def release_probe(self):
+        """Give the half-open probe slot back when the probe ended without a verdict"""
+        self._probe_in_flight = False
+
+def parse_retry_after(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """Read the server-requested delay from Retry-After / retry-after-ms headers"""
+    if not headers:
+        return None
+    try:
+        retry_after_ms = headers.get("retry-after-ms")
+        if retry_after_ms is not None:
+            return float(retry_after_ms) / 1000
+        retry_after = headers.get("retry-after")
+        if retry_after is not None:
+            return float(retry_after)
+    except ValueError:
+        # HTTP-date form; fall back to our own backoff
+        return None
+    return None
+
+def backoff_delay(attempt: int, base: float, cap: float, retry_after: Optional[float] = None) -> float:
+    """Exponential backoff with full jitter, never shorter than Retry-After"""
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
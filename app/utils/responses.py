@@ -0,0 +1,34 @@
+from typing import Any
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+import json
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to the stdlib encoder
+    orjson = None
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+def dumps(content: Any) -> bytes:
+    """Compact UTF-8 JSON, through orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":"), allow_nan=False).encode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    """Default response class: pydantic models are serialized by pydantic-core
+    in one pass, everything else by orjson.
+
+    Being the default class only changes the final rendering: FastAPI still
+    runs `jsonable_encoder` (and re-validates response models) on whatever a
+    route returns. Routes return `FastJSONResponse(...)` directly to skip that.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.__pydantic_serializer__.to_json(content)
+        return dumps(content)
@@ -0,0 +1,53 @@
+from typing import Awaitable, Callable, Dict, TypeVar
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one shared task.
+
+    The work runs in its own task and every caller awaits it through
+    asyncio.shield, so a caller being cancelled (e.g. its client
+    disconnected) does not cancel the work for the others. The task is
+    only cancelled once the last waiter has gone away.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _task: self._forget(key, flight))
+        else:
+            self.coalesced += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                logger.info("All callers left an in-flight call, cancelling it")
+                flight.task.cancel()
+                self._forget(key, flight)
+
+    def _forget(self, key: str, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def __len__(self) -> int:
+        return len(self._flights)
@@ -0,0 +1,14 @@
+from typing import Any
+from app.utils.responses import dumps
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    # Stop reverse proxies (nginx, Azure front door) from buffering the stream
+    "X-Accel-Buffering": "no"
+}
+
+def format_sse(event: str, data: Any) -> str:
+    """Encode a single Server-Sent Events frame"""
+    payload = dumps(data).decode("utf-8")
+    return f"event: {event}\ndata: {payload}\n\n"
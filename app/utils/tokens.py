@@ -0,0 +1,41 @@
+from app.config.settings import settings
+import logging
+import math
+
+logger = logging.getLogger(__name__)
+
+# Rough calibration for Indonesian text with OpenAI BPE encodings: words are
+# long and split into more pieces than English (~4 chars per token).
+# Overestimating slightly keeps prompts safely under budget.
+CHARS_PER_TOKEN = 3.2
+
+# Chat format overhead (role markers and separators) per message and per reply
+TOKENS_PER_MESSAGE = 4
+TOKENS_PER_REPLY = 3
+
+_encoder = None
+_encoder_loaded = False
+
+def _get_encoder():
+    """Load the configured tiktoken encoding once, if tiktoken is installed"""
+    global _encoder, _encoder_loaded
+    if not _encoder_loaded:
+        _encoder_loaded = True
+        if settings.chat_tokenizer_encoding:
+            try:
+                import tiktoken
+                _encoder = tiktoken.get_encoding(settings.chat_tokenizer_encoding)
+            except Exception as e:
+                logger.warning(f"Tokenizer unavailable, using estimator: {str(e)}")
+    return _encoder
+
+def count_tokens(text: str) -> int:
+    """Count (or estimate) the tokens in a piece of text"""
+    encoder = _get_encoder()
+    if encoder is not None:
+        return len(encoder.encode(text))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def count_message_tokens(content: str) -> int:
+    """Tokens used by one chat message, including format overhead"""
+    return count_tokens(content) + TOKENS_PER_MESSAGE
@@ -0,0 +1,170 @@
+"""Local stand-in for the Azure OpenAI chat completions API.
+
+Serves POST /openai/deployments/{deployment}/chat/completions with
+configurable latency, streaming pace, error and 429 injection, and token
+usage, so the service can be load-tested offline:
+
+    python -m benchmarks.fake_openai --port 8100 --latency 0.3 --rate-limit-rate 0.05
+"""
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+REPLY = (
+    "Terima kasih sudah bercerita. Saya mendengar bahwa situasi ini terasa berat untuk Anda. "
+    "Mari kita coba pahami pelan-pelan apa yang memicu keinginan untuk berjudi, "
+    "lalu cari satu langkah kecil yang bisa Anda lakukan hari ini."
+)
+
+class FakeConfig:
+    """Behaviour of the fake upstream; every delay is in seconds"""
+
+    def __init__(
+        self,
+        latency: float = 0.2,
+        jitter: float = 0.05,
+        ttft: float = 0.15,
+        token_interval: float = 0.01,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        retry_after_ms: int = 200,
+        reply_words: int = 40
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.ttft = ttft
+        self.token_interval = token_interval
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after_ms = retry_after_ms
+        self.reply_words = reply_words
+
+def _reply_tokens(config: FakeConfig):
+    words = REPLY.split()
+    return [(" " if i else "") + words[i % len(words)] for i in range(config.reply_words)]
+
+def _prompt_tokens(body: dict) -> int:
+    # Close enough to a real tokenizer for load testing
+    chars = sum(len(str(msg.get("content", ""))) for msg in body.get("messages", []))
+    return max(1, chars // 4)
+
+def _delay(base: float, config: FakeConfig) -> float:
+    return max(0.0, base + random.uniform(-config.jitter, config.jitter))
+
+def create_app(config: FakeConfig) -> Starlette:
+    async def chat_completions(request: Request):
+        body = await request.json()
+        deployment = request.path_params["deployment"]
+        # Like Azure, api-versions before 2024-09-01-preview reject stream_options
+        if body.get("stream_options") and request.query_params.get("api-version", "")[:10] < "2024-09-01":
+            return JSONResponse(
+                {"error": {"code": "BadRequest", "message": "Unrecognized request argument supplied: stream_options"}},
+                status_code=400
+            )
+
+        roll = random.random()
+        if roll < config.rate_limit_rate:
+            return JSONResponse(
+                {"error": {"code": "429", "message": "Rate limit is exceeded."}},
+                status_code=429,
+                headers={"retry-after-ms": str(config.retry_after_ms), "retry-after": str(max(1, config.retry_after_ms // 1000))}
+            )
+        if roll < config.rate_limit_rate + config.error_rate:
+            await asyncio.sleep(_delay(config.ttft, config))
+            return JSONResponse({"error": {"code": "500", "message": "Injected upstream error."}}, status_code=500)
+
+        tokens = _reply_tokens(config)
+        usage = {
+            "prompt_tokens": _prompt_tokens(body),
+            "completion_tokens": len(tokens),
+            "total_tokens": _prompt_tokens(body) + len(tokens)
+        }
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+
+        if not body.get("stream"):
+            await asyncio.sleep(_delay(config.latency, config))
+            return JSONResponse({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": deployment,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(tokens)},
+                    "finish_reason": "stop"
+                }],
+                "usage": usage
+            })
+
+        include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+
+        def chunk(delta: dict, finish_reason=None, with_choices=True, chunk_usage=None) -> str:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": deployment,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}] if with_choices else []
+            }
+            if chunk_usage is not None:
+                payload["usage"] = chunk_usage
+            return f"data: {json.dumps(payload)}\n\n"
+
+        async def events():
+            await asyncio.sleep(_delay(config.ttft, config))
+            yield chunk({"role": "assistant", "content": ""})
+            for token in tokens:
+                yield chunk({"content": token})
+                if config.token_interval:
+                    await asyncio.sleep(config.token_interval)
+            yield chunk({}, finish_reason="stop")
+            if include_usage:
+                yield chunk({}, with_choices=False, chunk_usage=usage)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return Starlette(routes=[
+        Route("/openai/deployments/{deployment}/chat/completions", chat_completions, methods=["POST"])
+    ])
+
+def add_arguments(parser: argparse.ArgumentParser):
+    defaults = FakeConfig()
+    parser.add_argument("--latency", type=float, default=defaults.latency, help="non-streamed completion latency")
+    parser.add_argument("--jitter", type=float, default=defaults.jitter, help="uniform +/- jitter on every delay")
+    parser.add_argument("--ttft", type=float, default=defaults.ttft, help="streamed time to first token")
+    parser.add_argument("--token-interval", type=float, default=defaults.token_interval, help="delay between streamed tokens")
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate, help="fraction of calls answered with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=defaults.rate_limit_rate, help="fraction of calls answered with 429")
+    parser.add_argument("--retry-after-ms", type=int, default=defaults.retry_after_ms, help="retry-after-ms sent with 429s")
+    parser.add_argument("--reply-words", type=int, default=defaults.reply_words, help="completion length in tokens")
+
+def config_from_args(args: argparse.Namespace) -> FakeConfig:
+    return FakeConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        ttft=args.ttft,
+        token_interval=args.token_interval,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after_ms=args.retry_after_ms,
+        reply_words=args.reply_words
+    )
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Fake Azure OpenAI server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    add_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_app(config_from_args(args)), host=args.host, port=args.port, log_level="warning")
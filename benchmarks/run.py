@@ -0,0 +1,330 @@
+"""Load-test the service against the local fake Azure OpenAI server.
+
+Starts benchmarks.fake_openai and the FastAPI app (app.main:app) as
+subprocesses on free ports, drives each scenario with a fixed number of
+concurrent clients, and reports throughput and p50/p95/p99 latency:
+
+    python -m benchmarks.run --concurrency 32 --requests 2000
+    python -m benchmarks.run --save-baseline benchmarks/baselines/local.json
+    python -m benchmarks.run --compare benchmarks/baselines/local.json
+
+With --compare the run exits with status 1 when any scenario's throughput
+drops, or its p95/p99 latency rises, by more than --tolerance. Use
+--target to benchmark an already running instance instead.
+"""
+from benchmarks.fake_openai import add_arguments as add_fake_arguments
+from app.core.constants import FALLBACK_RESPONSE, QUESTION_IDS, QUESTION_MAX_VALUES
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+import argparse
+import asyncio
+import httpx
+import json
+import math
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+CHAT_OPENERS = [
+    "Halo, saya merasa sulit berhenti main slot online",
+    "Saya sudah kalah banyak minggu ini dan takut cerita ke keluarga",
+    "Bagaimana cara menahan keinginan untuk deposit lagi?",
+    "Saya berutang karena judi, apa yang harus saya lakukan?"
+]
+
+CRISIS_CHECK_MESSAGES = [
+    "Hari ini saya cuma ingin cerita soal pekerjaan",
+    "Saya merasa tidak ada jalan keluar dari utang judi ini",
+    "Kadang saya berpikir untuk mengakhiri hidup",
+    "Saya ingin mulai menabung lagi bulan depan"
+]
+
+# Scenario name -> (method, path, payload factory taking the request index)
+Scenario = Tuple[str, str, Optional[Callable[[int, bool], dict]]]
+
+def _chat_payload(index: int, repeat: bool) -> dict:
+    message = CHAT_OPENERS[index % len(CHAT_OPENERS)]
+    # Unique messages by default, so the completion cache does not hide upstream latency
+    return {"message": message if repeat else f"{message} ({index})"}
+
+def _crisis_check_payload(index: int, repeat: bool) -> dict:
+    return {"message": CRISIS_CHECK_MESSAGES[index % len(CRISIS_CHECK_MESSAGES)]}
+
+def _assessment_payload(index: int, repeat: bool) -> dict:
+    rng = random.Random(index)
+    return {
+        "answers": {question_id: rng.randint(0, max_value) for question_id, max_value in zip(QUESTION_IDS, QUESTION_MAX_VALUES)},
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    }
+
+SCENARIOS: Dict[str, Scenario] = {
+    "chat": ("POST", "/api/chat", _chat_payload),
+    "crisis-check": ("POST", "/api/chat/crisis-check", _crisis_check_payload),
+    "assessment-submit": ("POST", "/api/assessment/submit", _assessment_payload),
+    "assessment-questions": ("GET", "/api/assessment/questions", None)
+}
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, min(len(sorted_values), math.ceil(round(fraction * len(sorted_values), 9))))
+    return sorted_values[rank - 1]
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _wait_ready(url: str, timeout: float, process: Optional[subprocess.Popen] = None):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"Process exited with status {process.returncode} before becoming ready: {url}")
+        try:
+            # Any HTTP answer means the server is accepting connections
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.TransportError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Timed out waiting for {url}")
+
+@contextmanager
+def _processes(args: argparse.Namespace):
+    """Start the fake upstream and the app; yield the app base URL"""
+    if args.target:
+        yield args.target.rstrip("/")
+        return
+
+    fake_port = _free_port()
+    app_port = _free_port()
+    workdir = tempfile.mkdtemp(prefix="bench-")
+
+    fake_cmd = [
+        sys.executable, "-m", "benchmarks.fake_openai", "--port", str(fake_port),
+        "--latency", str(args.latency), "--jitter", str(args.jitter), "--ttft", str(args.ttft),
+        "--token-interval", str(args.token_interval), "--error-rate", str(args.error_rate),
+        "--rate-limit-rate", str(args.rate_limit_rate), "--retry-after-ms", str(args.retry_after_ms),
+        "--reply-words", str(args.reply_words)
+    ]
+    env = dict(os.environ)
+    env.update({
+        "AZURE_OPENAI_ENDPOINT": f"http://127.0.0.1:{fake_port}",
+        "AZURE_OPENAI_API_KEY": "benchmark",
+        "AZURE_OPENAI_API_VERSION": "2024-10-21",
+        "AZURE_OPENAI_DEPLOYMENT_NAME": "benchmark",
+        "LOG_LEVEL": "WARNING",
+        # Measure the service, not the per-client limiter (every request comes from one address)
+        "RATE_LIMIT_ENABLED": "false",
+        # Keep state files out of the working tree
+        "STATISTICS_SQLITE_PATH": os.path.join(workdir, "statistics.db"),
+        "COMPLETION_CACHE_SQLITE_PATH": os.path.join(workdir, "completion_cache.db")
+    })
+    for item in args.app_env:
+        key, _, value = item.partition("=")
+        env[key] = value
+    app_cmd = [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--host", "127.0.0.1", "--port", str(app_port), "--log-level", "warning"
+    ]
+
+    started = []
+    try:
+        fake = subprocess.Popen(fake_cmd)
+        started.append(fake)
+        _wait_ready(f"http://127.0.0.1:{fake_port}/", 30, fake)
+        app = subprocess.Popen(app_cmd, env=env)
+        started.append(app)
+        _wait_ready(f"http://127.0.0.1:{app_port}/health", 30, app)
+        yield f"http://127.0.0.1:{app_port}"
+    finally:
+        for process in reversed(started):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+async def run_scenario(base_url: str, name: str, args: argparse.Namespace) -> dict:
+    method, path, payload = SCENARIOS[name]
+    latencies: List[float] = []
+    status_codes: Dict[str, int] = {}
+    errors = 0
+    fallbacks = 0
+    shed = 0
+    counter = iter(range(sys.maxsize))
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        async def send(index: int) -> Tuple[float, Optional[httpx.Response]]:
+            body = payload(index, args.repeat_messages) if payload else None
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+            except httpx.HTTPError:
+                return time.perf_counter() - started, None
+            return time.perf_counter() - started, response
+
+        for index in range(args.warmup):
+            await send(-index - 1)
+
+        deadline = time.perf_counter() + args.duration if args.duration else None
+
+        async def worker():
+            nonlocal errors, fallbacks, shed
+            while True:
+                index = next(counter)
+                if index >= args.requests and deadline is None:
+                    return
+                if deadline is not None and time.perf_counter() >= deadline:
+                    return
+                elapsed, response = await send(index)
+                latencies.append(elapsed)
+                if response is None:
+                    errors += 1
+                    status_codes["transport_error"] = status_codes.get("transport_error", 0) + 1
+                    continue
+                code = str(response.status_code)
+                status_codes[code] = status_codes.get(code, 0) + 1
+                if response.status_code == 503 and "retry-after" in response.headers:
+                    # Admission control in reject mode
+                    shed += 1
+                elif response.status_code >= 400:
+                    errors += 1
+                elif name == "chat" and response.json().get("shed"):
+                    shed += 1
+                elif name == "chat" and response.json().get("response") == FALLBACK_RESPONSE:
+                    fallbacks += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        wall = time.perf_counter() - started
+
+    latencies.sort()
+    completed = len(latencies)
+    return {
+        "requests": completed,
+        "errors": errors,
+        "fallbacks": fallbacks,
+        "shed": shed,
+        "status_codes": status_codes,
+        "throughput_rps": round(completed / wall, 2) if wall else 0.0,
+        "mean_ms": round(sum(latencies) / completed * 1000, 2) if completed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0
+    }
+
+def compare(current: dict, baseline: dict, tolerance: float) -> List[str]:
+    """List regressions of current results against a baseline"""
+    regressions = []
+    for name, result in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            continue
+        if base["throughput_rps"] and result["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {result['throughput_rps']} rps vs baseline {base['throughput_rps']} rps")
+        for key in ("p95_ms", "p99_ms"):
+            if base[key] and result[key] > base[key] * (1 + tolerance):
+                regressions.append(f"{name}: {key} {result[key]} vs baseline {base[key]}")
+    return regressions
+
+def print_report(results: dict, baseline: Optional[dict]):
+    header = f"{'scenario':<22}{'reqs':>8}{'errors':>8}{'fallbk':>8}{'shed':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, result in results["scenarios"].items():
+        print(
+            f"{name:<22}{result['requests']:>8}{result['errors']:>8}{result['fallbacks']:>8}{result['shed']:>8}{result['throughput_rps']:>10}"
+            f"{result['p50_ms']:>10}{result['p95_ms']:>10}{result['p99_ms']:>10}"
+        )
+        base = (baseline or {}).get("scenarios", {}).get(name)
+        if base:
+            print(
+                f"{'  baseline':<22}{base['requests']:>8}{base['errors']:>8}{base.get('fallbacks', 0):>8}{base.get('shed', 0):>8}{base['throughput_rps']:>10}"
+                f"{base['p50_ms']:>10}{base['p95_ms']:>10}{base['p99_ms']:>10}"
+            )
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the service against a fake Azure OpenAI upstream")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated subset of: " + ", ".join(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent clients per scenario")
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario")
+    parser.add_argument("--duration", type=float, default=0.0, help="run each scenario for this many seconds instead")
+    parser.add_argument("--warmup", type=int, default=10, help="unmeasured requests before each scenario")
+    parser.add_argument("--timeout", type=float, default=60.0, help="client timeout per request")
+    parser.add_argument("--repeat-messages", action="store_true", help="reuse identical chat messages (exercises the completion cache)")
+    parser.add_argument("--target", help="benchmark a running instance at this base URL instead of starting one")
+    parser.add_argument("--app-env", action="append", default=[], metavar="KEY=VALUE", help="extra environment for the app process")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--save-baseline", metavar="PATH", help="write the results as a baseline file")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a baseline and fail on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression when comparing")
+    fake = parser.add_argument_group("fake upstream")
+    add_fake_arguments(fake)
+    args = parser.parse_args(argv)
+
+    unknown = [name for name in args.scenarios.split(",") if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+    return args
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    names = args.scenarios.split(",")
+
+    with _processes(args) as base_url:
+        scenarios = {name: asyncio.run(run_scenario(base_url, name, args)) for name in names}
+
+    results = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "duration": args.duration,
+            "fake_upstream": {
+                "latency": args.latency,
+                "ttft": args.ttft,
+                "token_interval": args.token_interval,
+                "error_rate": args.error_rate,
+                "rate_limit_rate": args.rate_limit_rate,
+                "reply_words": args.reply_words
+            }
+        },
+        "scenarios": scenarios
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    print_report(results, baseline)
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {path}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\nRegressions beyond {args.tolerance:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nNo regressions beyond {args.tolerance:.0%}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,16 @@
+import os
+
+# Keep the app offline and off disk: no Azure endpoint, no SQLite statistics
+os.environ.setdefault("AZURE_OPENAI_ENDPOINT", "")
+os.environ.setdefault("STATISTICS_PERSISTENCE_ENABLED", "false")
+# Every TestClient request comes from one address; rate-limit tests enable it themselves
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+
+@pytest.fixture
+def client():
+    with TestClient(app, headers={"Accept-Encoding": "identity"}) as test_client:
+        yield test_client
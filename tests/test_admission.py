@@ -0,0 +1,74 @@
+import asyncio
+import json
+import pytest
+import time
+from app.config.settings import settings
+from app.core.constants import SHED_RESPONSE
+from app.services.admission import AdmissionController, admission_controller
+
+def test_a_single_stall_does_not_shed():
+    controller = AdmissionController()
+    controller.observe_lag(2.0)
+    assert controller.shed_reason("chat") is None
+    # The reported lag is smoothed, not the spike itself
+    assert 0 < controller.loop_lag < 2.0
+
+def test_sustained_lag_sheds_until_the_loop_recovers():
+    controller = AdmissionController()
+    lag = settings.admission_max_loop_lag_seconds + 0.05
+    for _ in range(settings.admission_lag_samples - 1):
+        controller.observe_lag(lag)
+    assert controller.shed_reason("chat") is None
+    controller.observe_lag(lag)
+    assert controller.shed_reason("chat") == "loop_lag"
+    # Only chat turns are shed
+    assert controller.shed_reason("crisis") is None
+
+    controller.observe_lag(0.0)
+    assert controller.shed_reason("chat") is None
+
+def test_cold_start_stall_is_not_mistaken_for_overload():
+    async def scenario():
+        controller = AdmissionController()
+        await controller.start()
+        await asyncio.sleep(0.05)
+        # Blocks the loop once, like a lazy import on the first request
+        time.sleep(0.5)
+        await asyncio.sleep(0.15)
+        reason = controller.shed_reason("chat")
+        await controller.stop()
+        return reason, controller.loop_lag
+
+    reason, loop_lag = asyncio.run(scenario())
+    assert reason is None
+    assert loop_lag > 0
+
+@pytest.fixture
+def overloaded(monkeypatch):
+    monkeypatch.setattr(admission_controller, "shed_reason", lambda route_class: "loop_lag" if route_class == "chat" else None)
+
+def test_shed_turns_are_marked_as_shed(client, overloaded):
+    response = client.post("/api/chat", json={"message": "Halo, saya ingin cerita"})
+    assert response.status_code == 200
+    assert response.headers["retry-after"] == str(settings.admission_retry_after_seconds)
+    body = response.json()
+    assert body["shed"] is True
+    assert body["response"] == SHED_RESPONSE
+
+    stream = client.post("/api/chat/stream", json={"message": "Halo, saya ingin cerita"})
+    assert stream.headers["retry-after"] == str(settings.admission_retry_after_seconds)
+    frames = [frame.split("\n") for frame in stream.text.strip().split("\n\n")]
+    events = {event[len("event: "):]: json.loads(data[len("data: "):]) for event, data in frames}
+    assert events["fallback"]["response"] == SHED_RESPONSE
+    assert events["done"]["shed"] is True and events["done"]["finish_reason"] == "overloaded"
+
+def test_shed_turns_are_rejected_in_reject_mode(client, overloaded, monkeypatch):
+    monkeypatch.setattr(settings, "admission_shed_mode", "reject")
+    response = client.post("/api/chat", json={"message": "Halo, saya ingin cerita"})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == str(settings.admission_retry_after_seconds)
+
+def test_crisis_turns_are_never_shed(client, overloaded):
+    body = client.post("/api/chat", json={"message": "Saya ingin mengakhiri hidup"}).json()
+    assert body["is_crisis"] is True
+    assert body["shed"] is False
@@ -0,0 +1,77 @@
+import json
+import random
+from app.core.constants import QUESTION_IDS
+from app.services.assessment_service import AssessmentService
+
+def _answers(value: int) -> dict:
+    return {question_id: value for question_id in QUESTION_IDS}
+
+def _ndjson(client, body):
+    response = client.post(
+        "/api/assessment/submit-batch",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert response.status_code == 200
+    return [json.loads(line) for line in response.text.splitlines()]
+
+MIXED_LINES = [
+    json.dumps({"answers": _answers(0), "timestamp": "t"}),
+    "{not json",
+    json.dumps({"answers": {"unknown": 1}, "timestamp": "t"}),
+    "",
+    json.dumps({"answers": {QUESTION_IDS[0]: 9}, "timestamp": "t"}),
+    json.dumps({"answers": _answers(3), "timestamp": "t"}),
+]
+
+def test_json_batch_reports_invalid_rows_in_place(client):
+    response = client.post("/api/assessment/submit-batch", json={"submissions": [
+        {"answers": _answers(3), "timestamp": "t"},
+        {"answers": {"unknown": 1}, "timestamp": "t"},
+        {"answers": {QUESTION_IDS[0]: 4}, "timestamp": "t"},
+        {"answers": _answers(0), "timestamp": "t"},
+    ]})
+    assert response.status_code == 200
+    batch = response.json()
+    assert batch["total"] == 4
+    assert batch["scored"] == 2
+    assert [item["index"] for item in batch["results"]] == [0, 1, 2, 3]
+    assert batch["results"][1]["result"] is None
+    assert "unknown" in batch["results"][1]["error"]
+    assert batch["results"][2]["error"]
+    assert batch["results"][0]["result"]["score"]["percentage"] == 100.0
+    assert batch["results"][3]["result"]["score"]["total_score"] == 0
+    assert sum(batch["risk_distribution"].values()) == 2
+
+def test_ndjson_batch_reports_invalid_lines_in_order(client):
+    rows = _ndjson(client, "\n".join(MIXED_LINES))
+    *results, summary = rows
+    assert [row["index"] for row in results] == [0, 1, 2, 3, 4]
+    assert [("error" in row) for row in results] == [False, True, True, True, False]
+    assert results[1]["error"].startswith("Invalid submission")
+    assert results[0]["total_score"] == 0
+    assert results[4]["percentage"] == 100.0
+    assert summary["summary"]["total"] == 5
+    assert summary["summary"]["scored"] == 2
+    assert sum(summary["summary"]["risk_distribution"].values()) == 2
+
+def test_ndjson_lines_split_across_chunks(client):
+    body = "\n".join(MIXED_LINES).encode()
+
+    def chunks():
+        for start in range(0, len(body), 7):
+            yield body[start:start + 7]
+
+    assert _ndjson(client, chunks()) == _ndjson(client, body)
+
+def test_batch_scores_match_single_scoring():
+    rng = random.Random(7)
+    answer_sets = [
+        {question_id: rng.randint(0, 3) for question_id in rng.sample(QUESTION_IDS, rng.randint(0, len(QUESTION_IDS)))}
+        for _ in range(200)
+    ]
+    for answers, score in zip(answer_sets, AssessmentService.score_batch(answer_sets)):
+        result = AssessmentService.process_assessment(answers)
+        assert score.error is None
+        assert score.total_score == result.score.total_score
+        assert score.percentage == result.score.percentage
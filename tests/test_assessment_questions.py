@@ -0,0 +1,36 @@
+from app.config.settings import settings
+from app.services.assessment_service import AssessmentService
+
+def test_questions_are_cacheable_and_revalidated_with_etag(client):
+    response = client.get("/api/assessment/questions")
+    assert response.status_code == 200
+    assert response.json() == {"questions": AssessmentService.get_questions()}
+    assert response.headers["cache-control"] == f"public, max-age={settings.assessment_questions_max_age}"
+    assert "Accept-Encoding" in response.headers["vary"]
+    etag = response.headers["etag"]
+    assert etag.startswith('"') and etag.endswith('"')
+
+    not_modified = client.get("/api/assessment/questions", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["etag"] == etag
+    assert not_modified.headers["cache-control"] == response.headers["cache-control"]
+
+    # Weak comparison, and a list of tags
+    assert client.get("/api/assessment/questions", headers={"If-None-Match": f'"stale", W/{etag}'}).status_code == 304
+    assert client.get("/api/assessment/questions", headers={"If-None-Match": '"stale"'}).status_code == 200
+
+def test_each_encoding_has_its_own_etag(client):
+    identity = client.get("/api/assessment/questions")
+    gzipped = client.get("/api/assessment/questions", headers={"Accept-Encoding": "gzip"})
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert gzipped.json() == identity.json()
+    assert gzipped.headers["etag"] != identity.headers["etag"]
+
+    # A tag from either representation revalidates the other
+    revalidated = client.get(
+        "/api/assessment/questions",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": identity.headers["etag"]}
+    )
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == gzipped.headers["etag"]
@@ -0,0 +1,66 @@
+import json
+from starlette.testclient import TestClient
+from benchmarks.fake_openai import FakeConfig, create_app
+from benchmarks.run import compare, percentile
+
+COMPLETIONS = "/openai/deployments/gpt/chat/completions?api-version=2024-10-21"
+PROMPT = {"messages": [{"role": "user", "content": "halo apa kabar"}]}
+
+def _fake(**overrides) -> TestClient:
+    config = dict(latency=0, jitter=0, ttft=0, token_interval=0, reply_words=5)
+    config.update(overrides)
+    return TestClient(create_app(FakeConfig(**config)))
+
+def test_percentile_is_nearest_rank():
+    values = [float(value) for value in range(1, 101)]
+    assert percentile(values, 0.50) == 50.0
+    assert percentile(values, 0.95) == 95.0
+    assert percentile(values, 0.99) == 99.0
+    assert percentile([7.0], 0.99) == 7.0
+    assert percentile([], 0.95) == 0.0
+
+def test_compare_flags_regressions_beyond_tolerance():
+    baseline = {"scenarios": {
+        "chat": {"throughput_rps": 100.0, "p95_ms": 50.0, "p99_ms": 80.0},
+        "crisis-check": {"throughput_rps": 500.0, "p95_ms": 5.0, "p99_ms": 8.0}
+    }}
+    current = {"scenarios": {
+        "chat": {"throughput_rps": 85.0, "p95_ms": 54.0, "p99_ms": 100.0},
+        "crisis-check": {"throughput_rps": 495.0, "p95_ms": 5.2, "p99_ms": 8.1},
+        "assessment-submit": {"throughput_rps": 1.0, "p95_ms": 999.0, "p99_ms": 999.0}
+    }}
+    regressions = compare(current, baseline, tolerance=0.10)
+    assert len(regressions) == 2
+    assert any(line.startswith("chat: throughput") for line in regressions)
+    assert any(line.startswith("chat: p99_ms") for line in regressions)
+
+def test_fake_completion_reports_usage():
+    with _fake() as client:
+        body = client.post(COMPLETIONS, json=PROMPT).json()
+    assert body["choices"][0]["message"]["content"]
+    assert body["usage"]["completion_tokens"] == 5
+    assert body["usage"]["total_tokens"] == body["usage"]["prompt_tokens"] + 5
+
+def test_fake_stream_sends_usage_chunk_when_asked():
+    with _fake() as client:
+        text = client.post(COMPLETIONS, json={**PROMPT, "stream": True, "stream_options": {"include_usage": True}}).text
+    events = [line[len("data: "):] for line in text.split("\n\n") if line.startswith("data: ")]
+    assert events[-1] == "[DONE]"
+    chunks = [json.loads(event) for event in events[:-1]]
+    assert "".join(chunk["choices"][0]["delta"].get("content", "") for chunk in chunks if chunk["choices"])
+    assert chunks[-1]["choices"] == []
+    assert chunks[-1]["usage"]["completion_tokens"] == 5
+
+def test_fake_rejects_stream_usage_on_old_api_versions():
+    legacy = COMPLETIONS.replace("2024-10-21", "2024-06-01")
+    with _fake() as client:
+        assert client.post(legacy, json={**PROMPT, "stream": True, "stream_options": {"include_usage": True}}).status_code == 400
+        assert client.post(legacy, json={**PROMPT, "stream": True}).status_code == 200
+
+def test_fake_injects_rate_limits_and_errors():
+    with _fake(rate_limit_rate=1.0, retry_after_ms=1500) as client:
+        response = client.post(COMPLETIONS, json=PROMPT)
+    assert response.status_code == 429
+    assert response.headers["retry-after-ms"] == "1500"
+    with _fake(error_rate=1.0) as client:
+        assert client.post(COMPLETIONS, json=PROMPT).status_code == 500
@@ -0,0 +1,39 @@
+import json
+from app.config.settings import settings
+
+def _chunks(body: bytes, size: int = 65536):
+    # A generator body is sent with chunked transfer encoding, without Content-Length
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+def _oversized_chat() -> bytes:
+    return json.dumps({"message": "x" * (settings.request_max_body_bytes + 1)}).encode()
+
+def test_content_length_over_the_limit_is_rejected_before_reading(client):
+    response = client.post("/api/chat", content=_oversized_chat(), headers={"Content-Type": "application/json"})
+    assert response.status_code == 413
+    assert response.json()["detail"] == f"Request body too large: at most {settings.request_max_body_bytes} bytes"
+    assert response.headers["connection"] == "close"
+
+def test_chunked_body_over_the_limit_is_rejected(client):
+    response = client.post("/api/chat", content=_chunks(_oversized_chat()), headers={"Content-Type": "application/json"})
+    assert "content-length" not in response.request.headers
+    assert response.status_code == 413
+    assert response.json()["detail"] == f"Request body too large: at most {settings.request_max_body_bytes} bytes"
+
+def test_bodies_within_the_limit_are_read(client):
+    body = json.dumps({"message": "Saya ingin mulai menabung lagi bulan depan"}).encode()
+    response = client.post("/api/chat/crisis-check", content=_chunks(body, 8), headers={"Content-Type": "application/json"})
+    assert response.status_code == 200
+    assert response.json()["is_crisis"] is False
+
+def test_batch_uploads_have_their_own_limit(client):
+    # Over the default limit, well under the batch one: parsed, not rejected
+    line = b"{not json" + b" " * 90
+    rows = settings.request_max_body_bytes // len(line) + 1
+    body = b"\n".join([line] * rows)
+    assert settings.request_max_body_bytes < len(body) < settings.request_max_batch_body_bytes
+    response = client.post("/api/assessment/submit-batch", content=_chunks(body), headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+    # One error per row, then the summary
+    assert json.loads(response.text.splitlines()[-1])["summary"]["total"] == rows
@@ -0,0 +1,75 @@
+import json
+import pytest
+from app.core.constants import CRISIS_RESOURCES, FALLBACK_RESPONSE
+from app.core.exceptions import AzureOpenAIException
+from app.services.azure_openai_service import StreamDelta, azure_openai_service
+
+def _events(response):
+    """Decode an SSE body into (event, data) pairs, checking every frame's shape"""
+    assert response.text.endswith("\n\n")
+    events = []
+    for frame in response.text[:-2].split("\n\n"):
+        event_line, data_line = frame.split("\n")
+        assert event_line.startswith("event: ") and data_line.startswith("data: ")
+        events.append((event_line[len("event: "):], json.loads(data_line[len("data: "):])))
+    return events
+
+def _stream(client, message):
+    response = client.post("/api/chat/stream", json={"message": message})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.headers["cache-control"] == "no-cache"
+    return _events(response)
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Replace the Azure OpenAI stream with the given deltas, optionally failing after them"""
+    def install(deltas, error=None):
+        async def generate_response_stream(messages, max_tokens, temperature, deployment=None):
+            for delta in deltas:
+                yield delta
+            if error is not None:
+                raise error
+        monkeypatch.setattr(azure_openai_service, "generate_response_stream", generate_response_stream)
+    return install
+
+def test_stream_frames_tokens_between_meta_and_done(client, upstream):
+    upstream([StreamDelta("Halo,"), StreamDelta(" apa kabar?"), StreamDelta(finish_reason="stop")])
+    events = _stream(client, "Halo, saya ingin cerita (sse tokens)")
+
+    assert [event for event, _ in events] == ["meta", "token", "token", "done"]
+    meta = events[0][1]
+    assert meta["is_crisis"] is False and meta["safety_response"] is None
+    assert meta["session_id"]
+    assert "".join(data["content"] for event, data in events if event == "token") == "Halo, apa kabar?"
+    done = events[-1][1]
+    assert (done["finish_reason"], done["response_chars"], done["fallback"]) == ("stop", 16, False)
+    assert done["prompt_tokens"] > 0
+
+def test_unconfigured_upstream_falls_back(client):
+    events = _stream(client, "Halo, saya ingin cerita (sse fallback)")
+
+    assert [event for event, _ in events] == ["meta", "fallback", "done"]
+    assert events[1][1] == {"response": FALLBACK_RESPONSE, "partial": False}
+    assert events[2][1]["finish_reason"] == "error"
+    assert events[2][1]["fallback"] is True
+
+def test_broken_stream_ends_with_partial_fallback(client, upstream):
+    upstream([StreamDelta("Saya mengerti")], AzureOpenAIException("Stream interrupted"))
+    events = _stream(client, "Halo, saya ingin cerita (sse broken)")
+
+    assert [event for event, _ in events] == ["meta", "token", "fallback", "done"]
+    assert events[2][1] == {"response": FALLBACK_RESPONSE, "partial": True}
+    assert events[3][1]["finish_reason"] == "error"
+    assert events[3][1]["response_chars"] == len("Saya mengerti")
+
+def test_crisis_information_is_sent_before_the_reply(client):
+    events = _stream(client, "Kadang saya berpikir untuk mengakhiri hidup")
+
+    event, meta = events[0]
+    assert event == "meta"
+    assert meta["is_crisis"] is True
+    assert meta["crisis_resources"] == CRISIS_RESOURCES
+    assert meta["safety_response"]
+    # Even without a reply, the turn ends with a done event
+    assert events[-1][0] == "done"
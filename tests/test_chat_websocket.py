@@ -0,0 +1,87 @@
+import asyncio
+import threading
+from app.config.settings import settings
+from app.services.azure_openai_service import StreamDelta, azure_openai_service
+from app.services.rate_limiter import rate_limiter
+from app.services.session_store import session_store
+
+def _install_upstream(monkeypatch, hang=False):
+    """Stream one token, then either finish or wait until cancelled; records how the stream ended"""
+    upstream = {"started": 0, "closed": threading.Event()}
+
+    async def generate_response_stream(messages, max_tokens, temperature, deployment=None):
+        upstream["started"] += 1
+        try:
+            yield StreamDelta("Saya mendengarkan.")
+            if hang:
+                await asyncio.Event().wait()
+            yield StreamDelta(finish_reason="stop")
+        finally:
+            upstream["closed"].set()
+
+    monkeypatch.setattr(azure_openai_service, "generate_response_stream", generate_response_stream)
+    return upstream
+
+def _receive_until(websocket, frame_type):
+    frames = []
+    while not frames or frames[-1]["type"] != frame_type:
+        frames.append(websocket.receive_json())
+    return frames
+
+def test_turns_stream_over_one_connection(client, monkeypatch):
+    _install_upstream(monkeypatch)
+    with client.websocket_connect("/api/chat/ws") as websocket:
+        websocket.send_json({"type": "message", "message": "Halo, saya ingin cerita"})
+        first = _receive_until(websocket, "done")
+        websocket.send_json({"type": "message", "message": "Terima kasih"})
+        second = _receive_until(websocket, "done")
+
+    assert [frame["type"] for frame in first] == ["meta", "token", "done"]
+    assert first[-1]["finish_reason"] == "stop"
+    # The connection holds one conversation
+    assert second[0]["session_id"] == first[0]["session_id"]
+
+def test_cancel_aborts_the_upstream_stream(client, monkeypatch):
+    upstream = _install_upstream(monkeypatch, hang=True)
+    with client.websocket_connect("/api/chat/ws") as websocket:
+        websocket.send_json({"type": "message", "message": "Halo, saya ingin cerita panjang"})
+        assert [frame["type"] for frame in _receive_until(websocket, "token")] == ["meta", "token"]
+        websocket.send_json({"type": "cancel"})
+        assert websocket.receive_json() == {"type": "cancelled"}
+        assert upstream["closed"].is_set()
+
+        # The connection is free for the next turn
+        websocket.send_json({"type": "message", "message": "Lanjut"})
+        assert websocket.receive_json()["type"] == "meta"
+    assert upstream["started"] == 2
+
+def test_failed_turn_is_reported_as_an_error_frame(client, monkeypatch, caplog):
+    async def broken_touch(session):
+        raise RuntimeError("session store unavailable")
+
+    monkeypatch.setattr(session_store, "touch", broken_touch)
+    with client.websocket_connect("/api/chat/ws") as websocket:
+        websocket.send_json({"type": "message", "message": "Halo"})
+        frame = websocket.receive_json()
+
+    assert frame == {"type": "error", "detail": "The reply could not be completed"}
+    assert any(record.exc_info and "WebSocket chat turn failed" in record.getMessage() for record in caplog.records)
+
+def test_turns_share_the_http_rate_limit(client, monkeypatch):
+    _install_upstream(monkeypatch)
+    monkeypatch.setattr(settings, "rate_limit_enabled", True)
+    monkeypatch.setattr(settings, "rate_limit_requests", 1)
+    monkeypatch.setattr(rate_limiter, "clients", {})
+    with client.websocket_connect("/api/chat/ws") as websocket:
+        websocket.send_json({"type": "message", "message": "Halo"})
+        _receive_until(websocket, "done")
+        websocket.send_json({"type": "message", "message": "Halo lagi"})
+        limited = websocket.receive_json()
+        # Crisis messages are answered even over the limit
+        websocket.send_json({"type": "message", "message": "Saya ingin bunuh diri"})
+        crisis = websocket.receive_json()
+
+    assert limited["type"] == "error"
+    assert limited["detail"] == "Too many chat requests, please try again shortly"
+    assert limited["retry_after"] >= 1
+    assert crisis["type"] == "meta" and crisis["is_crisis"] is True
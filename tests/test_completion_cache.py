@@ -0,0 +1,65 @@
+import asyncio
+from app.services.azure_openai_service import StreamDelta, azure_openai_service
+from app.services.completion_cache import MemoryCompletionCache, SQLiteCompletionCache
+
+def test_memory_entries_expire_after_their_ttl():
+    async def scenario():
+        cache = MemoryCompletionCache(max_entries=10, ttl_seconds=0.05)
+        await cache.set("a", "reply")
+        fresh = await cache.get("a")
+        await asyncio.sleep(0.1)
+        return fresh, await cache.get("a"), len(cache._entries)
+
+    assert asyncio.run(scenario()) == ("reply", None, 0)
+
+def test_memory_evicts_least_recently_used():
+    async def scenario():
+        cache = MemoryCompletionCache(max_entries=2, ttl_seconds=60)
+        await cache.set("a", "1")
+        await cache.set("b", "2")
+        await cache.get("a")
+        await cache.set("c", "3")
+        return [await cache.get(key) for key in ("a", "b", "c")], cache.evictions
+
+    assert asyncio.run(scenario()) == (["1", None, "3"], 1)
+
+def test_sqlite_expiry_and_eviction_follow_batched_touches(tmp_path):
+    async def scenario():
+        cache = SQLiteCompletionCache(str(tmp_path / "cache.db"), max_entries=2, ttl_seconds=60)
+        cache.PRUNE_EVERY = 3
+        await cache.set("a", "1")
+        await cache.set("b", "2")
+        # The hit is held in memory, then written before the prune that needs it
+        hit = await cache.get("a")
+        pending = dict(cache._touched)
+        await cache.set("c", "3")
+        values = [await cache.get(key) for key in ("a", "b", "c")]
+        await cache.close()
+
+        expiring = SQLiteCompletionCache(str(tmp_path / "expiring.db"), max_entries=10, ttl_seconds=0.05)
+        await expiring.set("a", "1")
+        await asyncio.sleep(0.1)
+        expired = await expiring.get("a")
+        await expiring.close()
+        return hit, list(pending), values, expired
+
+    hit, pending, values, expired = asyncio.run(scenario())
+    assert hit == "1"
+    assert pending == ["a"]
+    assert values == ["1", None, "3"]
+    assert expired is None
+
+def test_crisis_turns_bypass_the_cache(client, monkeypatch):
+    calls = []
+
+    async def generate_response_stream(messages, max_tokens, temperature, deployment=None):
+        calls.append(messages[-1]["content"])
+        yield StreamDelta("Saya di sini untuk Anda.", "stop")
+
+    monkeypatch.setattr(azure_openai_service, "generate_response_stream", generate_response_stream)
+    for message in ["Bagaimana cara berhenti deposit? (cache test)"] * 2 + ["Saya ingin mengakhiri hidup (cache test)"] * 2:
+        # A fresh conversation each time, so the prompts are identical
+        response = client.post("/api/chat/stream", json={"message": message, "conversation_history": [{"role": "user", "content": "halo"}]})
+        assert response.status_code == 200
+
+    assert calls == ["Bagaimana cara berhenti deposit? (cache test)"] + ["Saya ingin mengakhiri hidup (cache test)"] * 2
@@ -0,0 +1,72 @@
+import asyncio
+import gzip
+from app.config.settings import settings
+from app.middleware.compression import CompressionMiddleware
+from app.utils.precompiled import brotli
+
+def _crisis_check(client, count, accept_encoding):
+    return client.post(
+        "/api/chat/crisis-check",
+        json={"messages": ["Saya ingin mulai menabung lagi bulan depan"] * count},
+        headers={"Accept-Encoding": accept_encoding}
+    )
+
+def test_large_json_is_gzipped_when_accepted(client):
+    plain = _crisis_check(client, 50, "identity")
+    assert len(plain.content) >= settings.compression_minimum_size
+    assert "content-encoding" not in plain.headers
+
+    compressed = _crisis_check(client, 50, "gzip")
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in compressed.headers["vary"]
+    assert int(compressed.headers["content-length"]) < len(plain.content)
+    assert compressed.json() == plain.json()
+
+def test_small_responses_are_sent_uncompressed(client):
+    response = _crisis_check(client, 1, "gzip")
+    assert len(response.content) < settings.compression_minimum_size
+    assert "content-encoding" not in response.headers
+
+def _send_through(accept_encoding, body, content_type=b"application/json", chunks=1):
+    """Run one response through the middleware and return the messages it sends"""
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", content_type)]})
+        size = len(body) // chunks
+        for index in range(chunks):
+            last = index == chunks - 1
+            await send({"type": "http.response.body", "body": body[index * size:None if last else (index + 1) * size], "more_body": not last})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    headers = [(b"accept-encoding", accept_encoding.encode("latin-1"))] if accept_encoding is not None else []
+    middleware = CompressionMiddleware(app, minimum_size=100)
+    asyncio.run(middleware({"type": "http", "headers": headers}, receive, send))
+    return dict(sent[0]["headers"]), b"".join(message["body"] for message in sent[1:])
+
+BODY = b'{"response": "' + b"Terima kasih sudah bercerita. " * 20 + b'"}'
+
+def test_encoding_negotiation():
+    if brotli is not None:
+        headers, body = _send_through("gzip, deflate, br", BODY)
+        assert headers[b"content-encoding"] == b"br"
+        assert brotli.decompress(body) == BODY
+    headers, body = _send_through("br;q=0, gzip", BODY)
+    assert headers[b"content-encoding"] == b"gzip"
+    assert gzip.decompress(body) == BODY
+    assert headers[b"content-length"] == str(len(body)).encode()
+    # Nothing acceptable, or no header at all: sent as is
+    for accept_encoding in ("identity", "gzip;q=0, br;q=0", None):
+        headers, body = _send_through(accept_encoding, BODY)
+        assert b"content-encoding" not in headers and body == BODY
+
+def test_streamed_and_incompressible_responses_pass_through():
+    headers, body = _send_through("gzip", BODY, chunks=3)
+    assert b"content-encoding" not in headers and body == BODY
+    headers, body = _send_through("gzip", BODY, content_type=b"image/png")
+    assert b"content-encoding" not in headers and body == BODY
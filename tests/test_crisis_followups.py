@@ -0,0 +1,47 @@
+import asyncio
+from app.services.crisis_followups import CrisisFollowUps
+
+def test_pending_follow_ups_are_never_evicted():
+    async def scenario():
+        follow_ups = CrisisFollowUps(ttl=60, max_entries=2)
+        release = asyncio.Event()
+
+        async def slow_reply():
+            await release.wait()
+            return "reply"
+
+        first = follow_ups.submit(slow_reply, None)
+        second = follow_ups.submit(slow_reply, None)
+        rejected = follow_ups.submit(slow_reply, None)
+        cancelled = first.task.cancelled() or second.task.cancelled()
+
+        release.set()
+        await asyncio.gather(first.task, second.task)
+        third = follow_ups.submit(slow_reply, None)
+        evicted = await follow_ups.wait(first.follow_up_id, 0)
+        kept = await follow_ups.wait(second.follow_up_id, 0)
+        await follow_ups.close()
+        return rejected, cancelled, third, evicted, kept
+
+    rejected, cancelled, third, evicted, kept = asyncio.run(scenario())
+    assert rejected is None
+    assert not cancelled
+    assert third is not None
+    assert evicted is None
+    assert kept.status == "ready" and kept.response == "reply"
+
+def test_sweep_expires_entries_without_new_traffic():
+    async def scenario():
+        follow_ups = CrisisFollowUps(ttl=0.05, max_entries=10)
+
+        async def reply():
+            return "reply"
+
+        follow_up = follow_ups.submit(reply, None)
+        await follow_ups.start()
+        await asyncio.sleep(0.2)
+        found = await follow_ups.wait(follow_up.follow_up_id, 0)
+        await follow_ups.close()
+        return found
+
+    assert asyncio.run(scenario()) is None
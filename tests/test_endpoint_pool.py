@@ -0,0 +1,190 @@
+import asyncio
+import httpx
+import pytest
+import time
+from openai import AsyncAzureOpenAI
+from benchmarks.fake_openai import REPLY, FakeConfig, create_app
+from app.config.settings import settings
+from app.core.exceptions import AzureOpenAIException
+from app.services.azure_openai_service import AzureOpenAIService, _OpenedStream
+from app.services.endpoint_pool import EndpointPool, PoolMember
+from app.utils.metrics import AZURE_OPENAI_HEDGES, AZURE_OPENAI_MEMBER_REQUESTS
+
+MESSAGES = [{"role": "user", "content": "Halo, saya ingin berhenti berjudi"}]
+
+def _config(**overrides) -> FakeConfig:
+    defaults = dict(latency=0.01, jitter=0.0, ttft=0.01, token_interval=0.0, reply_words=5)
+    return FakeConfig(**{**defaults, **overrides})
+
+def _member(name: str, config: FakeConfig, api_version: str = "2024-10-21") -> PoolMember:
+    """A pool member whose client talks to an in-process fake Azure OpenAI server"""
+    member = PoolMember(name, f"http://{name}.fake", "key", api_version)
+    member.http_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=create_app(config)))
+    member._client = AsyncAzureOpenAI(
+        api_key="key",
+        api_version=api_version,
+        azure_endpoint=member.endpoint,
+        max_retries=0,
+        http_client=member.http_client
+    )
+    return member
+
+def _service(*members: PoolMember) -> AzureOpenAIService:
+    service = AzureOpenAIService()
+    service.pool = EndpointPool(list(members))
+    return service
+
+def _reply(words: int) -> str:
+    tokens = REPLY.split()
+    return " ".join(tokens[index % len(tokens)] for index in range(words))
+
+def test_stream_usage_is_only_requested_where_supported():
+    assert _member("current", _config()).stream_usage
+    assert _member("preview", _config(), "2024-09-01-preview").stream_usage
+    assert not _member("legacy", _config(), "2024-06-01").stream_usage
+
+    async def scenario():
+        # The fake server rejects stream_options on this api-version, like Azure does
+        service = _service(_member("legacy", _config(), "2024-06-01"))
+        deltas = [delta async for delta in service.generate_response_stream(MESSAGES, deployment="chat")]
+        await service.close()
+        return "".join(delta.content for delta in deltas), deltas[-1].finish_reason
+
+    assert asyncio.run(scenario()) == (_reply(5), "stop")
+
+def test_start_imports_the_sdk_before_the_first_chat():
+    async def scenario():
+        member = _member("default", _config())
+        service = _service(member)
+        await service.start()
+        warmed = "chat" in vars(member.client)
+        await service.close()
+        return warmed
+
+    assert asyncio.run(scenario())
+
+def test_failed_member_fails_over_to_a_healthy_one():
+    async def scenario():
+        failing, healthy = _member("failing", _config(error_rate=1.0)), _member("healthy", _config())
+        service = _service(failing, healthy)
+        reply = await service.generate_response(MESSAGES, deployment="chat")
+        await service.close()
+        return reply, failing, healthy
+
+    reply, failing, healthy = asyncio.run(scenario())
+    assert reply == _reply(5)
+    assert failing.circuit_breaker._failures == 1
+    assert healthy.circuit_breaker.state == "closed" and healthy.ewma["complete"] is not None
+    assert failing.outstanding == healthy.outstanding == 0
+
+def test_rate_limited_member_is_avoided_until_retry_after():
+    async def scenario():
+        limited, other = _member("limited", _config(rate_limit_rate=1.0, retry_after_ms=2000)), _member("other", _config())
+        service = _service(limited, other)
+        reply = await service.generate_response(MESSAGES, deployment="chat")
+        await service.close()
+        return reply, limited
+
+    reply, limited = asyncio.run(scenario())
+    assert reply == _reply(5)
+    # Out of quota is not a health failure
+    assert limited.circuit_breaker.state == "closed" and limited.circuit_breaker._failures == 0
+    assert 1.5 < limited.rate_limited_until - time.monotonic() <= 2.0
+
+def test_circuit_opens_and_recovers_through_a_probe(monkeypatch):
+    monkeypatch.setattr(settings, "azure_openai_max_retries", 0)
+    monkeypatch.setattr(settings, "azure_openai_circuit_failure_threshold", 2)
+    monkeypatch.setattr(settings, "azure_openai_circuit_recovery_seconds", 0.1)
+
+    async def scenario():
+        config = _config(error_rate=1.0)
+        member = _member("only", config)
+        service = _service(member)
+        states = []
+        for _ in range(3):
+            with pytest.raises(AzureOpenAIException):
+                await service.generate_response(MESSAGES, deployment="chat")
+            states.append(service.circuit_state)
+
+        config.error_rate = 0.0
+        await asyncio.sleep(0.15)
+        states.append(service.circuit_state)
+        reply = await service.generate_response(MESSAGES, deployment="chat")
+        states.append(service.circuit_state)
+        await service.close()
+        return states, reply, member
+
+    states, reply, member = asyncio.run(scenario())
+    # The third call is refused without reaching the upstream
+    assert states == ["closed", "open", "open", "half_open", "closed"]
+    assert member.circuit_breaker._failures == 0
+    assert reply == _reply(5)
+    assert member.probation_until > time.monotonic()
+
+def test_slow_member_is_hedged_and_the_loser_cancelled(monkeypatch):
+    monkeypatch.setattr(settings, "azure_openai_hedging_enabled", True)
+    monkeypatch.setattr(settings, "azure_openai_hedge_min_samples", 5)
+    monkeypatch.setattr(settings, "azure_openai_hedge_min_delay_seconds", 0.05)
+
+    async def scenario():
+        slow, fast = _member("slow", _config(ttft=2.0)), _member("fast", _config())
+        service = _service(slow, fast)
+        service.pool._samples["stream"].extend([0.01] * 5)
+        hedges = AZURE_OPENAI_HEDGES.value("stream")
+        cancelled = AZURE_OPENAI_MEMBER_REQUESTS.value("slow", "cancelled")
+
+        started = time.perf_counter()
+        deltas = [delta async for delta in service.generate_response_stream(MESSAGES, deployment="chat")]
+        elapsed = time.perf_counter() - started
+        await service.close()
+        return (
+            "".join(delta.content for delta in deltas), elapsed, slow, fast,
+            AZURE_OPENAI_HEDGES.value("stream") - hedges,
+            AZURE_OPENAI_MEMBER_REQUESTS.value("slow", "cancelled") - cancelled
+        )
+
+    reply, elapsed, slow, fast, hedges, cancelled = asyncio.run(scenario())
+    assert reply == _reply(5)
+    assert elapsed < 1.0
+    assert (hedges, cancelled) == (1, 1)
+    assert slow.outstanding == fast.outstanding == 0
+    # Cancelling the loser gives its half-open probe back and is not a failure
+    assert slow.circuit_breaker._failures == 0 and not slow.circuit_breaker._probe_in_flight
+
+def test_hedge_that_opened_in_the_same_step_as_the_winner_is_closed(monkeypatch):
+    monkeypatch.setattr(settings, "azure_openai_hedging_enabled", True)
+    monkeypatch.setattr(settings, "azure_openai_hedge_min_samples", 5)
+    monkeypatch.setattr(settings, "azure_openai_hedge_min_delay_seconds", 0.05)
+
+    class Stream:
+        closed = False
+
+        async def close(self):
+            self.closed = True
+
+    async def scenario():
+        first, hedge = _member("first", _config()), _member("hedge", _config())
+        service = _service(first, hedge)
+        service.pool._samples["stream"].extend([0.01] * 5)
+        both_opened = asyncio.Event()
+        streams = {}
+
+        async def call(member, deployment, mode, deadline, kwargs, failed):
+            member.outstanding += 1
+            if member is hedge:
+                # Both attempts get their first token in the same event-loop step
+                asyncio.get_running_loop().call_later(0.01, both_opened.set)
+            await both_opened.wait()
+            streams[member.name] = Stream()
+            return _OpenedStream(member, streams[member.name], None, [])
+
+        monkeypatch.setattr(service, "_call", call)
+        winner = await service._race("chat", "stream", asyncio.get_running_loop().time() + 5, {}, [])
+        await winner.close()
+        await service.close()
+        return winner.member, streams, first, hedge
+
+    winner, streams, first, hedge = asyncio.run(scenario())
+    assert winner is first
+    assert streams["first"].closed and streams["hedge"].closed
+    assert first.outstanding == hedge.outstanding == 0
@@ -0,0 +1,23 @@
+from fastapi.testclient import TestClient
+from app.config.settings import settings
+from app.main import app
+
+def test_metrics_are_local_only_without_a_token(client):
+    assert client.get("/metrics").status_code == 403
+    with TestClient(app, client=("127.0.0.1", 40000), headers={"Accept-Encoding": "identity"}) as local:
+        response = local.get("/metrics")
+        assert response.status_code == 200
+        assert "azure_openai_circuit_open" in response.text
+        # Traffic relayed by the ingress is not local, whatever its peer address
+        assert local.get("/metrics", headers={"X-Forwarded-For": "203.0.113.7"}).status_code == 403
+
+def test_metrics_token_is_required_when_configured(client, monkeypatch):
+    monkeypatch.setattr(settings, "metrics_token", "s3cret")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer s3cret"}).status_code == 200
+
+def test_health_has_no_pool_member_detail(client):
+    health = client.get("/health").json()
+    assert health["azure_openai_circuit"] == "disabled"
+    assert "azure_openai_endpoints" not in health
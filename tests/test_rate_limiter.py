@@ -0,0 +1,65 @@
+import contextvars
+import pytest
+from app.config.settings import settings
+from app.services.rate_limiter import RateLimiter, rate_limiter
+from app.utils.metrics import CRISIS_CHECKS
+
+@pytest.fixture
+def limiter(monkeypatch):
+    monkeypatch.setattr(settings, "rate_limit_enabled", True)
+    monkeypatch.setattr(settings, "rate_limit_requests", 3)
+    monkeypatch.setattr(settings, "rate_limit_tokens", 1000)
+    monkeypatch.setattr(settings, "rate_limit_window_seconds", 60.0)
+    return RateLimiter(["10.0.0.0/8", "127.0.0.0/8"])
+
+def test_client_key_skips_trusted_proxy_hops(limiter):
+    # Direct clients are keyed by their own address; their X-Forwarded-For is ignored
+    assert limiter.key_for("203.0.113.7", "198.51.100.1") == "ip:203.0.113.7"
+    # Behind the ingress, the last hop it did not add is the client
+    assert limiter.key_for("10.1.2.3", "198.51.100.1") == "ip:198.51.100.1"
+    # A forged leftmost entry does not change the key
+    assert limiter.key_for("10.1.2.3", "1.2.3.4, 198.51.100.1, 10.0.0.5") == "ip:198.51.100.1"
+    assert limiter.key_for("10.1.2.3", None) == "ip:10.1.2.3"
+
+def test_requests_are_limited_per_client(limiter):
+    decisions = [limiter.acquire("ip:a") for _ in range(4)]
+    assert [decision.allowed for decision in decisions] == [True, True, True, False]
+    assert decisions[0].headers["RateLimit-Limit"] == "3"
+    assert decisions[2].headers["RateLimit-Remaining"] == "0"
+    assert decisions[3].retry_after >= 1
+    assert limiter.acquire("ip:b").allowed
+
+def test_token_usage_is_charged_to_the_bound_client(limiter):
+    assert limiter.acquire("ip:a").allowed
+
+    def request_task():
+        limiter.bind("ip:a")
+        limiter.charge_tokens(1500)
+
+    # Each request runs in its own context, like an ASGI request task
+    contextvars.copy_context().run(request_task)
+    limiter.charge_tokens(1500)
+    decision = limiter.acquire("ip:a")
+    assert not decision.allowed
+    assert decision.retry_after >= 29
+    assert limiter.acquire("ip:b").allowed
+
+def test_sweep_drops_refilled_clients(limiter):
+    limiter.acquire("ip:a")
+    limiter.clients["ip:a"].updated -= 120
+    limiter.acquire("ip:b")
+    assert limiter.sweep() == 1
+    assert list(limiter.clients) == ["ip:b"]
+
+def test_over_limit_crisis_turn_is_answered_and_counted_once(client, monkeypatch):
+    monkeypatch.setattr(settings, "rate_limit_enabled", True)
+    monkeypatch.setattr(settings, "rate_limit_requests", 1)
+    monkeypatch.setattr(rate_limiter, "clients", {})
+    assert client.post("/api/chat", json={"message": "Halo"}).status_code == 200
+    assert client.post("/api/chat", json={"message": "Halo lagi"}).status_code == 429
+
+    before = CRISIS_CHECKS.value("chat", "crisis")
+    response = client.post("/api/chat", json={"message": "Saya ingin mengakhiri hidup"})
+    assert response.status_code == 200
+    assert response.json()["is_crisis"] is True
+    assert CRISIS_CHECKS.value("chat", "crisis") - before == 1
@@ -0,0 +1,54 @@
+import asyncio
+from app.models.chat import Message
+from app.services.session_store import SessionStore
+
+def test_idle_sessions_expire():
+    async def scenario():
+        store = SessionStore(max_sessions=10, idle_ttl=60, max_messages=10)
+        idle = await store.create()
+        active = await store.create()
+        idle.last_seen -= 120
+        return await store.get(idle.session_id), await store.get(active.session_id), store.expired, len(store)
+
+    missing, found, expired, live = asyncio.run(scenario())
+    assert missing is None
+    assert found is not None
+    assert (expired, live) == (1, 1)
+
+def test_least_recently_used_session_is_evicted():
+    async def scenario():
+        store = SessionStore(max_sessions=2, idle_ttl=60, max_messages=10)
+        first = await store.create()
+        second = await store.create()
+        await store.get(first.session_id)
+        await store.create()
+        return await store.get(first.session_id), await store.get(second.session_id)
+
+    kept, evicted = asyncio.run(scenario())
+    assert kept is not None
+    assert evicted is None
+
+def test_evicted_sessions_spill_to_sqlite_and_come_back(tmp_path):
+    async def scenario():
+        store = SessionStore(max_sessions=1, idle_ttl=60, max_messages=10, sqlite_path=str(tmp_path / "sessions.db"))
+        first = await store.create([Message(role="user", content="halo")])
+        store.append(first, ("assistant", "halo juga"))
+        await store.create()
+        spilled = store.spilled
+        restored = await store.get(first.session_id)
+        await store.close()
+        return spilled, restored
+
+    spilled, restored = asyncio.run(scenario())
+    assert spilled == 1
+    assert restored.messages == [("user", "halo"), ("assistant", "halo juga")]
+
+def test_history_is_capped_at_max_messages():
+    async def scenario():
+        store = SessionStore(max_sessions=10, idle_ttl=60, max_messages=3)
+        session = await store.create([Message(role="user", content=str(index)) for index in range(5)])
+        seeded = [content for _, content in session.messages]
+        store.append(session, ("assistant", "a"), ("user", "b"))
+        return seeded, [content for _, content in session.messages]
+
+    assert asyncio.run(scenario()) == (["2", "3", "4"], ["4", "a", "b"])
@@ -0,0 +1,80 @@
+import asyncio
+from app.utils.single_flight import SingleFlight
+
+class Upstream:
+    """Work that waits until released, counting how often it was started"""
+
+    def __init__(self):
+        self.calls = 0
+        self.cancelled = False
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return "reply"
+
+def test_concurrent_calls_share_one_upstream_call():
+    async def scenario():
+        flights = SingleFlight()
+        upstream = Upstream()
+        callers = [asyncio.create_task(flights.do("prompt", upstream)) for _ in range(5)]
+        await asyncio.sleep(0)
+        upstream.release.set()
+        return await asyncio.gather(*callers), upstream.calls, flights.coalesced, len(flights)
+
+    assert asyncio.run(scenario()) == (["reply"] * 5, 1, 4, 0)
+
+def test_cancelled_leader_leaves_the_call_running_for_followers():
+    async def scenario():
+        flights = SingleFlight()
+        upstream = Upstream()
+        leader = asyncio.create_task(flights.do("prompt", upstream))
+        await asyncio.sleep(0)
+        followers = [asyncio.create_task(flights.do("prompt", upstream)) for _ in range(2)]
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        await asyncio.gather(leader, return_exceptions=True)
+        upstream.release.set()
+        return leader.cancelled(), await asyncio.gather(*followers), upstream.calls, upstream.cancelled
+
+    assert asyncio.run(scenario()) == (True, ["reply", "reply"], 1, False)
+
+def test_call_is_cancelled_once_every_caller_has_left():
+    async def scenario():
+        flights = SingleFlight()
+        upstream = Upstream()
+        callers = [asyncio.create_task(flights.do("prompt", upstream)) for _ in range(2)]
+        await asyncio.sleep(0)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0)
+
+        # The next caller starts a fresh call instead of joining the cancelled one
+        retry = asyncio.create_task(flights.do("prompt", upstream))
+        await asyncio.sleep(0)
+        upstream.release.set()
+        return upstream.cancelled, await retry, upstream.calls
+
+    assert asyncio.run(scenario()) == (True, "reply", 2)
+
+def test_errors_reach_every_caller():
+    async def scenario():
+        flights = SingleFlight()
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream down")
+
+        results = await asyncio.gather(*(flights.do("prompt", failing) for _ in range(3)), return_exceptions=True)
+        return results, len(flights)
+
+    results, inflight = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert inflight == 0
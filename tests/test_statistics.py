@@ -0,0 +1,53 @@
+import asyncio
+import json
+from app.core.constants import QUESTION_IDS
+from app.services.statistics_service import AssessmentStatistics, assessment_statistics
+
+def test_ndjson_parse_errors_are_not_recorded(client):
+    before = assessment_statistics.total
+    lines = [
+        json.dumps({"answers": {question_id: 1 for question_id in QUESTION_IDS}, "timestamp": "t"}),
+        "{not json",
+        json.dumps({"answers": {"unknown": 1}, "timestamp": "t"}),
+    ]
+    response = client.post(
+        "/api/assessment/submit-batch",
+        content="\n".join(lines),
+        headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert response.status_code == 200
+    assert assessment_statistics.total - before == 1
+
+def test_failed_flush_is_rolled_back_before_retry(tmp_path):
+    db_path = str(tmp_path / "statistics.db")
+
+    async def scenario():
+        stats = AssessmentStatistics(db_path, flush_interval=60, snapshot_ttl=0)
+        stats.record(3, "Rendah", {})
+        await stats.flush()
+
+        stats.record(3, "Rendah", {})
+        db = await stats._connection()
+        execute = db.execute
+
+        async def failing_execute(sql, *args, **kwargs):
+            if sql.startswith("DELETE"):
+                raise RuntimeError("disk I/O error")
+            return await execute(sql, *args, **kwargs)
+
+        # The upserts have run when the failure hits
+        db.execute = failing_execute
+        await stats.flush()
+        db.execute = execute
+        await stats.flush()
+        await stats.stop()
+
+        restored = AssessmentStatistics(db_path, flush_interval=60, snapshot_ttl=0)
+        await restored.load()
+        await restored.stop()
+        return restored
+
+    restored = asyncio.run(scenario())
+    assert restored.total == 2
+    assert restored.risk_distribution["Rendah"] == 2
+    assert restored.score_histogram[3] == 2